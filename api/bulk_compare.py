@@ -0,0 +1,266 @@
+"""Compare many BOM pairs from the command line, writing each result to a file.
+
+    python api/bulk_compare.py BASELINE_DIR CANDIDATE_DIR --output results/
+    python api/bulk_compare.py --manifest pairs.csv [--manifest more.csv] --output results/
+        [--format json|csv|xlsx] [--workers N] [--force]
+
+With two directories, every BOM in CANDIDATE_DIR is compared against the
+BOM of the same name (ignoring case and extension) in BASELINE_DIR. A
+manifest is a CSV file with file1 (baseline) and file2 (candidate) columns,
+paths relative to the manifest, and an optional name column naming the
+pair's output; a baseline can be listed against any number of candidates.
+
+Each distinct file is parsed once on a process pool sized to the machine
+(--workers, or BOM_WORKERS), however many pairs use it; the pairs are
+then compared on the same pool. Each pair's result is written to
+OUTPUT/<name>.<format>, and OUTPUT/summary.csv and summary.json list every
+pair's counts or error. The exit status is 1 when any pair failed.
+
+A rerun skips the pairs whose output is current, that is written from the
+same file contents by the same comparison rules; OUTPUT/bulk-state.json
+records what each output was made from. --force compares every pair again.
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from excel_tool import comparison_cache_key, compare_parsed_safe, read_bom_cached, supported_extensions
+from parse_cache import file_sha256
+from result_formats import RESULT_FILE_FORMATS, write_result_file
+
+# Records, per output name, the comparison key its output was written for
+STATE_FILE = 'bulk-state.json'
+
+SUMMARY_FIELDS = ('name', 'status', 'file1', 'file2', 'output', 'seconds', 'error')
+
+# Characters kept in output file names; anything else becomes _
+_UNSAFE_NAME = re.compile(r'[^\w.-]+')
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def _bom_files(directory):
+    extensions = supported_extensions()
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in extensions and not name.startswith('~$')
+    )
+
+def directory_pairs(baseline_dir, candidate_dir):
+    """Pairs of same-named BOMs, plus error entries for candidates without a baseline."""
+    baselines = {_stem(path).lower(): path for path in _bom_files(baseline_dir)}
+    pairs = []
+    for path in _bom_files(candidate_dir):
+        baseline = baselines.get(_stem(path).lower())
+        pair = {'name': _stem(path), 'file1': baseline, 'file2': path}
+        if baseline is None:
+            pair['error'] = f"No baseline named '{_stem(path)}' in {baseline_dir}"
+        pairs.append(pair)
+    return pairs
+
+def manifest_pairs(manifest):
+    """Pairs listed in a manifest CSV with file1, file2 and optional name columns."""
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if not {'file1', 'file2'} <= set(reader.fieldnames or ()):
+            raise ValueError(f"{manifest} needs file1 and file2 columns")
+        pairs = []
+        for row in reader:
+            if not row['file1'] and not row['file2']:
+                continue
+            file1 = os.path.join(base, row['file1'])
+            file2 = os.path.join(base, row['file2'])
+            pairs.append({'name': row.get('name') or f"{_stem(file2)}-vs-{_stem(file1)}", 'file1': file1, 'file2': file2})
+    return pairs
+
+def _unique_names(pairs):
+    """Make the pairs' names safe file names, numbering repeats (name, name-2, ...)."""
+    seen = set()
+    for pair in pairs:
+        name = _UNSAFE_NAME.sub('_', pair['name']).strip('._') or 'pair'
+        unique = name
+        count = 1
+        while unique.lower() in seen:
+            count += 1
+            unique = f"{name}-{count}"
+        seen.add(unique.lower())
+        pair['name'] = unique
+    return pairs
+
+def _load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _write_atomic(path, write):
+    """Call ``write(tmp_path)``, then move the file into place, so a partial write never looks current."""
+    tmp = f"{path}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+def _write_json(path, content):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(content, f, indent=2, ensure_ascii=False)
+    _write_atomic(path, write)
+
+def parse_safe(file_path, file_hash):
+    """read_bom_cached for the pool: (parsed BOM, None), or (None, error) when the file cannot be read."""
+    try:
+        return read_bom_cached(file_path, file_hash), None
+    except Exception as e:
+        return None, f"{os.path.basename(file_path)}: {e}"
+
+def compare_to_file(bom1, bom2, out_path, file_format):
+    """Compare two parsed BOMs and write the result; returns its summary_stats, or the error."""
+    results = compare_parsed_safe(bom1, bom2)
+    if 'error' in results:
+        return results
+    _write_atomic(out_path, lambda tmp: write_result_file(results, tmp, file_format))
+    return {'summary_stats': results['summary_stats']}
+
+def _summary_row(pair, status, output=None, seconds=None, error=None, summary_stats=None):
+    row = {
+        'name': pair['name'], 'status': status, 'file1': pair['file1'], 'file2': pair['file2'],
+        'output': output, 'seconds': seconds, 'error': error
+    }
+    row.update(summary_stats or {})
+    return row
+
+def write_summary(output_dir, rows):
+    """Write the per-pair rows as summary.json and summary.csv."""
+    _write_json(os.path.join(output_dir, 'summary.json'), rows)
+    fields = list(SUMMARY_FIELDS)
+    for row in rows:
+        fields.extend(key for key in row if key not in fields)
+
+    def write(tmp):
+        with open(tmp, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fields, restval='')
+            writer.writeheader()
+            writer.writerows(rows)
+    _write_atomic(os.path.join(output_dir, 'summary.csv'), write)
+
+def run(pairs, output_dir, file_format='json', workers=None, force=False, log=print):
+    """Compare ``pairs`` (dicts of name, file1, file2), writing outputs under ``output_dir``.
+
+    Returns the summary rows, in the order of ``pairs``.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = _load_state(state_path)
+    rows = {}
+
+    # Content hashes decide whether an output is current, and key the parse cache
+    hashes = {}
+    for pair in pairs:
+        for key in ('file1', 'file2'):
+            path = pair[key]
+            if 'error' in pair or path in hashes:
+                continue
+            try:
+                hashes[path] = file_sha256(path)
+            except OSError as e:
+                pair['error'] = f"{path}: {e.strerror}"
+
+    pending = []
+    for pair in pairs:
+        if 'error' in pair:
+            rows[pair['name']] = _summary_row(pair, 'error', error=pair['error'])
+            continue
+        output = f"{pair['name']}.{file_format}"
+        pair['output'] = output
+        pair['key'] = f"{comparison_cache_key(hashes[pair['file1']], hashes[pair['file2']])}-{file_format}"
+        previous = state.get(pair['name'])
+        if (not force and previous and previous['key'] == pair['key']
+                and os.path.exists(os.path.join(output_dir, output))):
+            rows[pair['name']] = _summary_row(pair, 'current', output, summary_stats=previous['summary_stats'])
+        else:
+            pending.append(pair)
+    current = sum(1 for row in rows.values() if row['status'] == 'current')
+    log(f"{len(pairs)} pairs: {len(pending)} to compare, {current} current, {len(rows) - current} failed")
+
+    if pending:
+        files = list(dict.fromkeys(pair[key] for pair in pending for key in ('file1', 'file2')))
+        workers = min(workers or int(os.environ.get('BOM_WORKERS') or os.cpu_count() or 1), len(files))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            start = time.perf_counter()
+            parsed = dict(zip(files, executor.map(parse_safe, files, [hashes[path] for path in files])))
+            log(f"Parsed {len(files)} files in {time.perf_counter() - start:.1f}s on {workers} workers")
+
+            futures = {}
+            for pair in pending:
+                (bom1, error1), (bom2, error2) = parsed[pair['file1']], parsed[pair['file2']]
+                if error1 or error2:
+                    rows[pair['name']] = _summary_row(pair, 'error', error=error1 or error2)
+                    continue
+                out_path = os.path.join(output_dir, pair['output'])
+                future = executor.submit(compare_to_file, bom1, bom2, out_path, file_format)
+                futures[future] = pair, time.perf_counter()
+
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                pair, submitted = futures[future]
+                seconds = round(time.perf_counter() - submitted, 3)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'error': str(e)}
+                if 'error' in result:
+                    rows[pair['name']] = _summary_row(pair, 'error', seconds=seconds, error=result['error'])
+                    log(f"[{done}/{len(futures)}] {pair['name']}: {result['error']}")
+                    continue
+                rows[pair['name']] = _summary_row(
+                    pair, 'compared', pair['output'], seconds, summary_stats=result['summary_stats']
+                )
+                # Saved after every pair, so an interrupted run resumes where it stopped
+                state[pair['name']] = {
+                    'key': pair['key'], 'file1': pair['file1'], 'file2': pair['file2'],
+                    'summary_stats': result['summary_stats']
+                }
+                _write_json(state_path, state)
+                log(f"[{done}/{len(futures)}] {pair['name']}")
+
+    summary = [rows[pair['name']] for pair in pairs]
+    write_summary(output_dir, summary)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dirs', nargs='*', metavar='DIR', help='BASELINE_DIR CANDIDATE_DIR')
+    parser.add_argument('--manifest', action='append', default=[], help='CSV of file1,file2[,name] pairs')
+    parser.add_argument('--output', required=True, help='directory the results and summary are written to')
+    parser.add_argument('--format', choices=RESULT_FILE_FORMATS, default='json', help='result file format')
+    parser.add_argument('--workers', type=int, help='worker processes (default: BOM_WORKERS or all cores)')
+    parser.add_argument('--force', action='store_true', help='compare pairs whose output is current too')
+    args = parser.parse_args()
+
+    if len(args.dirs) not in (0, 2) or not (args.dirs or args.manifest):
+        parser.error("give BASELINE_DIR and CANDIDATE_DIR, or --manifest files")
+    pairs = directory_pairs(*args.dirs) if args.dirs else []
+    try:
+        for manifest in args.manifest:
+            pairs.extend(manifest_pairs(manifest))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    summary = run(_unique_names(pairs), args.output, args.format, args.workers, args.force)
+    failed = [row for row in summary if row['status'] == 'error']
+    print(f"Wrote {len(summary) - len(failed)} results, {len(failed)} failed; summary in {os.path.join(args.output, 'summary.csv')}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
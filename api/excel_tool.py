@@ -1,18 +1,90 @@
 import pandas as pd
+import numpy as np
+import abc
+import collections
+import contextlib
+import csv
+import datetime
+import io
+import itertools
+import json
+import logging
+import math
 import re
 import os
 import sys
+import time
+import xlrd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.api.types import infer_dtype, is_float_dtype, is_integer_dtype
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+try:
+    from python_calamine import CalamineWorkbook, SheetTypeEnum
+except ImportError:  # optional: faster .xlsx/.xls reading, and the .xlsb reader
+    CalamineWorkbook = SheetTypeEnum = None
+from header_fingerprints import header_fingerprints
+from header_matcher import column_roles, header_cell_score
+from normalize import as_text, normalize_qty, normalize_text, to_display
+from mpn_match import MATCH_THRESHOLD, match_mpns
+from parse_cache import file_sha256, parse_cache
+from refdes import designator_changes, format_designators
 
-def safe_print(text):
-    """Safe printing function that handles Unicode characters on Windows."""
-    try:
-        print(text)
-    except UnicodeEncodeError:
-        # Replace problematic Unicode characters with ASCII equivalents
-        safe_text = str(text).encode('ascii', 'replace').decode('ascii')
-        print(safe_text)
+# Diagnostics are logged at DEBUG level and cost nothing unless enabled
+logger = logging.getLogger(__name__)
+
+# Receives (phase, details) progress events while report_progress() is active
+_progress_callback = None
+
+# Seconds spent per phase while time_phases() is active, and the phases now running
+_phase_timings = None
+_open_phases = []
+
+# Set while capture_debug_log() is active: files are parsed and headers
+# detected afresh, so the trace shows every step rather than cache hits
+_tracing = False
+
+# Bump when parsing or header detection changes so cached parses and stored
+# header layouts are not reused
+PARSE_CACHE_VERSION = 4
+
+# Bump when the comparison rules or result layout change so cached results are not reused
+COMPARISON_VERSION = 7
+
+# Result lists of a comparison, in the order they are returned and streamed
+RESULT_CATEGORIES = (
+    'new_parts', 'removed_parts', 'modified_parts', 'unchanged_parts', 'unrecognized_parts', 'refdes_changes'
+)
+
+# Fields of a result row; modified parts carry both files' values instead
+PART_FIELDS = ('MPN', 'Ref Des/LOC', 'Qty', 'Description', 'Line Number')
+MODIFIED_PART_FIELDS = (
+    'MPN', 'Ref Des/LOC', 'File1 Ref Des', 'File2 Ref Des', 'File1 Qty', 'File2 Qty',
+    'File1 Description', 'File2 Description', 'File1 Line', 'File2 Line'
+)
+# Fields of an unrecognized_parts row: a part whose MPN only nearly matches one in the other file
+UNRECOGNIZED_PART_FIELDS = ('MPN', 'File2 MPN', 'Match Score') + MODIFIED_PART_FIELDS[1:]
+# Fields of a refdes_changes row: the designators a part gained and lost
+REFDES_CHANGE_FIELDS = ('MPN', 'Added Ref Des', 'Removed Ref Des', 'File1 Line', 'File2 Line')
 
-# Column mapping keywords
+# Result rows are converted for display this many at a time
+DISPLAY_CHUNK_ROWS = 10000
+
+# Summed quantities of split lines are rounded to this many decimals, so
+# 0.1 + 0.2 is 0.3 rather than 0.30000000000000004
+QTY_SUM_DECIMALS = 10
+
+# Header detection only looks at this many leading rows
+HEADER_SCAN_ROWS = 100
+
+# A .csv file's delimiter is detected from this many leading characters
+CSV_SNIFF_CHARS = 64 * 1024
+
+# Delimiters a .csv file may use; the first wins a tie
+CSV_DELIMITERS = (',', ';', '\t', '|')
+
+# Column mapping keywords (reference list; header_matcher holds the rules detection applies)
 HEADER_KEYWORDS = {
     'mpn': [
         # Acronyms
@@ -94,61 +166,379 @@ HEADER_KEYWORDS = {
     ]
 }
 
-def find_header_row_and_map(file_path):
-    """Find the header row and map columns to standard names."""
-    safe_print(f"\nFinding headers for: {os.path.basename(file_path)}")
+def _convert_openpyxl_cell(cell):
+    """Convert an openpyxl cell the same way pandas.read_excel does."""
+    if cell.value is None:
+        return ''
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+def _trimmed_rows(rows):
+    """Yield ``rows`` without their trailing empty cells, dropping the trailing empty rows."""
+    # Empty rows are held back until a row with data follows, so the
+    # sheet's trailing empty rows are never yielded
+    pending_empty_rows = 0
+    for row in rows:
+        # Trim trailing empty cells
+        while row and row[-1] == '':
+            row.pop()
+        if not row:
+            pending_empty_rows += 1
+            continue
+        for _ in range(pending_empty_rows):
+            yield []
+        pending_empty_rows = 0
+        yield row
+
+def _xlsx_sheet_rows(sheet):
+    """Yield the rows of a read-only openpyxl worksheet, converted like pandas."""
+    sheet.reset_dimensions()
+    return _trimmed_rows([_convert_openpyxl_cell(cell) for cell in row] for row in sheet.rows)
+
+def _convert_xls_cell(value, cell_type, epoch1904):
+    """Convert an xlrd cell value the same way pandas.read_excel does."""
+    if cell_type == xlrd.XL_CELL_DATE:
+        try:
+            value = xlrd.xldate.xldate_as_datetime(value, epoch1904)
+        except OverflowError:
+            return value
+        # Dates on the epoch are times only
+        year = value.timetuple()[0:3]
+        if (not epoch1904 and year == (1899, 12, 31)) or (epoch1904 and year == (1904, 1, 1)):
+            value = datetime.time(value.hour, value.minute, value.second, value.microsecond)
+    elif cell_type == xlrd.XL_CELL_ERROR:
+        value = np.nan
+    elif cell_type == xlrd.XL_CELL_BOOLEAN:
+        value = bool(value)
+    elif cell_type == xlrd.XL_CELL_NUMBER:
+        if math.isfinite(value) and int(value) == value:
+            value = int(value)
+    return value
+
+def _xls_sheet_rows(book, sheet):
+    """Yield the rows of sheet ``sheet`` of an open xlrd workbook, converted like pandas."""
+    xls_sheet = book.sheet_by_index(sheet)
+    for i in range(xls_sheet.nrows):
+        yield [
+            _convert_xls_cell(value, cell_type, book.datemode)
+            for value, cell_type in zip(xls_sheet.row_values(i), xls_sheet.row_types(i))
+        ]
+
+# Control characters .xlsx stores escaped (_x000D_); openpyxl leaves the escapes in the text
+_XLSX_ESCAPED = re.compile(r'[\x00-\x08\x0b-\x1f]')
+
+def _escape_xlsx_text(match):
+    return f"_x{ord(match.group(0)):04X}_"
+
+def _convert_calamine_cell(value, escape):
+    """Convert a calamine cell value to what the openpyxl or xlrd reader gives."""
+    if isinstance(value, float):
+        if math.isfinite(value) and int(value) == value:
+            return int(value)
+    elif isinstance(value, str):
+        if escape and _XLSX_ESCAPED.search(value):
+            return _XLSX_ESCAPED.sub(_escape_xlsx_text, value)
+    elif isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+class SheetReader(abc.ABC):
+    """An open workbook of one reader backend.
+    
+    Every backend yields the same raw rows for the same file: cells
+    converted like pandas.read_excel does, so the grid, the typed frame and
+    the comparison never depend on the backend that read them. Sheets are
+    numbered in workbook order, worksheets only.
+    """
+    
+    # Backend name, the file extensions it reads, and whether its engine is installed
+    name = None
+    extensions = ()
+    available = True
+    
+    @abc.abstractmethod
+    def sheet_names(self):
+        """The names of the workbook's worksheets, in order."""
+    
+    @abc.abstractmethod
+    def iter_rows(self, sheet):
+        """Yield the rows of sheet ``sheet``, not padded to a common width."""
+    
+    def head(self, sheet, rows):
+        """The first ``rows`` rows of sheet ``sheet``."""
+        with contextlib.closing(self.iter_rows(sheet)) as sheet_rows:
+            return list(itertools.islice(sheet_rows, rows))
+    
+    def close(self):
+        pass
+
+class OpenpyxlReader(SheetReader):
+    """.xlsx workbooks, streamed by openpyxl in read-only mode."""
+    
+    name = 'openpyxl'
+    extensions = ('.xlsx',)
+    
+    def __init__(self, file_path):
+        self._book = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    
+    def sheet_names(self):
+        return [sheet.title for sheet in self._book.worksheets]
+    
+    def iter_rows(self, sheet):
+        return _xlsx_sheet_rows(self._book.worksheets[sheet])
+    
+    def close(self):
+        self._book.close()
+
+class XlrdReader(SheetReader):
+    """Legacy .xls workbooks, read by xlrd one sheet at a time."""
+    
+    name = 'xlrd'
+    extensions = ('.xls',)
+    
+    def __init__(self, file_path):
+        # on_demand leaves the other sheets unparsed
+        self._book = xlrd.open_workbook(file_path, on_demand=True)
+    
+    def sheet_names(self):
+        return self._book.sheet_names()
+    
+    def iter_rows(self, sheet):
+        return _xls_sheet_rows(self._book, sheet)
+    
+    def head(self, sheet, rows):
+        # xlrd cannot read part of a sheet, so the sheet is unloaded again
+        head = super().head(sheet, rows)
+        self._book.unload_sheet(sheet)
+        return head
+    
+    def close(self):
+        self._book.release_resources()
+
+class CalamineReader(SheetReader):
+    """.xlsx, .xls and .xlsb workbooks, read by calamine (Rust) when python-calamine is installed.
+    
+    Several times faster than openpyxl and xlrd. Rows are shaped like those
+    readers' (.xls rows keep the sheet's full width, others are trimmed)
+    and cells converted alike, except that error cells (#N/A) read as empty
+    cells instead of NaN, which parses to the same frame.
+    """
+    
+    name = 'calamine'
+    extensions = ('.xlsx', '.xls', '.xlsb')
+    available = CalamineWorkbook is not None
+    
+    def __init__(self, file_path):
+        self._book = CalamineWorkbook.from_path(file_path)
+        self._xls = os.path.splitext(file_path)[1].lower() == '.xls'
+        self._names = [
+            sheet.name for sheet in self._book.sheets_metadata
+            if sheet.typ == SheetTypeEnum.WorkSheet
+        ]
+    
+    def sheet_names(self):
+        return list(self._names)
+    
+    def iter_rows(self, sheet):
+        # Rows are read lazily, so a head scan stops after its first rows.
+        # calamine keeps the empty rows before the data but drops the empty
+        # columns; padding them back keeps column positions like the other readers'
+        values = self._book.get_sheet_by_name(self._names[sheet])
+        # start is None for an empty sheet
+        padding = [''] * (values.start or (0, 0))[1]
+        escape = not self._xls
+        rows = (padding + [_convert_calamine_cell(value, escape) for value in row] for row in values.iter_rows())
+        return rows if self._xls else _trimmed_rows(rows)
     
-    # Read the file without headers first
+    def close(self):
+        self._book.close()
+
+def _csv_delimiter(text):
+    """The delimiter of CSV text: the one splitting most of its leading rows into the same number of fields.
+    
+    Each delimiter scores the rows sharing its most common field count
+    (two or more) times the fields they add, so a title line above the
+    header or commas inside semicolon-separated cells ("U1,U2") do not
+    outvote the delimiter the table is written with.
+    """
+    sample = text[:CSV_SNIFF_CHARS]
+    if len(text) > CSV_SNIFF_CHARS:
+        # The last line may be cut short
+        sample = sample.rpartition('\n')[0] or sample
+    best, best_score = CSV_DELIMITERS[0], 0
+    for delimiter in CSV_DELIMITERS:
+        widths = collections.Counter(
+            len(row) for row in csv.reader(io.StringIO(sample, newline=''), delimiter=delimiter) if len(row) > 1
+        )
+        if not widths:
+            continue
+        width, rows = widths.most_common(1)[0]
+        if rows * (width - 1) > best_score:
+            best, best_score = delimiter, rows * (width - 1)
+    return best
+
+class CsvReader(SheetReader):
+    """.csv files: one sheet of text cells, named after the file.
+    
+    The delimiter (comma, semicolon, tab or pipe) is detected from the start
+    of the file (see _csv_delimiter). Text is UTF-8 (with or without a BOM),
+    else Windows-1252.
+    """
+    
+    name = 'csv'
+    extensions = ('.csv',)
+    
+    def __init__(self, file_path):
+        self._name = os.path.splitext(os.path.basename(file_path))[0]
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        try:
+            self._text = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            self._text = data.decode('cp1252', errors='replace')
+    
+    def sheet_names(self):
+        return [self._name]
+    
+    def iter_rows(self, sheet):
+        if sheet != 0:
+            raise IndexError(f"CSV files have one sheet, not sheet {sheet}")
+        delimiter = _csv_delimiter(self._text)
+        return _trimmed_rows(csv.reader(io.StringIO(self._text, newline=''), delimiter=delimiter))
+
+# Reader backends, in the order they are picked when several can read a format
+READERS = {reader.name: reader for reader in (CalamineReader, OpenpyxlReader, XlrdReader, CsvReader)}
+
+def _reader_preference():
+    preference = os.environ.get('BOM_READER', 'auto')
+    if preference != 'auto' and preference not in READERS:
+        raise ValueError(f"BOM_READER must be auto or one of {', '.join(READERS)}, not '{preference}'")
+    return preference
+
+# Backend used whenever it can read a file's format; auto picks by READERS order
+READER_PREFERENCE = _reader_preference()
+
+# Backend forced by use_reader(), overriding READER_PREFERENCE
+_forced_reader = None
+
+def supported_extensions():
+    """Extensions of the files some installed reader backend can read."""
+    return sorted({ext for reader in READERS.values() if reader.available for ext in reader.extensions})
+
+def reader_for(file_path):
+    """The reader backend class for a file, chosen by its extension and the installed engines."""
     ext = os.path.splitext(file_path)[1].lower()
-    if ext == '.xls':
-        df_raw = pd.read_excel(file_path, header=None, engine='xlrd')
-    else:
-        df_raw = pd.read_excel(file_path, header=None)
+    candidates = [reader for reader in READERS.values() if reader.available and ext in reader.extensions]
+    if not candidates:
+        raise ValueError(f"No reader available for '{ext}' files; supported: {', '.join(supported_extensions())}")
+    preferred = _forced_reader or READER_PREFERENCE
+    for reader in candidates:
+        if reader.name == preferred:
+            return reader
+    return candidates[0]
+
+@contextlib.contextmanager
+def use_reader(name):
+    """Read with backend ``name`` (where it can read the format) while the block runs."""
+    global _forced_reader
+    if name not in READERS:
+        raise ValueError(f"Unknown reader '{name}', expected one of {', '.join(READERS)}")
+    previous, _forced_reader = _forced_reader, name
+    try:
+        yield
+    finally:
+        _forced_reader = previous
+
+def iter_sheet_rows(file_path, sheet=0):
+    """Lazily yield the raw cell rows of one sheet (by index) of a BOM workbook.
     
-    print(f"Raw file shape: {df_raw.shape}")
+    Rows are not padded to a common width. Close the iterator when stopping
+    early so the workbook is released.
+    """
+    reader = reader_for(file_path)(file_path)
+    try:
+        yield from reader.iter_rows(sheet)
+    finally:
+        reader.close()
+
+def iter_sheet_heads(file_path, rows=HEADER_SCAN_ROWS):
+    """Yield (sheet name, leading rows) for every sheet of a workbook, opening it once.
     
-    # Debug: Show first 15 rows to understand the file structure
-    print(f"\nFirst 15 rows for debugging:")
-    for i in range(min(15, len(df_raw))):
-        row_data = df_raw.iloc[i].tolist()
-        # Show only first 10 columns to avoid overwhelming output
-        row_display = row_data[:10] if len(row_data) > 10 else row_data
-        safe_print(f"Row {i}: {row_display}")
+    Only the first ``rows`` rows of a sheet are kept; the openpyxl reader
+    does not read the rest of the sheet at all.
+    """
+    reader = reader_for(file_path)(file_path)
+    try:
+        for index, name in enumerate(reader.sheet_names()):
+            yield name, reader.head(index, rows)
+    finally:
+        reader.close()
+
+def _pad_rows(rows):
+    """Pad rows with empty cells to a rectangle."""
+    if not rows:
+        return rows
+    width = max(len(row) for row in rows)
+    return [row + [''] * (width - len(row)) for row in rows]
+
+def read_sheet_grid(file_path, sheet=0):
+    """Read the raw cell grid of one sheet of a BOM workbook in a single pass."""
+    with contextlib.closing(iter_sheet_rows(file_path, sheet)) as rows:
+        return _pad_rows(list(rows))
+
+def grid_to_frame(grid, header=None):
+    """Build a DataFrame from a raw cell grid, exactly as pd.read_excel would."""
+    if not grid:
+        return pd.DataFrame()
+    try:
+        return TextParser(grid, header=header, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+def _find_header_row(rows):
+    """Return the index of the most header-like row among the first HEADER_SCAN_ROWS rows."""
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Scanned rows: %d", len(rows))
+        
+        # Debug: Show first 15 rows to understand the file structure
+        logger.debug("First 15 rows for debugging:")
+        for i in range(min(15, len(rows))):
+            # Show only first 10 columns to avoid overwhelming output
+            logger.debug("Row %d: %s", i, rows[i][:10])
     
     # Look for the header row by checking each row
     header_row = None
     best_header_score = 0
     best_header_row = 0
     
-    for row_idx in range(min(30, len(df_raw))):  # Check first 30 rows
-        row = df_raw.iloc[row_idx]
+    for row_idx in range(min(HEADER_SCAN_ROWS, len(rows))):
+        row = rows[row_idx]
         header_like_count = 0
         header_score = 0
         
         for cell in row:
-            if pd.notna(cell) and isinstance(cell, str):
-                cell_lower = str(cell).lower().strip()
-                # Check for header-like keywords with different weights
-                if any(kw in cell_lower for kw in ['mpn', 'part', 'qty', 'desc', 'ref', 'loc', 'item', 'mfr', 'package', 'manufacturer', 'designator', 'quantity']):
+            # Only text cells can be headers; scores are cached per distinct text
+            if isinstance(cell, str):
+                cell_score = header_cell_score(cell)
+                if cell_score:
                     header_like_count += 1
-                    # Give higher weight to specific MPN-related keywords
-                    if any(kw in cell_lower for kw in ['manufacturer', 'mpn', 'part number', 'pn']):
-                        header_score += 3
-                    elif any(kw in cell_lower for kw in ['qty', 'quantity']):
-                        header_score += 2
-                    elif any(kw in cell_lower for kw in ['desc', 'description']):
-                        header_score += 2
-                    elif any(kw in cell_lower for kw in ['ref', 'designator']):
-                        header_score += 2
-                    else:
-                        header_score += 1
+                    header_score += cell_score
         
-        print(f"Row {row_idx}: {list(row)} -> Header-like count: {header_like_count}, Score: {header_score}")
+        if debug:
+            logger.debug("Row %d: %s -> Header-like count: %d, Score: %d",
+                         row_idx, row, header_like_count, header_score)
         
         # Use a more flexible scoring system
         if header_like_count >= 2 and header_score >= 4:  # Lower threshold but require good score
             header_row = row_idx
-            print(f"  -> FOUND HEADER ROW at index {row_idx} (score: {header_score})")
+            logger.debug("  -> FOUND HEADER ROW at index %d (score: %d)", row_idx, header_score)
             break
         elif header_score > best_header_score:
             best_header_score = header_score
@@ -157,178 +547,193 @@ def find_header_row_and_map(file_path):
     if header_row is None:
         if best_header_score >= 2:  # Use best candidate if we found something reasonable
             header_row = best_header_row
-            print(f"  -> USING BEST CANDIDATE HEADER ROW at index {header_row} (score: {best_header_score})")
+            logger.debug("  -> USING BEST CANDIDATE HEADER ROW at index %d (score: %d)", header_row, best_header_score)
         else:
-            print("WARNING: No header row found, using row 0")
+            logger.debug("WARNING: No header row found, using row 0")
             header_row = 0 
     
-    # Now read the file with the correct header row
-    if ext == '.xls':
-        df = pd.read_excel(file_path, header=header_row, engine='xlrd')
-    else:
-        df = pd.read_excel(file_path, header=header_row)
-    
-    print(f"Columns after header detection: {list(df.columns)}")
-    
-    # Debug: Show all column names with their indices
-    print(f"\nDetailed column analysis:")
-    for idx, col_name in enumerate(df.columns):
-        col_lower = str(col_name).lower().strip()
-        print(f"  Column {idx}: '{col_name}' (lowercase: '{col_lower}')")
+    return header_row
+
+def _map_columns(columns):
+    """Map header names to the standard mpn/qty/refdes/description columns."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Columns after header detection: %s", list(columns))
+        
+        # Debug: Show all column names with their indices
+        logger.debug("Detailed column analysis:")
+        for idx, col_name in enumerate(columns):
+            logger.debug("  Column %d: '%s' (lowercase: '%s')", idx, col_name, str(col_name).lower().strip())
     
     # Map columns to standard names
     col_map = {}
+    roles = [column_roles(str(col_name)) for col_name in columns]
     
     # MPN detection with priority
-    mpn_candidates = []
-    for idx, col_name in enumerate(df.columns):
-        cell_lower = str(col_name).lower().strip()
-        
-        # Skip very long descriptions that might contain part-related words
-        if len(cell_lower) > 50:  # Skip very long descriptions
-            continue
-            
-        # Priority 1: Exact "MPN"
-        if cell_lower == 'mpn':
-            mpn_candidates.append((idx, 10, 'Exact MPN'))
-        # Priority 2: Manufacturer Part Number variations
-        elif 'manufacturer part' in cell_lower and ('no' in cell_lower or 'number' in cell_lower):
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer p/n' in cell_lower or 'manufacturer pn' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer 1 pn' in cell_lower or 'manufacturer 1 p/n' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer 1' in cell_lower and 'pn' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'mfg p/n' in cell_lower or 'mfg pn' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'mfg. p/n' in cell_lower or 'mfg. pn' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer part no' in cell_lower or 'manufacturer part number' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'mfg part no' in cell_lower or 'mfg part number' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer part#' in cell_lower or 'mfg part#' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer part no.' in cell_lower or 'mfg part no.' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        elif 'manufacturer part number' in cell_lower or 'mfg part number' in cell_lower:
-            mpn_candidates.append((idx, 8, 'Manufacturer Part Number'))
-        # Priority 3: Vendor Part Number variations  
-        elif 'vendor part' in cell_lower and ('no' in cell_lower or 'number' in cell_lower):
-            mpn_candidates.append((idx, 6, 'Vendor Part Number'))
-        elif 'vendor p/n' in cell_lower or 'vendor pn' in cell_lower:
-            mpn_candidates.append((idx, 6, 'Vendor Part Number'))
-        elif 'vendor part no' in cell_lower or 'vendor part number' in cell_lower:
-            mpn_candidates.append((idx, 6, 'Vendor Part Number'))
-        # Priority 4: Other part number variations
-        elif len(cell_lower) <= 30 and any(kw in cell_lower for kw in ['part number', 'part no', 'part #', 'pn', 'item#', 'item #']):
-            mpn_candidates.append((idx, 4, 'Other Part Number'))
+    mpn_candidates = [(idx, role.mpn[0], role.mpn[1]) for idx, role in enumerate(roles) if role.mpn]
     
     # Select the highest priority MPN column
     if mpn_candidates:
         mpn_candidates.sort(key=lambda x: x[1], reverse=True)
         selected_mpn = mpn_candidates[0]
         col_map['mpn'] = selected_mpn[0]
-        print(f"Selected MPN column: {df.columns[selected_mpn[0]]} ({selected_mpn[2]})")
+        logger.debug("Selected MPN column: %s (%s)", columns[selected_mpn[0]], selected_mpn[2])
     else:
-        print("WARNING: No MPN column found!")
+        logger.debug("WARNING: No MPN column found!")
     
     # Quantity detection
-    qty_candidates = []
-    for idx, col_name in enumerate(df.columns):
-        cell_lower = str(col_name).lower().strip()
-        if any(kw in cell_lower for kw in ['qty', 'quantity', 'qty.', 'qty:']):
-            qty_candidates.append((idx, cell_lower))
+    qty_candidates = [(idx, role) for idx, role in enumerate(roles) if role.qty]
     
     if qty_candidates:
         col_map['qty'] = qty_candidates[0][0]
-        print(f"Selected Qty column: {df.columns[qty_candidates[0][0]]}")
+        logger.debug("Selected Qty column: %s", columns[qty_candidates[0][0]])
     else:
-        print("WARNING: No Qty column found!")
+        logger.debug("WARNING: No Qty column found!")
     
     # Ref Des/LOC detection
-    refdes_candidates = []
-    for idx, col_name in enumerate(df.columns):
-        cell_lower = str(col_name).lower().strip()
-        if any(kw in cell_lower for kw in ['ref', 'reference', 'designator', 'designation', 'loc', 'location']):
-            refdes_candidates.append((idx, cell_lower))
+    refdes_candidates = [(idx, role) for idx, role in enumerate(roles) if role.refdes]
     
     if refdes_candidates:
         col_map['refdes'] = refdes_candidates[0][0]
-        print(f"Selected Ref Des/LOC column: {df.columns[refdes_candidates[0][0]]}")
+        logger.debug("Selected Ref Des/LOC column: %s", columns[refdes_candidates[0][0]])
     else:
-        print("WARNING: No Ref Des/LOC column found!")
+        logger.debug("WARNING: No Ref Des/LOC column found!")
     
     # Description detection
-    desc_candidates = []
-    for idx, col_name in enumerate(df.columns):
-        cell_lower = str(col_name).lower().strip()
-        if any(kw in cell_lower for kw in ['desc', 'description', 'note', 'comment', 'remark']):
-            desc_candidates.append((idx, cell_lower))
+    desc_candidates = [(idx, role) for idx, role in enumerate(roles) if role.description]
     
     if desc_candidates:
         col_map['description'] = desc_candidates[0][0]
-        print(f"Selected Description column: {df.columns[desc_candidates[0][0]]}")
+        logger.debug("Selected Description column: %s", columns[desc_candidates[0][0]])
     else:
-        print("WARNING: No Description column found!")
+        logger.debug("WARNING: No Description column found!")
     
-    print(f"Final column map: {col_map}")
-    return header_row, col_map
+    logger.debug("Final column map: %s", col_map)
+    return col_map
 
-def read_bom_with_auto_headers(file_path):
-    """Read BOM file with auto-detected headers."""
-    print(f"Reading: {file_path}")
+def _detect_header(head_rows):
+    """Detect the header row and column map from a sheet's leading rows.
     
-    header_row, col_map = find_header_row_and_map(file_path)
-    ext = os.path.splitext(file_path)[1].lower()
+    Only string cells are scored and header names never depend on the rows
+    below them, so this matches running detection on the whole sheet.
+    Headers seen before are looked up in the fingerprint store instead.
+    """
+    head = _pad_rows(head_rows)
+    known = None if _tracing else header_fingerprints.match(head, PARSE_CACHE_VERSION)
+    if known is not None:
+        # A known template: reuse its header row and column map
+        header_row, col_map = known
+        logger.debug("Header row %d matches a known layout, column map: %s", header_row, col_map)
+        columns = grid_to_frame(head[header_row:header_row + 1], header=0).columns
+        return header_row, columns, col_map
     
-    # First, read without headers to get the actual data
-    if ext == '.xls':
-        df_raw = pd.read_excel(file_path, header=None, engine='xlrd')
-    else:
-        df_raw = pd.read_excel(file_path, header=None)
+    header_row = _find_header_row(head)
+    columns = grid_to_frame(head[header_row:header_row + 1], header=0).columns
+    col_map = _map_columns(columns)
+    # Layouts without an MPN column are not worth pinning
+    if 'mpn' in col_map:
+        header_fingerprints.remember(head[header_row], header_row, col_map, PARSE_CACHE_VERSION)
+    return header_row, columns, col_map
+
+def _needed_columns(columns, col_map):
+    """Positions of the columns a comparison can read, in sheet order.
+    
+    That is the mapped columns, plus the description fallback candidates
+    when no description column was mapped.
+    """
+    needed = set(col_map.values())
+    if 'description' not in col_map:
+        needed.update(
+            idx for idx, col_name in enumerate(columns)
+            if column_roles(str(col_name)).description_fallback
+        )
+    return sorted(needed)
+
+def _parse_bom(file_path, sheet=0):
+    """Parse a BOM sheet once and detect its header row and column map.
+    
+    The header is detected from the leading rows as they stream in, then the
+    rest of the sheet is read from the same pass, keeping only the cells of
+    the columns a comparison can use. Returns that projected cell grid, the
+    typed frame read from the header row, the header row index and the
+    column map, whose positions refer to the projected columns.
+    """
+    logger.debug("Finding headers for: %s", os.path.basename(file_path))
+    
+    with contextlib.closing(iter_sheet_rows(file_path, sheet)) as rows:
+        with _timed('header_detection'):
+            head = list(itertools.islice(rows, HEADER_SCAN_ROWS))
+            header_row, columns, col_map = _detect_header(head)
+        _report('header_detection', path=file_path, header_row=header_row, rows_scanned=len(head))
+        positions = _needed_columns(columns, col_map)
+        grid = [
+            [row[idx] if idx < len(row) else '' for idx in positions]
+            for row in itertools.chain(head, rows)
+        ]
+    _report('parse', path=file_path, rows=max(len(grid) - header_row - 1, 0), columns=len(positions))
+    
+    # Now build the typed frame from the correct header row. Columns are
+    # typed independently, so projecting first gives the same values.
+    df = grid_to_frame(grid, header=header_row)
+    if len(df.columns) == len(positions):
+        # Keep the names (and de-duplication suffixes) of the full header row
+        df.columns = [columns[idx] for idx in positions]
+    col_map = {key: positions.index(idx) for key, idx in col_map.items()}
+    return grid, df, header_row, col_map
+
+def find_header_row_and_map(file_path, sheet=0):
+    """Find the header row and map columns to standard names.
+    
+    Only the leading rows of the sheet are read.
+    """
+    logger.debug("Finding headers for: %s", os.path.basename(file_path))
+    with contextlib.closing(iter_sheet_rows(file_path, sheet)) as rows:
+        head = list(itertools.islice(rows, HEADER_SCAN_ROWS))
+    header_row, _, col_map = _detect_header(head)
+    return header_row, col_map
+
+def _read_bom(file_path, sheet=0):
+    """Read a BOM sheet, returning the frame, the column map and the header row."""
+    logger.debug("Reading: %s (sheet %d)", file_path, sheet)
+    
+    grid, df, header_row, col_map = _parse_bom(file_path, sheet)
     
     # Get the MPN column data before pandas converts it
-    if 'mpn' in col_map and col_map['mpn'] < len(df_raw.columns):
+    if 'mpn' in col_map and col_map['mpn'] < len(df.columns):
         mpn_col_idx = col_map['mpn']
-        # Get the original MPN values as strings
-        original_mpn_values = df_raw.iloc[header_row+1:, mpn_col_idx].astype(str).tolist()
-        print(f"Original MPN values (first 5): {original_mpn_values[:5]}")
-    
-    # Now read with headers
-    if ext == '.xls':
-        df = pd.read_excel(file_path, header=header_row, engine='xlrd')
-    else:
-        df = pd.read_excel(file_path, header=header_row)
+        # Get the original MPN values as strings; columns are typed
+        # independently, so the MPN column is parsed on its own
+        mpn_raw = grid_to_frame([[row[mpn_col_idx]] for row in grid])
+        original_mpn_values = mpn_raw.iloc[header_row+1:, 0].astype(str).tolist()
+        logger.debug("Original MPN values (first 5): %s", original_mpn_values[:5])
     
     # Convert MPN column to string to preserve original formatting
     if 'mpn' in col_map and col_map['mpn'] < len(df.columns):
         mpn_col = df.columns[col_map['mpn']]
         df[mpn_col] = df[mpn_col].astype(str)
-        print(f"Converted MPN column '{mpn_col}' to string type")
+        logger.debug("Converted MPN column '%s' to string type", mpn_col)
         
         # Replace with original values if we have them
         if 'original_mpn_values' in locals() and len(original_mpn_values) == len(df):
             df[mpn_col] = original_mpn_values
-            print(f"Restored original MPN values")
+            logger.debug("Restored original MPN values")
     
-    print(f"Detected columns: {col_map}")
-    print(f"Available columns: {list(df.columns)}")
-    print(f"Header row: {header_row}")
-    print(f"Header row content: {df.iloc[header_row].tolist()}")
-    print(f"Column mapping details:")
-    for key, idx in col_map.items():
-        if idx < len(df.columns):
-            print(f"  {key} -> {df.columns[idx]} (index {idx})")
-        else:
-            print(f"  {key} -> INVALID INDEX {idx}")
-    
-    # Additional debugging: Show all columns and their sample values
-    print(f"\nAll columns with sample values:")
-    for idx, col_name in enumerate(df.columns):
-        sample_values = df[col_name].dropna().head(3).tolist()
-        print(f"  Column {idx}: '{col_name}' -> Sample values: {sample_values}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detected columns: %s", col_map)
+        logger.debug("Available columns: %s", list(df.columns))
+        logger.debug("Header row: %d", header_row)
+        if header_row < len(df):
+            logger.debug("Header row content: %s", df.iloc[header_row].tolist())
+        logger.debug("Column mapping details:")
+        for key, idx in col_map.items():
+            if idx < len(df.columns):
+                logger.debug("  %s -> %s (index %d)", key, df.columns[idx], idx)
+            else:
+                logger.debug("  %s -> INVALID INDEX %d", key, idx)
+        
+        # Additional debugging: Show all columns and their sample values
+        logger.debug("All columns with sample values:")
+        for idx, col_name in enumerate(df.columns):
+            logger.debug("  Column %d: '%s' -> Sample values: %s", idx, col_name, df[col_name].dropna().head(3).tolist())
     
     # Check if description column was found and has data
     if 'description' in col_map:
@@ -336,40 +741,37 @@ def read_bom_with_auto_headers(file_path):
         if desc_col_idx < len(df.columns):
             desc_col_name = df.columns[desc_col_idx]
             desc_sample_values = df[desc_col_name].dropna().head(5).tolist()
-            print(f"\nDescription column '{desc_col_name}' (index {desc_col_idx}) sample values:")
-            print(f"  {desc_sample_values}")
-            print(f"  Total non-null values: {len(df[desc_col_name].dropna())}")
+            non_null_count = len(df[desc_col_name].dropna())
+            logger.debug("Description column '%s' (index %d) sample values: %s", desc_col_name, desc_col_idx, desc_sample_values)
+            logger.debug("  Total non-null values: %d", non_null_count)
             
             # Validate that the description column has meaningful data
-            non_null_count = len(df[desc_col_name].dropna())
             if non_null_count == 0:
-                print(f"  WARNING: Description column '{desc_col_name}' has no data!")
+                logger.debug("  WARNING: Description column '%s' has no data!", desc_col_name)
                 # Remove this column from the map and try to find another
                 del col_map['description']
             elif non_null_count < 3:
-                print(f"  WARNING: Description column '{desc_col_name}' has very little data ({non_null_count} values)")
+                logger.debug("  WARNING: Description column '%s' has very little data (%d values)", desc_col_name, non_null_count)
                 # Check if the values are meaningful
                 meaningful_values = [v for v in desc_sample_values if str(v).strip() and str(v).lower() not in ['nan', 'n/a', 'none', '']]
                 if len(meaningful_values) == 0:
-                    print(f"  WARNING: No meaningful values found in description column!")
+                    logger.debug("  WARNING: No meaningful values found in description column!")
                     del col_map['description']
         else:
-            print(f"\nWARNING: Description column index {desc_col_idx} is invalid!")
+            logger.debug("WARNING: Description column index %d is invalid!", desc_col_idx)
             del col_map['description']
     else:
-        print(f"\nWARNING: No description column found!")
-        print(f"Available columns: {list(df.columns)}")
+        logger.debug("WARNING: No description column found!")
+        logger.debug("Available columns: %s", list(df.columns))
         # Try to find a description-like column
         for idx, col_name in enumerate(df.columns):
-            col_lower = str(col_name).lower()
-            if any(kw in col_lower for kw in ['desc', 'note', 'comment', 'remark', 'component', 'part', 'item', 'material']):
-                print(f"  Potential description column: '{col_name}' (index {idx})")
+            if column_roles(str(col_name)).description_fallback:
                 sample_values = df[col_name].dropna().head(3).tolist()
-                print(f"    Sample values: {sample_values}")
+                logger.debug("  Potential description column: '%s' (index %d), sample values: %s", col_name, idx, sample_values)
                 # Check if this column has meaningful data
                 meaningful_values = [v for v in sample_values if str(v).strip() and str(v).lower() not in ['nan', 'n/a', 'none', '']]
                 if len(meaningful_values) > 0:
-                    print(f"    Found meaningful values: {meaningful_values}")
+                    logger.debug("    Found meaningful values: %s", meaningful_values)
                     col_map['description'] = idx
                     break
     
@@ -379,294 +781,696 @@ def read_bom_with_auto_headers(file_path):
         if idx < len(df.columns):
             mapped_cols[key] = df.columns[idx]
     
+    return _compact_columns(df, mapped_cols), mapped_cols, header_row
+
+def _compact_text(values):
+    """Store a column holding only text as a categorical."""
+    if values.dtype == object and infer_dtype(values, skipna=True) == 'string':
+        return values.astype('category')
+    return values
+
+def _compact_qty(values):
+    """Store a numeric column of whole quantities as the smallest nullable integer."""
+    if not (is_integer_dtype(values.dtype) or is_float_dtype(values.dtype)):
+        return values
+    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    numbers = numbers[~np.isnan(numbers)]
+    # Beyond 2**53 a float no longer holds every integer exactly
+    if not (np.isfinite(numbers).all() and (numbers == np.trunc(numbers)).all() and (np.abs(numbers) < 2 ** 53).all()):
+        return values
+    return pd.to_numeric(values.astype('Int64'), downcast='integer')
+
+def _compact_columns(df, mapped_cols):
+    """Shrink the mapped columns: categorical text and nullable integer quantities.
+    
+    Both keep the values normalize_text, normalize_qty and to_display see.
+    """
+    compacted = set()
+    for key in ['qty', 'mpn', 'refdes', 'description']:
+        col_name = mapped_cols.get(key)
+        if col_name is None or col_name in compacted:
+            continue
+        compacted.add(col_name)
+        df[col_name] = _compact_qty(df[col_name]) if key == 'qty' else _compact_text(df[col_name])
+    return df
+
+def read_bom_with_auto_headers(file_path, sheet=0):
+    """Read BOM file with auto-detected headers.
+    
+    The frame only holds the columns a comparison can use. ``sheet`` is the
+    index of the sheet to read, the first one by default.
+    """
+    df, mapped_cols, _ = _read_bom(file_path, sheet)
     return df, mapped_cols
 
-def compare_boms(file1, file2):
+def read_bom_cached(file_path, file_hash=None, sheet=0):
+    """Read a BOM through the content-addressed parse cache.
+    
+    Same result as read_bom_with_auto_headers, but a sheet whose workbook
+    bytes were parsed before is not parsed again. The returned frame is
+    shared with the cache and must not be modified.
+    """
+    with _timed('parse'):
+        # First sheets keep the keys they had before other sheets could be read
+        sheet_tag = f"-s{sheet}" if sheet else ''
+        key = f"{file_hash or file_sha256(file_path)}{sheet_tag}-v{PARSE_CACHE_VERSION}"
+        entry = None if _tracing else parse_cache.get(key)
+        if entry is None:
+            entry = _read_bom(file_path, sheet)
+            parse_cache.put(key, entry)
+        else:
+            _report('parse', path=file_path, rows=len(entry[0]), cached=True)
+    df, mapped_cols, _ = entry
+    return df, mapped_cols
+
+def _key_positions(keys):
+    """Frame of each part key and its position among the collapsed parts."""
+    return pd.DataFrame({'key': keys, 'pos': np.arange(len(keys))})
+
+def _part_columns(df, column_map, positions):
+    """Gather the mapped columns of the rows at the given positions.
+    
+    Returns one Series per standard column, with a constant 'N/A' column for
+    anything missing from the map. Ref Des values are kept as their text.
+    Merged multi-sheet BOMs also get each row's sheet.
+    """
+    def take(column_name):
+        if column_name not in column_map:
+            return pd.Series(['N/A'] * len(positions), dtype=object)
+        col_name = column_map[column_name]
+        if isinstance(col_name, int):
+            col_name = df.columns[col_name]
+        return df[col_name].iloc[positions].reset_index(drop=True)
+    
+    cols = {
+        'mpn': take('mpn'),
+        'refdes': as_text(take('refdes')),
+        'qty': take('qty'),
+        'description': take('description'),
+        # +2 because Excel is 1-indexed and we have header row
+        'line': pd.Series(df.index[positions] + 2)
+    }
+    if 'sheet' in column_map:
+        cols['sheet'] = take('sheet')
+    return cols
+
+def _join_groups(text, groups, distinct=False):
+    """Join the strings of each group with ', ', in row order.
+    
+    Rows are sorted by group once and each group is joined from a list
+    slice; pandas' groupby.agg would build a Series per group instead.
+    """
+    if not len(groups):
+        # Every line was blank, e.g. split lines of a part without Ref Des
+        return pd.Series([], dtype=object)
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    values = text.to_numpy(dtype=object)[order].tolist()
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    bounds = np.r_[starts, len(values)].tolist()
+    if distinct:
+        joined = [', '.join(dict.fromkeys(values[a:b])) for a, b in zip(bounds, bounds[1:])]
+    else:
+        joined = [', '.join(values[a:b]) for a, b in zip(bounds, bounds[1:])]
+    return pd.Series(joined, index=sorted_groups[starts], dtype=object)
+
+def _sum_quantities(values, groups):
+    """Total quantity per group of split lines.
+    
+    Groups whose quantities are all numbers (or blank) are summed; any other
+    group lists its normalized quantities instead, so text like '2 pcs' is
+    never lost.
+    """
+    numbers = pd.to_numeric(values, errors='coerce')
+    normalized = normalize_qty(values)
+    blank = (normalized == '').to_numpy()
+    numeric = pd.Series(numbers.notna().to_numpy() | blank).groupby(groups).all()
+    sums = numbers.groupby(groups).sum(min_count=1).round(QTY_SUM_DECIMALS)
+    if numeric.all():
+        return sums
+    listed = _join_groups(normalized[~blank], groups[~blank])
+    return sums.astype(object).where(numeric, listed)
+
+def _join_text(values, groups, distinct=False):
+    """The non-blank text of each group, joined with ', ' (NaN for an all-blank group)."""
+    text = as_text(values)
+    present = (text.notna() & (text.str.strip() != '')).to_numpy()
+    return _join_groups(text[present], groups[present], distinct)
+
+def _collapse_parts(df, column_map, key):
+    """Collapse the rows sharing a normalized MPN into one part, in one groupby pass.
+    
+    Quantities of split lines are summed, their Ref Des and line numbers
+    joined; MPN and description come from the first row. Returns the part
+    columns (as _part_columns gives them) and the parts' keys, both in order
+    of first appearance.
+    """
+    codes, keys = pd.factorize(key.to_numpy())
+    cols = _part_columns(df, column_map, np.flatnonzero(~key.duplicated().to_numpy()))
+    split = np.bincount(codes)[codes] > 1
+    if not split.any():
+        return cols, keys
+    
+    rows = _part_columns(df, column_map, np.flatnonzero(split))
+    groups = codes[split]
+    # Line numbers become text for every part, which keeps to_display on its vectorized path
+    cols['line'] = cols['line'].astype(str).astype(object)
+    collapsed = {'line': _join_groups(rows['line'].astype(str), groups)}
+    if 'qty' in column_map:
+        collapsed['qty'] = _sum_quantities(rows['qty'], groups)
+    if 'refdes' in column_map:
+        collapsed['refdes'] = _join_text(rows['refdes'], groups)
+    if 'sheet' in cols:
+        collapsed['sheet'] = _join_text(rows['sheet'], groups, distinct=True)
+    
+    for name, values in collapsed.items():
+        column = cols[name]
+        if column.dtype != values.dtype:
+            # Joined text (or listed quantities) turns the column into objects
+            column = column.astype(object if object in (column.dtype, values.dtype) else values.dtype)
+        column.iloc[values.index.to_numpy()] = values.to_numpy()
+        cols[name] = column
+    logger.debug("Collapsed %d split lines into %d parts", int(split.sum()), len(np.unique(groups)))
+    return cols, keys
+
+def _take_parts(cols, positions):
+    """The given rows of collapsed part columns."""
+    return {name: values.iloc[positions].reset_index(drop=True) for name, values in cols.items()}
+
+def _display_columns(cols, positions):
+    """Convert the given rows of gathered part columns to display strings."""
+    return {name: to_display(values.iloc[positions]).tolist() for name, values in cols.items()}
+
+def _display_chunks(cols, rows=None):
+    """Yield display columns for the picked rows, DISPLAY_CHUNK_ROWS rows at a time."""
+    picked = np.arange(len(cols['mpn'])) if rows is None else np.flatnonzero(rows)
+    for start in range(0, len(picked), DISPLAY_CHUNK_ROWS):
+        yield _display_columns(cols, picked[start:start + DISPLAY_CHUNK_ROWS])
+
+def _iter_part_rows(cols, rows=None):
+    """Yield the standard per-part result rows, building them as they are consumed."""
+    for shown in _display_chunks(cols, rows):
+        for i in range(len(shown['mpn'])):
+            row = {
+                'MPN': shown['mpn'][i],
+                'Ref Des/LOC': shown['refdes'][i],
+                'Qty': shown['qty'][i],
+                'Description': shown['description'][i],
+                'Line Number': shown['line'][i]
+            }
+            if 'sheet' in shown:
+                row['Sheet'] = shown['sheet'][i]
+            yield row
+
+def _iter_modified_rows(cols1, cols2, changed):
+    """Yield the result rows of shared parts whose data changed between the files."""
+    for shown1, shown2 in zip(_display_chunks(cols1, changed), _display_chunks(cols2, changed)):
+        for i in range(len(shown1['mpn'])):
+            row = {
+                'MPN': shown1['mpn'][i],  # Use File1 MPN for display
+                'Ref Des/LOC': shown1['refdes'][i],  # Use File1 Ref Des for display
+                'File1 Ref Des': shown1['refdes'][i],
+                'File2 Ref Des': shown2['refdes'][i],
+                'File1 Qty': shown1['qty'][i],
+                'File2 Qty': shown2['qty'][i],
+                'File1 Description': shown1['description'][i],
+                'File2 Description': shown2['description'][i],
+                'File1 Line': shown1['line'][i],
+                'File2 Line': shown2['line'][i]
+            }
+            if 'sheet' in shown1:
+                row['File1 Sheet'] = shown1['sheet'][i]
+                row['File2 Sheet'] = shown2['sheet'][i]
+            yield row
+
+def _iter_unrecognized_rows(cols1, cols2, scores):
+    """Yield the result rows of near-matched parts, both files' values side by side."""
+    scores = iter(scores)
+    for shown1, shown2 in zip(_display_chunks(cols1), _display_chunks(cols2)):
+        for i in range(len(shown1['mpn'])):
+            yield {
+                'MPN': shown1['mpn'][i],
+                'File2 MPN': shown2['mpn'][i],
+                'Match Score': f"{next(scores):.2f}",
+                'Ref Des/LOC': shown1['refdes'][i],
+                'File1 Ref Des': shown1['refdes'][i],
+                'File2 Ref Des': shown2['refdes'][i],
+                'File1 Qty': shown1['qty'][i],
+                'File2 Qty': shown2['qty'][i],
+                'File1 Description': shown1['description'][i],
+                'File2 Description': shown2['description'][i],
+                'File1 Line': shown1['line'][i],
+                'File2 Line': shown2['line'][i]
+            }
+
+def _iter_refdes_changes(cols1, cols2, positions, added, removed):
+    """Yield the refdes_changes rows of shared parts whose designator sets differ."""
+    picked = np.zeros(len(cols1['mpn']), dtype=bool)
+    picked[positions] = True
+    changes = iter(zip(added, removed))
+    for shown1, shown2 in zip(_display_chunks(cols1, picked), _display_chunks(cols2, picked)):
+        for i in range(len(shown1['mpn'])):
+            gained, lost = next(changes)
+            yield {
+                'MPN': shown1['mpn'][i],
+                'Added Ref Des': format_designators(gained),
+                'Removed Ref Des': format_designators(lost),
+                'File1 Line': shown1['line'][i],
+                'File2 Line': shown2['line'][i]
+            }
+
+def comparison_cache_key(file1_hash, file2_hash, sheets='first'):
+    """Result cache key for comparing two files, given their content hashes and sheet mode."""
+    sheet_tag = '' if sheets == 'first' else f"-{sheets}"
+    # Near-match results depend on the configured threshold
+    return f"{file1_hash}-{file2_hash}{sheet_tag}-p{PARSE_CACHE_VERSION}-c{COMPARISON_VERSION}-m{MATCH_THRESHOLD}"
+
+def compare_boms(file1, file2, file1_hash=None, file2_hash=None):
     """Compare two BOM files and return differences."""
-    print("Starting BOM comparison...")
+    logger.debug("Starting BOM comparison...")
     
     # Read both files
-    df1, map1 = read_bom_with_auto_headers(file1)
-    df2, map2 = read_bom_with_auto_headers(file2)
+    bom1 = read_bom_cached(file1, file1_hash)
+    bom2 = read_bom_cached(file2, file2_hash)
+    return compare_parsed(bom1, bom2)
+
+def compare_parsed(bom1, bom2):
+    """Compare two already parsed (df, mapped_cols) BOMs and return differences."""
+    with _timed('diff'):
+        summary_stats, parts = _diff(bom1, bom2)
+        results = {category: list(rows) for category, rows in parts.items()}
+    results['summary_stats'] = summary_stats
+    return results
+
+def _diff(bom1, bom2):
+    """Classify the parts of two parsed BOMs.
+    
+    Returns the summary statistics and, per result category, an iterator
+    that builds the category's rows only as they are consumed.
+    """
+    df1, map1 = bom1
+    df2, map2 = bom2
     
     # Check for required MPN column
     if 'mpn' not in map1 or 'mpn' not in map2:
         raise ValueError("MPN column not found in one or both files")
-    
-    # Normalize values
-    def norm(val):
-        """Normalize values while preserving original MPN formatting."""
-        if pd.isna(val) or val == '' or str(val).lower() in ['nan', 'none', 'null', '']:
-            return ''
-        
-        # Convert to string and strip whitespace
-        val_str = str(val).strip()
-        
-        # Skip empty strings after stripping
-        if not val_str or val_str.lower() in ['nan', 'none', 'null']:
-            return ''
-        
-        # For MPN values, preserve original case and formatting
-        # Only convert to uppercase for comparison purposes
-        return val_str.upper()
+    _report('diff', rows_file1=len(df1), rows_file2=len(df2))
     
     # Create comparison keys
     mpn_col1 = df1.columns[map1['mpn']] if isinstance(map1['mpn'], int) else map1['mpn']
     mpn_col2 = df2.columns[map2['mpn']] if isinstance(map2['mpn'], int) else map2['mpn']
     
     # Use only MPN for comparison (not Ref Des) to find modified parts
-    key1 = df1[mpn_col1].apply(lambda x: norm(x))
-    key2 = df2[mpn_col2].apply(lambda x: norm(x))
+    key1 = normalize_text(df1[mpn_col1])
+    key2 = normalize_text(df2[mpn_col2])
     
     # Filter out empty/nan keys but keep original indices
-    # Create masks for valid entries
     mask1 = key1 != ''
     mask2 = key2 != ''
+    df1 = df1[mask1]
+    df2 = df2[mask2]
+    key1 = key1[mask1]
+    key2 = key2[mask2]
     
-    # Filter dataframes to only include rows with valid MPNs
-    df1_filtered = df1[mask1].copy()
-    df2_filtered = df2[mask2].copy()
-    
-    # Recalculate keys for filtered dataframes
-    key1_filtered = df1_filtered[mpn_col1].apply(lambda x: norm(x))
-    key2_filtered = df2_filtered[mpn_col2].apply(lambda x: norm(x))
+    # Collapse each file to one part per MPN, then join the two part lists.
+    # The merge indicator splits keys into removed/new/shared in one pass.
+    parts1, keys1 = _collapse_parts(df1, map1, key1)
+    parts2, keys2 = _collapse_parts(df2, map2, key2)
+    merged = _key_positions(keys1).merge(
+        _key_positions(keys2), on='key', how='outer', suffixes=('1', '2'), indicator=True
+    )
+    removed = merged[merged['_merge'] == 'left_only'].sort_values('pos1')
+    added = merged[merged['_merge'] == 'right_only'].sort_values('pos2')
+    shared = merged[merged['_merge'] == 'both'].sort_values('pos1')
+    logger.debug("Parts: %d new, %d removed, %d in both files", len(added), len(removed), len(shared))
     
-    set1 = set(key1_filtered)
-    set2 = set(key2_filtered)
+    # Removed and new parts whose MPNs nearly match ("LM358DR" / "LM358DR-T")
+    # are reported together as unrecognized parts instead
+    matches = match_mpns(removed['key'].tolist(), added['key'].tolist())
+    matches.sort(key=lambda match: match[0])
+    matched1 = removed.iloc[[i for i, _, _ in matches]]
+    matched2 = added.iloc[[j for _, j, _ in matches]]
+    removed = removed.drop(matched1.index)
+    added = added.drop(matched2.index)
+    unrecognized1 = _take_parts(parts1, matched1['pos1'].to_numpy(dtype=int))
+    unrecognized2 = _take_parts(parts2, matched2['pos2'].to_numpy(dtype=int))
+    logger.debug("Near MPN matches: %d", len(matches))
     
-    # Use filtered data for comparison
-    df1 = df1_filtered
-    df2 = df2_filtered
-    key1 = key1_filtered
-    key2 = key2_filtered
+    # Find differences
+    new_cols = _take_parts(parts2, added['pos2'].to_numpy(dtype=int))
+    removed_cols = _take_parts(parts1, removed['pos1'].to_numpy(dtype=int))
     
-    # Helper function to get values safely
-    def safe_get_value(df, key_series, key, column_map, column_name):
-        if column_name not in column_map:
-            return 'N/A'
-        
-        col_name = column_map[column_name]
-        if isinstance(col_name, int):
-            col_name = df.columns[col_name]
-        
-        filtered = df.loc[key_series == key, col_name]
-        if filtered.empty:
-            return 'N/A'
-        return filtered.iloc[0]
-    
-    # Helper function to get original MPN value (not normalized)
-    def get_original_mpn(df, key_series, key, column_map):
-        if 'mpn' not in column_map:
-            return 'N/A'
-        
-        col_name = column_map['mpn']
-        if isinstance(col_name, int):
-            col_name = df.columns[col_name]
-        
-        filtered = df.loc[key_series == key, col_name]
-        if filtered.empty:
-            return 'N/A'
-        
-        # Get the original value and format it properly
-        original_val = filtered.iloc[0]
-        if pd.isna(original_val):
-            return 'N/A'
-        
-        # Format as integer if it's a whole number, otherwise as string
-        if isinstance(original_val, (int, float)) and original_val == int(original_val):
-            return str(int(original_val))
-        else:
-            return str(original_val).strip()
-    
-    # Helper function to get Ref Des/LOC value
-    def get_refdes_value(df, key_series, key, column_map):
-        print(f"DEBUG get_refdes_value: key={key}, column_map={column_map}")
-        if 'refdes' not in column_map:
-            print(f"  No 'refdes' in column_map, returning N/A")
-            return 'N/A'
-        
-        col_name = column_map['refdes']
-        if isinstance(col_name, int):
-            col_name = df.columns[col_name]
-        print(f"  Using refdes column: {col_name}")
-        
-        filtered = df.loc[key_series == key, col_name]
-        print(f"  Filtered data: {filtered}")
-        if filtered.empty:
-            print(f"  Filtered is empty, returning N/A")
-            return 'N/A'
-        
-        refdes_val = filtered.iloc[0]
-        print(f"  Raw refdes_val: {refdes_val} (type: {type(refdes_val)})")
-        if pd.isna(refdes_val):
-            print(f"  refdes_val is NaN, returning N/A")
-            return 'N/A'
-        
-        result = str(refdes_val).strip()
-        print(f"  Final result: '{result}'")
-        return result
+    # Modified parts (same part, different total qty/description)
+    cols1 = _take_parts(parts1, shared['pos1'].to_numpy(dtype=int))
+    cols2 = _take_parts(parts2, shared['pos2'].to_numpy(dtype=int))
+    qty_changed = normalize_qty(cols1['qty']).to_numpy() != normalize_qty(cols2['qty']).to_numpy()
+    desc_changed = normalize_text(cols1['description']).to_numpy() != normalize_text(cols2['description']).to_numpy()
+    changed = qty_changed | desc_changed
+    modified_count = int(changed.sum())
     
-    # Find differences
-    new_parts = []
-    removed_parts = []
-    modified_parts = []
-    unchanged_parts = []
-    unrecognized_parts = []
-    
-    # New parts (in File 2, not in File 1)
-    for k in set2 - set1:
-        # Get original MPN value for display
-        original_mpn = get_original_mpn(df2, key2, k, map2)
-        refdes = get_refdes_value(df2, key2, k, map2)
-        line_idx = key2[key2 == k].index[0]
-        line_number = line_idx + 2  # +2 because Excel is 1-indexed and we have header row
-        
-        new_parts.append({
-            'MPN': original_mpn,
-            'Ref Des/LOC': refdes,
-            'Qty': safe_get_value(df2, key2, k, map2, 'qty'),
-            'Description': safe_get_value(df2, key2, k, map2, 'description'),
-            'Line Number': line_number
-        })
-    
-    # Removed parts (in File 1, not in File 2)
-    for k in set1 - set2:
-        # Get original MPN value for display
-        original_mpn = get_original_mpn(df1, key1, k, map1)
-        refdes = get_refdes_value(df1, key1, k, map1)
-        line_idx = key1[key1 == k].index[0]
-        line_number = line_idx + 2  # +2 because Excel is 1-indexed and we have header row
-        
-        removed_parts.append({
-            'MPN': original_mpn,
-            'Ref Des/LOC': refdes,
-            'Qty': safe_get_value(df1, key1, k, map1, 'qty'),
-            'Description': safe_get_value(df1, key1, k, map1, 'description'),
-            'Line Number': line_number
-        })
-    
-    # Modified parts (same part, different qty/description)
-    for k in set1 & set2:
-        # Get values from both files
-        qty1 = safe_get_value(df1, key1, k, map1, 'qty')
-        qty2 = safe_get_value(df2, key2, k, map2, 'qty')
-        desc1 = safe_get_value(df1, key1, k, map1, 'description')
-        desc2 = safe_get_value(df2, key2, k, map2, 'description')
-        
-        # Normalize quantities for comparison (handle numeric vs string)
-        def normalize_qty(qty_str):
-            if pd.isna(qty_str) or qty_str == '' or str(qty_str).lower() == 'nan':
-                return ''
-            try:
-                # Convert to float first, then to int if it's a whole number
-                qty_float = float(str(qty_str))
-                if qty_float == int(qty_float):
-                    return str(int(qty_float))
-                else:
-                    return str(qty_float)
-            except:
-                return str(qty_str).strip()
-        
-        qty1_norm = normalize_qty(qty1)
-        qty2_norm = normalize_qty(qty2)
-        
-        # Normalize descriptions
-        desc1_norm = norm(desc1)
-        desc2_norm = norm(desc2)
-        
-        # Check for differences
-        qty_changed = qty1_norm != qty2_norm
-        desc_changed = desc1_norm != desc2_norm
-        
-        print(f"Comparing part {k}:")
-        print(f"  Qty1: '{qty1}' -> '{qty1_norm}'")
-        print(f"  Qty2: '{qty2}' -> '{qty2_norm}'")
-        print(f"  Qty changed: {qty_changed}")
-        print(f"  Desc1: '{desc1}' -> '{desc1_norm}'")
-        print(f"  Desc2: '{desc2}' -> '{desc2_norm}'")
-        print(f"  Desc changed: {desc_changed}")
-        
-        if qty_changed or desc_changed:
-            print(f"  -> Adding to modified parts")
-            # Get original MPN values from both files
-            original_mpn1 = get_original_mpn(df1, key1, k, map1)
-            original_mpn2 = get_original_mpn(df2, key2, k, map2)
-            refdes1 = get_refdes_value(df1, key1, k, map1)
-            refdes2 = get_refdes_value(df2, key2, k, map2)
-            line1_idx = key1[key1 == k].index[0]
-            line2_idx = key2[key2 == k].index[0]
-            line1_number = line1_idx + 2  # +2 because Excel is 1-indexed and we have header row
-            line2_number = line2_idx + 2  # +2 because Excel is 1-indexed and we have header row
-            
-            # Debug: Log the ref des values being added
-            print(f"DEBUG: Adding modified part {original_mpn1}")
-            print(f"  refdes1 (File1): '{refdes1}' (type: {type(refdes1)})")
-            print(f"  refdes2 (File2): '{refdes2}' (type: {type(refdes2)})")
-            
-            modified_part = {
-                'MPN': original_mpn1,  # Use File1 MPN for display
-                'Ref Des/LOC': refdes1,  # Use File1 Ref Des for display
-                'File1 Ref Des': refdes1,  # Add File1 Ref Des
-                'File2 Ref Des': refdes2,  # Add File2 Ref Des
-                'File1 Qty': qty1,
-                'File2 Qty': qty2,
-                'File1 Description': desc1,
-                'File2 Description': desc2,
-                'File1 Line': line1_number,
-                'File2 Line': line2_number
-            }
-            print(f"  Final modified_part: {modified_part}")
-            modified_parts.append(modified_part)
-        else:
-            print(f"  -> Adding to unchanged parts")
-            # Get original MPN value for display
-            original_mpn = get_original_mpn(df1, key1, k, map1)
-            refdes = get_refdes_value(df1, key1, k, map1)
-            line_idx = key1[key1 == k].index[0]
-            line_number = line_idx + 2  # +2 because Excel is 1-indexed and we have header row
-            
-            unchanged_parts.append({
-                'MPN': original_mpn,
-                'Ref Des/LOC': refdes,
-                'Qty': qty1,
-                'Description': desc1,
-                'Line Number': line_number
-            })
+    # Designators gained and lost per shared part; "R1-R4" equals "R1,R2,R3,R4"
+    if 'refdes' in map1 and 'refdes' in map2:
+        refdes_positions, added_refdes, removed_refdes = designator_changes(cols1['refdes'], cols2['refdes'])
+    else:
+        refdes_positions, added_refdes, removed_refdes = [], [], []
     
     # Summary statistics
     summary_stats = {
-        'total_parts_file1': len(set1),
-        'total_parts_file2': len(set2),
-        'new_parts_count': len(new_parts),
-        'removed_parts_count': len(removed_parts),
-        'modified_parts_count': len(modified_parts),
-        'unchanged_parts_count': len(unchanged_parts),
-        'unrecognized_parts_count': len(unrecognized_parts)
+        'total_parts_file1': len(removed) + len(shared) + len(matches),
+        'total_parts_file2': len(added) + len(shared) + len(matches),
+        'new_parts_count': len(added),
+        'removed_parts_count': len(removed),
+        'modified_parts_count': modified_count,
+        'unchanged_parts_count': len(shared) - modified_count,
+        'unrecognized_parts_count': len(matches),
+        'refdes_changes_count': len(refdes_positions)
     }
     
-    # Convert all values to strings for web display
-    def to_str_dict_list(lst):
-        def clean_value(v):
-            if pd.isna(v) or v == '' or str(v).lower() in ['nan', 'none', 'null']:
-                return 'N/A'
-            # Format numbers properly
-            if isinstance(v, (int, float)) and not pd.isna(v):
-                if v == int(v):
-                    return str(int(v))
-                else:
-                    return str(v)
-            val_str = str(v).strip()
-            if not val_str or val_str.lower() in ['nan', 'none', 'null']:
-                return 'N/A'
-            return val_str
-        
-        return [{k: clean_value(v) for k, v in row.items()} for row in lst]
+    parts = {
+        'new_parts': _iter_part_rows(new_cols),
+        'removed_parts': _iter_part_rows(removed_cols),
+        'modified_parts': _iter_modified_rows(cols1, cols2, changed),
+        'unchanged_parts': _iter_part_rows(cols1, ~changed),
+        'unrecognized_parts': _iter_unrecognized_rows(unrecognized1, unrecognized2, [score for _, _, score in matches]),
+        'refdes_changes': _iter_refdes_changes(cols1, cols2, refdes_positions, added_refdes, removed_refdes)
+    }
+    return summary_stats, parts
+
+def comparison_records(summary_stats, parts):
+    """Records for streaming a comparison: the summary first, then one per part.
     
+    ``parts`` maps each result category to its rows, as _diff returns them
+    or as they appear in a compare_boms result.
+    """
+    yield {'summary_stats': summary_stats}
+    for category, rows in parts.items():
+        for part in rows:
+            yield {'category': category, 'part': part}
+
+def result_records(results):
+    """comparison_records for a finished compare_boms result."""
+    return comparison_records(
+        results['summary_stats'],
+        {category: results[category] for category in RESULT_CATEGORIES}
+    )
+
+def write_comparison_ndjson(file1, file2, out_path, file1_hash=None, file2_hash=None):
+    """Compare two BOM files, appending the records to ``out_path`` as NDJSON.
+    
+    Each record is written as soon as it is built, so a reader can stream
+    the file while the comparison is still running.
+    """
+    logger.debug("Starting streamed BOM comparison...")
+    summary_stats, parts = _diff(read_bom_cached(file1, file1_hash), read_bom_cached(file2, file2_hash))
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for record in comparison_records(summary_stats, parts):
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+# How the files of a batch are paired up for comparison
+BATCH_PAIRINGS = ('chain', 'star', 'all')
+
+def batch_pairs(count, pairing='chain'):
+    """Index pairs to compare among ``count`` files.
+    
+    - chain: each file against the next one (Rev A->B, B->C, ...)
+    - star: the first file against every other one
+    - all: every file against every later one
+    """
+    if pairing == 'chain':
+        return [(i, i + 1) for i in range(count - 1)]
+    if pairing == 'star':
+        return [(0, i) for i in range(1, count)]
+    if pairing == 'all':
+        return list(itertools.combinations(range(count), 2))
+    raise ValueError(f"Unknown pairing '{pairing}', expected one of {', '.join(BATCH_PAIRINGS)}")
+
+def compare_parsed_safe(bom1, bom2):
+    """compare_parsed for batches: a pair that cannot be compared gives an error entry."""
+    try:
+        return compare_parsed(bom1, bom2)
+    except ValueError as e:
+        return {'error': str(e)}
+
+def combine_batch_results(names, pairing, pairs, results):
+    """Combine per-pair results into one batch result with a summary row per pair."""
+    comparisons = []
+    summary = []
+    for (i, j), result in zip(pairs, results):
+        files = {'file1': names[i], 'file2': names[j]}
+        comparisons.append(dict(files, **result))
+        if 'error' in result:
+            summary.append(dict(files, error=result['error']))
+        else:
+            summary.append(dict(files, **result['summary_stats']))
     return {
-        'new_parts': to_str_dict_list(new_parts),
-        'removed_parts': to_str_dict_list(removed_parts),
-        'modified_parts': to_str_dict_list(modified_parts),
-        'unchanged_parts': to_str_dict_list(unchanged_parts),
-        'unrecognized_parts': to_str_dict_list(unrecognized_parts),
-        'summary_stats': summary_stats
-    } 
\ No newline at end of file
+        'pairing': pairing,
+        'files': list(names),
+        'summary': summary,
+        'comparisons': comparisons
+    }
+
+def compare_bom_batch(files, pairing='chain', names=None, hashes=None, map_fn=map):
+    """Compare N BOM files according to a pairing, parsing each file once.
+    
+    Args:
+        files: BOM file paths
+        pairing: 'chain', 'star' or 'all' (see batch_pairs)
+        names: display names for the files (default: base names)
+        hashes: content hashes of the files, if already known
+        map_fn: map-like function used for the parse and compare steps; pass
+            an executor's map to run them in parallel
+    
+    Returns the combine_batch_results dict. Pairs whose files cannot be
+    compared carry an 'error' instead of results.
+    """
+    pairs = batch_pairs(len(files), pairing)
+    names = names or [os.path.basename(f) for f in files]
+    hashes = hashes or [None] * len(files)
+    
+    boms = list(map_fn(read_bom_cached, files, hashes))
+    results = list(map_fn(
+        compare_parsed_safe,
+        [boms[i] for i, _ in pairs],
+        [boms[j] for _, j in pairs]
+    ))
+    return combine_batch_results(names, pairing, pairs, results)
+
+# How the sheets of a workbook are compared:
+# - first: only the first sheet, whatever it holds
+# - merge: every BOM-like sheet, merged into one BOM whose rows carry their sheet
+# - each: every BOM-like sheet against the same-named sheet of the other file
+SHEET_MODES = ('first', 'merge', 'each')
+
+# Standard columns of a merged multi-sheet BOM
+MERGED_COLUMNS = ('mpn', 'qty', 'refdes', 'description')
+
+def find_bom_sheets(file_path):
+    """(index, name) of the sheets of a workbook that look like a BOM.
+    
+    A sheet qualifies when header detection on its leading rows maps an MPN
+    column. Sheets are never parsed past those rows, and sheets without a
+    single header-like cell skip detection altogether.
+    """
+    found = []
+    for index, (name, head) in enumerate(iter_sheet_heads(file_path)):
+        if not any(isinstance(cell, str) and header_cell_score(cell) for row in head for cell in row):
+            logger.debug("Sheet '%s' has no header-like cells, skipped", name)
+            continue
+        _, _, col_map = _detect_header(head)
+        if 'mpn' in col_map:
+            found.append((index, name))
+        else:
+            logger.debug("Sheet '%s' has no MPN column, skipped", name)
+    return found
+
+def merge_sheet_boms(boms, names):
+    """One parsed BOM from the parsed (df, mapped_cols) BOMs of several sheets.
+    
+    The mapped columns are renamed to the standard keys plus a 'sheet'
+    column; a key only some sheets map is blank on the others' rows, so it
+    shows as N/A and never joins a split line's Ref Des or quantity. Rows
+    keep their index within their sheet, so line numbers still point into
+    that sheet.
+    """
+    keys = [key for key in MERGED_COLUMNS if any(key in mapped_cols for _, mapped_cols in boms)]
+    frames = []
+    for (df, mapped_cols), name in zip(boms, names):
+        frame = pd.DataFrame(
+            {key: df[mapped_cols[key]] if key in mapped_cols else np.nan for key in keys},
+            index=df.index
+        )
+        frame['sheet'] = name
+        frames.append(frame)
+    mapped_cols = {key: key for key in keys + ['sheet']}
+    return _compact_columns(pd.concat(frames), mapped_cols), mapped_cols
+
+def compare_merged_sheets(boms1, names1, boms2, names2):
+    """compare_parsed of two files' BOM sheets, each file's sheets merged into one BOM."""
+    results = compare_parsed(merge_sheet_boms(boms1, names1), merge_sheet_boms(boms2, names2))
+    results['sheets'] = {'file1': list(names1), 'file2': list(names2)}
+    return results
+
+def pair_sheets(names1, names2):
+    """Sheet position pairs to compare: same-named sheets, None for a sheet only one file has.
+    
+    Two files with a single BOM sheet each are compared whatever the sheets
+    are called.
+    """
+    if len(names1) == 1 and len(names2) == 1:
+        return [(0, 0)]
+    pairs = [(i, names2.index(name) if name in names2 else None) for i, name in enumerate(names1)]
+    pairs.extend((None, j) for j, name in enumerate(names2) if name not in names1)
+    return pairs
+
+def combine_sheet_results(names1, names2, pairs, results):
+    """Combine per-sheet results into one result with a summary row per sheet pair.
+    
+    ``results`` only holds the results of pairs with a sheet on both sides;
+    a sheet only one file has gets an error entry.
+    """
+    results = iter(results)
+    comparisons = []
+    summary = []
+    for i, j in pairs:
+        sheets = {
+            'sheet1': names1[i] if i is not None else None,
+            'sheet2': names2[j] if j is not None else None
+        }
+        if j is None:
+            result = {'error': f"Sheet '{names1[i]}' is only in file1"}
+        elif i is None:
+            result = {'error': f"Sheet '{names2[j]}' is only in file2"}
+        else:
+            result = next(results)
+        comparisons.append(dict(sheets, **result))
+        if 'error' in result:
+            summary.append(dict(sheets, error=result['error']))
+        else:
+            summary.append(dict(sheets, **result['summary_stats']))
+    return {'sheets': {'file1': list(names1), 'file2': list(names2)}, 'summary': summary, 'comparisons': comparisons}
+
+def compare_boms_sheets(file1, file2, mode='merge', file1_hash=None, file2_hash=None, map_fn=map):
+    """Compare every BOM-like sheet of two workbooks.
+    
+    Args:
+        file1, file2: BOM file paths
+        mode: 'merge' or 'each' (see SHEET_MODES)
+        file1_hash, file2_hash: content hashes of the files, if already known
+        map_fn: map-like function used for finding, parsing and comparing
+            the sheets; pass an executor's map to parse the sheets in parallel
+    
+    Returns the compare_merged_sheets result for 'merge', the
+    combine_sheet_results dict for 'each'.
+    """
+    found1, found2 = map_fn(find_bom_sheets, [file1, file2])
+    if not found1 or not found2:
+        raise ValueError("MPN column not found in any sheet of one or both files")
+    tasks = [(file1, file1_hash, index) for index, _ in found1] + [(file2, file2_hash, index) for index, _ in found2]
+    boms = list(map_fn(read_bom_cached, *zip(*tasks)))
+    boms1, boms2 = boms[:len(found1)], boms[len(found1):]
+    names1 = [name for _, name in found1]
+    names2 = [name for _, name in found2]
+    if mode == 'merge':
+        return compare_merged_sheets(boms1, names1, boms2, names2)
+    if mode != 'each':
+        raise ValueError(f"Unknown sheet mode '{mode}', expected merge or each")
+    pairs = pair_sheets(names1, names2)
+    compared = [(i, j) for i, j in pairs if i is not None and j is not None]
+    results = map_fn(compare_parsed_safe, [boms1[i] for i, _ in compared], [boms2[j] for _, j in compared])
+    return combine_sheet_results(names1, names2, pairs, list(results))
+
+@contextlib.contextmanager
+def report_progress(callback):
+    """Send progress events to ``callback(phase, details)`` while the block runs.
+    
+    Phases are header_detection and parse (once per file, with a ``path``
+    detail) and diff. Meant for a worker process running one job at a time.
+    """
+    global _progress_callback
+    previous, _progress_callback = _progress_callback, callback
+    try:
+        yield
+    finally:
+        _progress_callback = previous
+
+def _report(phase, **details):
+    if _progress_callback is not None:
+        _progress_callback(phase, details)
+
+@contextlib.contextmanager
+def time_phases():
+    """Collect the seconds spent per phase while the block runs.
+    
+    Yields a dict of phase to seconds, filled in as header_detection, parse
+    (everything else of reading a file, including parse cache lookups) and
+    diff (classifying the parts and building the result rows) finish. Each
+    phase's time excludes the phases timed inside it.
+    """
+    global _phase_timings
+    previous, _phase_timings = _phase_timings, {}
+    try:
+        yield _phase_timings
+    finally:
+        _phase_timings = previous
+
+@contextlib.contextmanager
+def _timed(phase):
+    timings = _phase_timings
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    _open_phases.append(phase)
+    try:
+        yield
+    finally:
+        _open_phases.pop()
+        elapsed = time.perf_counter() - start
+        timings[phase] = timings.get(phase, 0.0) + elapsed
+        if _open_phases:
+            # The enclosing phase only keeps its own time
+            timings[_open_phases[-1]] = timings.get(_open_phases[-1], 0.0) - elapsed
+
+def compare_boms_timed(file1, file2, file1_hash=None, file2_hash=None):
+    """Run compare_boms, also returning {'phases': seconds per phase, 'rows_parsed': n}."""
+    parsed = []
+    
+    def count_rows(phase, details):
+        if phase == 'parse' and not details.get('cached'):
+            parsed.append(details['rows'])
+    
+    with report_progress(count_rows), time_phases() as phases:
+        results = compare_boms(file1, file2, file1_hash, file2_hash)
+    return results, {'phases': phases, 'rows_parsed': sum(parsed)}
+
+@contextlib.contextmanager
+def capture_debug_log():
+    """Collect this module's debug trace while the block runs.
+    
+    Yields a StringIO holding the formatted trace. Meant for per-request debug
+    mode in a worker process, where only one comparison runs at a time.
+    The parse cache and stored header layouts are bypassed meanwhile, so a
+    file uploaded before is traced as fully as the first time.
+    """
+    global _tracing
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    previous_level, previous_propagate = logger.level, logger.propagate
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    previous_tracing, _tracing = _tracing, True
+    try:
+        yield stream
+    finally:
+        _tracing = previous_tracing
+        logger.removeHandler(handler)
+        logger.setLevel(previous_level)
+        logger.propagate = previous_propagate
+
+def compare_boms_traced(file1, file2, file1_hash=None, file2_hash=None):
+    """compare_boms_timed with its debug trace captured into the results."""
+    with capture_debug_log() as trace:
+        results, stats = compare_boms_timed(file1, file2, file1_hash, file2_hash)
+    return dict(results, debug_log=trace.getvalue().splitlines()), stats
@@ -0,0 +1,35 @@
+import json
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used instead
+    orjson = None
+
+def _default(obj):
+    """Encode numpy scalars, the only non-JSON values a result can hold."""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content):
+    """Serialize a comparison result to UTF-8 JSON bytes.
+
+    Results are already plain dicts, lists and strings, so they are encoded
+    directly instead of being walked by jsonable_encoder first. Uses orjson
+    when it is installed and the standard library otherwise; both give the
+    same JSON as JSONResponse.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+class FastJSONResponse(Response):
+    """JSONResponse for comparison results, rendered with dumps()."""
+
+    media_type = 'application/json'
+
+    def render(self, content):
+        return dumps(content)
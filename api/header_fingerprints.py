@@ -0,0 +1,312 @@
+import atexit
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from header_matcher import column_roles
+
+logger = logging.getLogger(__name__)
+
+# Shared values must come from the same context as the worker pool's processes
+_SPAWN = multiprocessing.get_context('spawn')
+
+# Per-layout hit counts are kept in memory and written once this many hits or
+# seconds have built up, so a lookup never waits on the SQLite write lock
+HIT_FLUSH_COUNT = 100
+HIT_FLUSH_SECONDS = 30
+
+# A layout is only used for lookups once detection has produced it this
+# many times, so one-off layouts never make the workers reload the store
+PIN_AFTER_SEEN = 2
+
+# Pinned layouts kept at most, and as many not pinned yet; beyond it the
+# least hit and least recently used (or oldest unpinned) are dropped
+DEFAULT_MAX_ENTRIES = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    header_row INTEGER NOT NULL,
+    header TEXT NOT NULL,
+    col_map TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_hit_at REAL,
+    version INTEGER NOT NULL DEFAULT 0,
+    seen INTEGER NOT NULL DEFAULT 1
+)
+"""
+
+def _cell_text(cell):
+    if cell is None or (isinstance(cell, float) and cell != cell):
+        return ''
+    return str(cell)
+
+def header_cells(row):
+    """The text of a header row's cells, without the empty cells at its end."""
+    cells = [_cell_text(cell) for cell in row]
+    while cells and cells[-1] == '':
+        cells.pop()
+    return cells
+
+def _fits(row, col_map):
+    """Whether every column of a stored map still holds a header of its role in ``row``."""
+    if 'mpn' not in col_map:
+        return False
+    for key, idx in col_map.items():
+        if idx >= len(row) or not getattr(column_roles(_cell_text(row[idx])), key):
+            return False
+    return True
+
+def fingerprint(row, header_row, version=0):
+    """Fingerprint of a header row's cell text, its position in the sheet and the detection rules' version."""
+    text = '\x1f'.join(header_cells(row))
+    return hashlib.sha256(f"{version}\x1e{header_row}\x1e{text}".encode('utf-8')).hexdigest()[:32]
+
+class HeaderFingerprintStore:
+    """Header layouts of known BOM templates, so their header detection can be skipped.
+
+    Each entry maps the fingerprint of a detected header row (its cell text
+    and row index) to the column map detection produced for it. A sheet
+    whose row has a known fingerprint at that same index reuses the entry.
+
+    Entries live in a SQLite file shared by all workers; each process keeps
+    a copy in memory and reloads it when ``generation`` (shared with the
+    workers, like the hit/miss counters) shows another process changed it.
+    
+    Each entry records the version of the detection rules that produced
+    it (the caller's PARSE_CACHE_VERSION). Lookups only see entries of the
+    current version, and storing a layout drops those of other versions,
+    so a store kept across deploys never replays outdated column maps.
+    
+    Entries are only looked up once pinned, after PIN_AFTER_SEEN
+    detections of the same layout; only pinning one changes
+    ``generation``. At most ``max_entries`` pinned entries are kept, and
+    as many that are not pinned yet.
+    """
+
+    COUNTERS = ('hits', 'misses', 'generation')
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.counters = {name: _SPAWN.Value('q', 0) for name in self.COUNTERS}
+        self._entries = None
+        self._loaded_key = None
+        self._schema_ready = False
+        # Hits not yet written: fingerprint -> [count, time of the last hit]
+        self._pending_hits = {}
+        self._flushed_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        """Build the store from BOM_HEADER_FINGERPRINT_DB (empty disables it) and BOM_HEADER_FINGERPRINT_MAX."""
+        default = os.path.join(tempfile.gettempdir(), 'bom-header-fingerprints.sqlite3')
+        return cls(
+            os.environ.get('BOM_HEADER_FINGERPRINT_DB', default) or None,
+            int(os.environ.get('BOM_HEADER_FINGERPRINT_MAX') or DEFAULT_MAX_ENTRIES)
+        )
+
+    def share_counters(self, counters):
+        """Use counters created in another process (worker pool initializer)."""
+        self.counters = counters
+
+    def _count(self, name):
+        counter = self.counters[name]
+        with counter.get_lock():
+            counter.value += 1
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection for one transaction, closed afterwards so no worker holds the file open."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                if not self._schema_ready:
+                    connection.execute(_SCHEMA)
+                    columns = {row[1] for row in connection.execute('PRAGMA table_info(fingerprints)')}
+                    # Stores created before entries were versioned; their rows become version 0
+                    if 'version' not in columns:
+                        connection.execute('ALTER TABLE fingerprints ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+                    # Stores created before layouts were pinned; their rows stay in use
+                    if 'seen' not in columns:
+                        connection.execute(
+                            f'ALTER TABLE fingerprints ADD COLUMN seen INTEGER NOT NULL DEFAULT {PIN_AFTER_SEEN}'
+                        )
+                    self._schema_ready = True
+                yield connection
+        finally:
+            connection.close()
+
+    def _changed(self):
+        self._count('generation')
+
+    def _load(self, version):
+        loaded_key = (self.counters['generation'].value, version)
+        if self._entries is not None and loaded_key == self._loaded_key:
+            return self._entries
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT fingerprint, header_row, col_map FROM fingerprints WHERE version = ? AND seen >= ?',
+                (version, PIN_AFTER_SEEN)
+            ).fetchall()
+        self._entries = {key: (header_row, json.loads(col_map)) for key, header_row, col_map in rows}
+        self._loaded_key = loaded_key
+        return self._entries
+
+    def match(self, rows, version=0):
+        """(header_row, col_map) of the first of ``rows`` with a known fingerprint, or None.
+        
+        A stored map is only used when its MPN column (and every other
+        mapped column) holds a header of that role in the matched row;
+        otherwise the scan goes on, and without a fitting row the caller
+        falls back to full detection.
+        """
+        if not self.path:
+            return None
+        try:
+            entries = self._load(version)
+            for header_row, row in enumerate(rows):
+                key = fingerprint(row, header_row, version)
+                if key in entries and _fits(row, entries[key][1]):
+                    self._count('hits')
+                    self._record_hit(key)
+                    _, col_map = entries[key]
+                    return header_row, dict(col_map)
+        except sqlite3.Error as e:
+            logger.warning("Header fingerprint lookup failed: %s", e)
+            return None
+        self._count('misses')
+        return None
+
+    def _record_hit(self, key):
+        pending = self._pending_hits.setdefault(key, [0, None])
+        pending[0] += 1
+        pending[1] = time.time()
+        if (sum(count for count, _ in self._pending_hits.values()) >= HIT_FLUSH_COUNT
+                or time.monotonic() - self._flushed_at >= HIT_FLUSH_SECONDS):
+            self.flush_hits()
+
+    def flush_hits(self):
+        """Write the hits counted in this process since the last flush."""
+        pending, self._pending_hits = self._pending_hits, {}
+        self._flushed_at = time.monotonic()
+        if not pending or not self.path:
+            return
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    'UPDATE fingerprints SET hits = hits + ?, last_hit_at = MAX(COALESCE(last_hit_at, 0), ?) '
+                    'WHERE fingerprint = ?',
+                    [(count, last_hit_at, key) for key, (count, last_hit_at) in pending.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning("Could not store header fingerprint hits: %s", e)
+
+    def remember(self, row, header_row, col_map, version=0):
+        """Record that detection mapped the header ``row`` at index ``header_row`` to ``col_map``.
+        
+        The layout is pinned, and used by match, once it has been detected
+        PIN_AFTER_SEEN times.
+        """
+        if not self.path:
+            return
+        key = fingerprint(row, header_row, version)
+        try:
+            with self._connect() as connection:
+                # Layouts detected by other rules would never be looked up again
+                connection.execute('DELETE FROM fingerprints WHERE version != ?', (version,))
+                seen, = connection.execute(
+                    'INSERT INTO fingerprints (fingerprint, header_row, header, col_map, created_at, version, seen) '
+                    'VALUES (?, ?, ?, ?, ?, ?, 1) '
+                    'ON CONFLICT (fingerprint) DO UPDATE SET col_map = excluded.col_map, seen = seen + 1 '
+                    'RETURNING seen',
+                    (key, header_row, json.dumps(header_cells(row)), json.dumps(col_map), time.time(), version)
+                ).fetchone()
+                # Past the limit, the oldest unpinned layouts and the least hit,
+                # least recently used pinned ones are dropped
+                connection.execute(
+                    'DELETE FROM fingerprints WHERE fingerprint IN ('
+                    'SELECT fingerprint FROM fingerprints WHERE seen < ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                    (PIN_AFTER_SEEN, self.max_entries)
+                )
+                connection.execute(
+                    'DELETE FROM fingerprints WHERE fingerprint IN ('
+                    'SELECT fingerprint FROM fingerprints WHERE seen >= ? '
+                    'ORDER BY hits DESC, COALESCE(last_hit_at, created_at) DESC LIMIT -1 OFFSET ?)',
+                    (PIN_AFTER_SEEN, self.max_entries)
+                )
+        except sqlite3.Error as e:
+            logger.warning("Could not store header fingerprint: %s", e)
+            return
+        if seen >= PIN_AFTER_SEEN:
+            self._changed()
+
+    def entries(self):
+        """Every stored layout, most used first.
+        
+        Hit counts lag behind by the hits workers have not flushed yet (at
+        most HIT_FLUSH_COUNT or HIT_FLUSH_SECONDS worth per worker).
+        """
+        if not self.path:
+            return []
+        self.flush_hits()
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT fingerprint, header_row, header, col_map, hits, created_at, last_hit_at, version, seen '
+                'FROM fingerprints ORDER BY hits DESC, created_at'
+            ).fetchall()
+        return [
+            {
+                'fingerprint': key,
+                'header_row': header_row,
+                'header': json.loads(header),
+                'col_map': json.loads(col_map),
+                'hits': hits,
+                'created_at': created_at,
+                'last_hit_at': last_hit_at,
+                'version': version,
+                'pinned': seen >= PIN_AFTER_SEEN
+            }
+            for key, header_row, header, col_map, hits, created_at, last_hit_at, version, seen in rows
+        ]
+
+    def invalidate(self, key=None):
+        """Forget one layout, or all of them without ``key``; returns how many were removed."""
+        if not self.path:
+            return 0
+        with self._connect() as connection:
+            if key is None:
+                removed = connection.execute('DELETE FROM fingerprints').rowcount
+            else:
+                removed = connection.execute('DELETE FROM fingerprints WHERE fingerprint = ?', (key,)).rowcount
+        if removed:
+            self._changed()
+        return removed
+
+    def stats(self):
+        """Hit/miss counters across all workers, plus the number of stored layouts."""
+        stats = {name: self.counters[name].value for name in ('hits', 'misses')}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['enabled'] = bool(self.path)
+        if self.path:
+            with self._connect() as connection:
+                stats['entries'] = connection.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+        return stats
+
+# Process-wide store used by header detection
+header_fingerprints = HeaderFingerprintStore.from_env()
+
+# Workers write their remaining hits when they are recycled or shut down
+atexit.register(header_fingerprints.flush_hits)
+
+def share_fingerprint_counters(counters):
+    """Worker pool initializer: count into the server process's counters."""
+    header_fingerprints.share_counters(counters)
@@ -0,0 +1,101 @@
+import collections
+import functools
+import re
+
+# Distinct header strings whose matches are remembered per process
+MATCH_CACHE_SIZE = 4096
+
+# A scanned cell counts towards a header row when it contains any of these
+HEADER_LIKE_KEYWORDS = [
+    'mpn', 'part', 'qty', 'desc', 'ref', 'loc', 'item', 'mfr', 'package', 'manufacturer', 'designator', 'quantity'
+]
+
+# Score of a header-like cell: the first group it matches, otherwise 1
+HEADER_SCORE_WEIGHTS = [
+    (3, ['manufacturer', 'mpn', 'part number', 'pn']),
+    (2, ['qty', 'quantity']),
+    (2, ['desc', 'description']),
+    (2, ['ref', 'designator'])
+]
+
+QTY_KEYWORDS = ['qty', 'quantity', 'qty.', 'qty:']
+REFDES_KEYWORDS = ['ref', 'reference', 'designator', 'designation', 'loc', 'location']
+DESCRIPTION_KEYWORDS = ['desc', 'description', 'note', 'comment', 'remark']
+
+# Header text of columns that may hold descriptions when no description column is mapped
+DESCRIPTION_FALLBACK_KEYWORDS = ['desc', 'note', 'comment', 'remark', 'component', 'part', 'item', 'material']
+
+# Headers longer than this are prose, never an MPN column
+MPN_MAX_HEADER_LENGTH = 50
+
+def _any(keywords):
+    return '|'.join(re.escape(kw) for kw in keywords)
+
+def _all(*keyword_groups):
+    """Pattern for text containing a keyword of every group, anywhere."""
+    return r'\A' + ''.join(f'(?=.*(?:{_any(group)}))' for group in keyword_groups)
+
+def _compile(*alternatives):
+    # DOTALL so lookaheads see past line breaks inside header cells
+    return re.compile('|'.join(f'(?:{alternative})' for alternative in alternatives), re.DOTALL)
+
+# MPN column rules as (priority, label, pattern, longest header); the highest priority wins
+MPN_RULES = [
+    (10, 'Exact MPN', _compile(r'\Ampn\Z'), None),
+    (8, 'Manufacturer Part Number', _compile(
+        _all(['manufacturer part'], ['no', 'number']),
+        _all(['manufacturer 1'], ['pn']),
+        _any([
+            'manufacturer p/n', 'manufacturer pn', 'manufacturer 1 pn', 'manufacturer 1 p/n',
+            'mfg p/n', 'mfg pn', 'mfg. p/n', 'mfg. pn', 'manufacturer part no', 'manufacturer part number',
+            'mfg part no', 'mfg part number', 'manufacturer part#', 'mfg part#', 'manufacturer part no.',
+            'mfg part no.'
+        ])
+    ), None),
+    (6, 'Vendor Part Number', _compile(
+        _all(['vendor part'], ['no', 'number']),
+        _any(['vendor p/n', 'vendor pn', 'vendor part no', 'vendor part number'])
+    ), None),
+    (4, 'Other Part Number', _compile(_any(['part number', 'part no', 'part #', 'pn', 'item#', 'item #'])), 30)
+]
+
+_HEADER_LIKE = _compile(_any(HEADER_LIKE_KEYWORDS))
+_HEADER_WEIGHTS = [(weight, _compile(_any(keywords))) for weight, keywords in HEADER_SCORE_WEIGHTS]
+_QTY = _compile(_any(QTY_KEYWORDS))
+_REFDES = _compile(_any(REFDES_KEYWORDS))
+_DESCRIPTION = _compile(_any(DESCRIPTION_KEYWORDS))
+_DESCRIPTION_FALLBACK = _compile(_any(DESCRIPTION_FALLBACK_KEYWORDS))
+
+# What a column header can be mapped to; mpn is a (priority, label) pair or None
+ColumnRoles = collections.namedtuple('ColumnRoles', 'mpn qty refdes description description_fallback')
+
+@functools.lru_cache(maxsize=MATCH_CACHE_SIZE)
+def header_cell_score(cell):
+    """How strongly a scanned text cell suggests a header row; 0 if not at all."""
+    text = cell.lower().strip()
+    if not _HEADER_LIKE.search(text):
+        return 0
+    for weight, pattern in _HEADER_WEIGHTS:
+        if pattern.search(text):
+            return weight
+    return 1
+
+def _mpn_rule(text):
+    if len(text) > MPN_MAX_HEADER_LENGTH:
+        return None
+    for priority, label, pattern, longest in MPN_RULES:
+        if (longest is None or len(text) <= longest) and pattern.search(text):
+            return priority, label
+    return None
+
+@functools.lru_cache(maxsize=MATCH_CACHE_SIZE)
+def column_roles(name):
+    """The roles a column header (as text) qualifies for."""
+    text = name.lower().strip()
+    return ColumnRoles(
+        mpn=_mpn_rule(text),
+        qty=bool(_QTY.search(text)),
+        refdes=bool(_REFDES.search(text)),
+        description=bool(_DESCRIPTION.search(text)),
+        description_fallback=bool(_DESCRIPTION_FALLBACK.search(text))
+    )
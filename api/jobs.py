@@ -0,0 +1,224 @@
+import asyncio
+import copy
+import datetime
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from excel_tool import compare_boms, report_progress, time_phases
+from header_fingerprints import share_fingerprint_counters
+from parse_cache import share_counters
+from worker_pool import PoolBusyError
+
+# Job phases in the order they run
+PHASES = ('upload', 'header_detection', 'parse', 'diff', 'serialize')
+
+# Progress events from the worker processes, set in each worker by init_worker
+_events = None
+
+def init_worker(counters, events, fingerprint_counters):
+    """Worker pool initializer: share the cache counters and the job event queue."""
+    global _events
+    share_counters(counters)
+    share_fingerprint_counters(fingerprint_counters)
+    _events = events
+
+def run_comparison_job(job_id, file1, file2, file1_hash=None, file2_hash=None):
+    """Worker side of a job: compare_boms, reporting its progress to the server.
+
+    Returns the result and the same timing stats as compare_boms_timed.
+    """
+    labels = {file1: 'file1', file2: 'file2'}
+    parsed = []
+
+    def send(phase, details):
+        if phase == 'parse' and not details.get('cached'):
+            parsed.append(details['rows'])
+        if 'path' in details:
+            details = dict(details)
+            details['file'] = labels.get(details.pop('path'))
+        if _events is not None:
+            _events.put((job_id, phase, details))
+
+    with report_progress(send), time_phases() as phases:
+        results = compare_boms(file1, file2, file1_hash, file2_hash)
+    return results, {'phases': phases, 'rows_parsed': sum(parsed)}
+
+def _timestamp(seconds):
+    if seconds is None:
+        return None
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).isoformat()
+
+class JobStore:
+    """Comparison jobs, their phase progress and their results.
+
+    Settings default to the environment:
+    - BOM_MAX_JOBS: jobs allowed to be queued or running at once (default: 100)
+    - BOM_JOB_CONCURRENCY: jobs running at the same time (default: all cores)
+    - BOM_JOB_RESULT_TTL: seconds a finished job is kept (default: 3600)
+
+    Progress events from the workers arrive on ``events`` and are applied by
+    a listener thread between start() and stop().
+    """
+
+    def __init__(self, max_jobs=None, concurrency=None, ttl=None):
+        self.max_jobs = max_jobs or int(os.environ.get('BOM_MAX_JOBS', 100))
+        self.concurrency = concurrency or int(os.environ.get('BOM_JOB_CONCURRENCY', os.cpu_count() or 1))
+        self.ttl = ttl or int(os.environ.get('BOM_JOB_RESULT_TTL', 3600))
+        # Created in the 'spawn' context so it can be handed to the worker pool
+        self.events = multiprocessing.get_context('spawn').Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks = set()
+        self._listener = None
+
+    def start(self):
+        self._listener = threading.Thread(target=self._listen, name='job-events', daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self.events.put(None)
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _listen(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            job_id, phase, details = event
+            self.advance(job_id, phase, details)
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items() if job['expires_at'] and job['expires_at'] <= now]:
+            del self._jobs[job_id]
+
+    def create(self, upload_details):
+        """Register a new job whose files are uploaded; returns its id.
+
+        Raises PoolBusyError when too many jobs are already queued or running.
+        """
+        with self._lock:
+            self._purge()
+            active = sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+            if active >= self.max_jobs:
+                raise PoolBusyError(f"{active} jobs already queued or running")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'phase': None,
+                'progress': {phase: {'status': 'pending'} for phase in PHASES},
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'expires_at': None,
+                'error': None,
+                'result': None,
+                'etag': None
+            }
+        self.advance(job_id, 'upload', upload_details)
+        return job_id
+
+    def advance(self, job_id, phase, details=None):
+        """Record progress of a job in ``phase``.
+
+        Reaching a later phase marks the earlier ones done. Files are parsed
+        one after the other, so header_detection and parse events for the
+        second file only add their details. Details with a ``file`` label are
+        kept per file, anything else is merged into the phase's entry.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Events can still arrive after a job finished; they change nothing
+            if job is None or job['status'] in ('done', 'failed'):
+                return
+            entry = job['progress'][phase]
+            index = PHASES.index(phase)
+            if job['phase'] is None or index >= PHASES.index(job['phase']):
+                for earlier in PHASES[:index]:
+                    job['progress'][earlier]['status'] = 'done'
+                entry['status'] = 'running'
+                job['phase'] = phase
+            details = dict(details or {})
+            label = details.pop('file', None)
+            if label:
+                entry.setdefault(label, {}).update(details)
+            else:
+                entry.update(details)
+
+    def submit(self, job_id, coro):
+        """Run the coroutine for a job once one of the job slots is free."""
+        task = asyncio.get_running_loop().create_task(self._run(job_id, coro))
+        # Keep a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job_id, coro):
+        async with self._slots:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['status'] = 'running'
+                    job['started_at'] = time.time()
+            await coro
+
+    def _close(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for entry in job['progress'].values():
+                if fields['status'] == 'done':
+                    entry['status'] = 'done'
+                elif entry['status'] == 'running':
+                    entry['status'] = 'failed'
+            job.update(fields)
+            job['finished_at'] = time.time()
+            job['expires_at'] = job['finished_at'] + self.ttl
+
+    def finish(self, job_id, result, etag=None):
+        """Store a job's encoded result; it is kept for ``ttl`` seconds."""
+        self._close(job_id, status='done', result=result, etag=etag)
+
+    def fail(self, job_id, status_code, detail):
+        """Mark a job as failed with the HTTP status and message to report."""
+        self._close(job_id, status='failed', error={'status_code': status_code, 'detail': detail})
+
+    def counts(self):
+        """Number of known jobs in each status."""
+        with self._lock:
+            counts = dict.fromkeys(('queued', 'running', 'done', 'failed'), 0)
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def get(self, job_id):
+        """The job with its result, or None if it is unknown or expired."""
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def status(self, job_id):
+        """JSON-ready progress of a job, without its result; None if unknown or expired."""
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {
+                'job_id': job_id,
+                'status': job['status'],
+                'phase': job['phase'],
+                'progress': copy.deepcopy(job['progress']),
+                'created_at': _timestamp(job['created_at']),
+                'started_at': _timestamp(job['started_at']),
+                'finished_at': _timestamp(job['finished_at']),
+                'expires_at': _timestamp(job['expires_at']),
+                'error': job['error']
+            }
@@ -1,17 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Header, Query, Request, UploadFile, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-import tempfile
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import os
 import json
+import tempfile
+import time
 import uuid
-from typing import Optional
+from typing import List, Optional
 import logging
-from excel_tool import compare_boms
+from concurrent.futures.process import BrokenProcessPool
+from excel_tool import (
+    BATCH_PAIRINGS, SHEET_MODES, batch_pairs, combine_batch_results, combine_sheet_results, compare_boms_timed,
+    compare_boms_traced, compare_merged_sheets, compare_parsed_safe, comparison_cache_key, find_bom_sheets,
+    pair_sheets, read_bom_cached, result_records, supported_extensions, write_comparison_ndjson
+)
+from fast_json import FastJSONResponse, dumps
+from header_fingerprints import header_fingerprints
+from jobs import JobStore, init_worker, run_comparison_job
+from metrics import metrics, server_timing
+from parse_cache import parse_cache
+from result_cache import ResultCache, etag_matches
+from result_formats import (
+    ARROW_AVAILABLE, ARROW_MEDIA_TYPE, RESULT_FORMATS, arrow_results, columnar_results, format_tag
+)
+from uploads import CHUNK_SIZE, MAX_UPLOAD_BYTES, remove_uploads, save_uploads
+from worker_pool import ComparisonPool, JobTimeoutError, PoolBusyError
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (LOG_LEVEL=debug also enables the comparison diagnostics)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -20,6 +37,29 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Background comparison jobs submitted through /api/jobs
+job_store = JobStore()
+
+# CPU-bound comparisons run here so they never block the event loop
+# Workers share the parse cache's and header fingerprint store's counters
+# and the job progress queue with this process
+comparison_pool = ComparisonPool(
+    initializer=init_worker,
+    initargs=(parse_cache.counters, job_store.events, header_fingerprints.counters)
+)
+
+# Finished results for identical file pairs, served without re-running the comparison
+result_cache = ResultCache.from_env()
+
+@app.on_event("startup")
+async def start_jobs():
+    job_store.start()
+
+@app.on_event("shutdown")
+async def shutdown_pool():
+    comparison_pool.shutdown()
+    job_store.stop()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +70,217 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Most files accepted by one batch comparison
+BATCH_MAX_FILES = int(os.environ.get("BOM_BATCH_MAX_FILES", 20))
+
+# Files each upload endpoint accepts, for the request size check
+UPLOAD_FILE_COUNTS = {"/api/compare": 2, "/api/jobs": 2, "/api/compare/batch": BATCH_MAX_FILES}
+
+@app.middleware("http")
+async def reject_oversize_uploads(request: Request, call_next):
+    """Refuse comparisons whose declared size cannot fit, before the body is read.
+    
+    The only upload check that runs before the body arrives: a request
+    without Content-Length (chunked) is received in full, and its files are
+    then checked one by one by save_upload.
+    """
+    file_count = UPLOAD_FILE_COUNTS.get(request.url.path)
+    if file_count and request.method == "POST":
+        length = request.headers.get("content-length")
+        # The files plus some room for the multipart framing
+        if length and length.isdigit() and int(length) > file_count * MAX_UPLOAD_BYTES + CHUNK_SIZE:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Uploads are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)}MB per file"}
+            )
+    return await call_next(request)
+
+# Seconds between job status checks on an /api/jobs/{job_id}/events stream
+JOB_EVENTS_INTERVAL = 0.5
+
+# Seconds between checks for new output while streaming a comparison
+STREAM_POLL_INTERVAL = 0.05
+
+# Per-request debug traces go here instead of into the response when set
+DEBUG_LOG_DIR = os.environ.get("BOM_DEBUG_LOG_DIR")
+
+def write_debug_log(lines):
+    """Write a debug trace to DEBUG_LOG_DIR and return the file name."""
+    os.makedirs(DEBUG_LOG_DIR, exist_ok=True)
+    name = f"compare-{uuid.uuid4().hex}.log"
+    with open(os.path.join(DEBUG_LOG_DIR, name), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return name
+
+def excel_extensions(*files):
+    """Lower-case extensions of uploaded files; 400 unless an installed reader reads them all."""
+    allowed_extensions = supported_extensions()
+    extensions = [os.path.splitext(file.filename)[1].lower() for file in files]
+    if any(ext not in allowed_extensions for ext in extensions):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only {', '.join(allowed_extensions)} files are supported"
+        )
+    return extensions
+
+def comparison_error(e, label):
+    """Translate a failed comparison into the HTTPException to return."""
+    if isinstance(e, PoolBusyError):
+        logger.warning(f"Rejecting comparison, worker pool saturated: {e}")
+        return HTTPException(
+            status_code=503,
+            detail="Server is busy with other comparisons. Please try again shortly.",
+            headers={"Retry-After": "10"}
+        )
+    if isinstance(e, JobTimeoutError):
+        logger.error(f"{label} timed out")
+        return HTTPException(
+            status_code=504,
+            detail=f"Comparison took longer than {comparison_pool.timeout} seconds and was stopped"
+        )
+    if isinstance(e, BrokenProcessPool):
+        logger.error("Comparison worker died; the pool will be restarted")
+        return HTTPException(
+            status_code=503,
+            detail="Comparison worker was restarted. Please try again.",
+            headers={"Retry-After": "5"}
+        )
+    import traceback
+    logger.error(f"Error during comparison: {str(e)}")
+    logger.error(f"Full traceback: {traceback.format_exc()}")
+    return HTTPException(
+        status_code=500,
+        detail=f"Comparison failed: {str(e)}"
+    )
+
+def check_result_format(result_format):
+    """400 for an unknown result format, 501 for arrow when pyarrow is missing."""
+    if result_format not in RESULT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(RESULT_FORMATS)}"
+        )
+    if result_format == "arrow" and not ARROW_AVAILABLE:
+        raise HTTPException(
+            status_code=501,
+            detail="format=arrow is not available: pyarrow is not installed on the server"
+        )
+
+def result_response(results, result_format="rows", dictionary=False, headers=None):
+    """Response carrying a comparison result in the requested layout."""
+    if result_format == "columnar":
+        return FastJSONResponse(content=columnar_results(results, dictionary), headers=headers)
+    if result_format == "arrow":
+        return Response(content=arrow_results(results, dictionary), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    # Results are plain strings and numbers, so they are encoded directly
+    return FastJSONResponse(content=results, headers=headers)
+
+def worker_timings(stats, elapsed):
+    """Phase timings of a pool job: its phases, after the time spent waiting for and talking to a worker."""
+    metrics.inc('rows_parsed_total', stats['rows_parsed'])
+    return {'queue': max(elapsed - sum(stats['phases'].values()), 0.0), **stats['phases']}
+
+def record_timings(timings, response=None):
+    """Add a comparison's phase timings to the metrics, and to ``response`` as Server-Timing when given."""
+    for phase, seconds in timings.items():
+        metrics.observe('phase_seconds', seconds, phase=phase)
+    if response is not None:
+        response.headers["Server-Timing"] = server_timing(timings)
+
+async def compare_sheets(paths, hashes, mode, timings):
+    """Compare every BOM-like sheet of two workbooks, parsing the sheets in parallel on the pool.
+    
+    Same result as excel_tool.compare_boms_sheets with the pool's map. The
+    steps run several pool jobs at once, so ``timings`` gets each step's
+    wall-clock time, waiting for workers included: sheet_detection, parse
+    and diff.
+    """
+    step_started = time.perf_counter()
+    found1, found2 = await comparison_pool.map(find_bom_sheets, paths)
+    timings['sheet_detection'] = time.perf_counter() - step_started
+    if not found1 or not found2:
+        raise ValueError("MPN column not found in any sheet of one or both files")
+    tasks = [(path, file_hash, index) for path, file_hash, found in zip(paths, hashes, (found1, found2))
+             for index, _ in found]
+    step_started = time.perf_counter()
+    boms = await comparison_pool.map(read_bom_cached, *zip(*tasks))
+    timings['parse'] = time.perf_counter() - step_started
+    boms1, boms2 = boms[:len(found1)], boms[len(found1):]
+    names1 = [name for _, name in found1]
+    names2 = [name for _, name in found2]
+    step_started = time.perf_counter()
+    if mode == "merge":
+        results = await comparison_pool.run(compare_merged_sheets, boms1, names1, boms2, names2)
+        timings['diff'] = time.perf_counter() - step_started
+        return results
+    pairs = pair_sheets(names1, names2)
+    compared = [(i, j) for i, j in pairs if i is not None and j is not None]
+    results = await comparison_pool.map(
+        compare_parsed_safe,
+        [boms1[i] for i, _ in compared],
+        [boms2[j] for _, j in compared]
+    )
+    timings['diff'] = time.perf_counter() - step_started
+    return combine_sheet_results(names1, names2, pairs, results)
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+async def stream_comparison(paths, hashes):
+    """Run a comparison that writes NDJSON and return a response following its output.
+    
+    Waits for the first record, so a comparison that fails before producing
+    anything still gets a proper error status. Takes ownership of ``paths``
+    and removes them once the comparison has finished.
+    """
+    fd, out_path = tempfile.mkstemp(suffix=".ndjson")
+    os.close(fd)
+    job = asyncio.ensure_future(comparison_pool.run(write_comparison_ndjson, *paths, out_path, *hashes))
+    
+    def cleanup(finished_job=None):
+        if finished_job is not None and not finished_job.cancelled():
+            finished_job.exception()  # retrieved here so asyncio does not warn about it
+        remove_uploads(list(paths) + [out_path])
+    
+    def cleanup_when_done():
+        # The worker may still be reading the uploads
+        if job.done():
+            cleanup()
+        else:
+            job.add_done_callback(cleanup)
+    
+    try:
+        while not job.done() and os.path.getsize(out_path) == 0:
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+        if job.done() and job.exception() is not None:
+            raise job.exception()
+    except BaseException:
+        cleanup_when_done()
+        raise
+    
+    async def follow():
+        try:
+            with open(out_path, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if chunk:
+                        yield chunk
+                    elif job.done():
+                        # Anything written between the last read and the end
+                        yield f.read()
+                        break
+                    else:
+                        await asyncio.sleep(STREAM_POLL_INTERVAL)
+            if job.exception() is not None:
+                # The status line is already sent, so report the failure in-band
+                logger.error(f"Streamed comparison failed: {job.exception()}")
+                yield (json.dumps({"error": str(job.exception())}) + "\n").encode()
+        finally:
+            cleanup_when_done()
+    
+    return StreamingResponse(follow(), media_type="application/x-ndjson")
+
 @app.get("/")
 async def root():
     return {"message": "BOM Comparison API is running"}
@@ -46,7 +297,14 @@ async def compare_files_options():
 @app.post("/api/compare")
 async def compare_files(
     file1: UploadFile = File(...),
-    file2: UploadFile = File(...)
+    file2: UploadFile = File(...),
+    debug: bool = False,
+    stream: bool = False,
+    result_format: str = Query("rows", alias="format"),
+    dictionary: bool = False,
+    timing: bool = False,
+    sheets: str = "first",
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Compare two BOM Excel files and return the differences.
@@ -54,6 +312,31 @@ async def compare_files(
     Args:
         file1: First Excel file (original)
         file2: Second Excel file (new version)
+        debug: Capture the comparison's diagnostic trace. It is returned as
+            debug_log, or written under BOM_DEBUG_LOG_DIR when that is set.
+        stream: Return NDJSON instead: a {"summary_stats": ...} line first,
+            then one {"category": ..., "part": ...} line per part, sent as
+            the comparison produces them.
+        format: rows (default) returns each category as a list of row
+            objects. columnar returns it as {"columns", "row_count",
+            "values"}, one value array per column. arrow returns one Arrow
+            IPC stream table with a category column; needs pyarrow.
+        dictionary: With columnar, columns with repeated values hold
+            indices into the category's "dictionaries" entry for that
+            column. With arrow, string columns are dictionary encoded.
+        timing: Add a Server-Timing header with the seconds spent per
+            phase: upload, queue, header_detection, parse, diff, serialize
+            and total. With sheets merge or each, the sheets are handled by
+            several workers at once, so the phases in between are instead
+            the wall-clock steps sheet_detection, parse and diff, each
+            including the wait for workers.
+        sheets: first (default) compares the first sheets. merge finds
+            every sheet that looks like a BOM and compares each file's
+            sheets as one BOM; rows gain a Sheet field and the result a
+            "sheets" entry. each compares same-named BOM sheets and returns
+            {"sheets", "summary", "comparisons"}, one comparison per sheet.
+        if_none_match: ETag of a result the client already holds for this
+            pair; answered with 304 Not Modified when it is still current.
     
     Returns:
         JSON with comparison results including:
@@ -61,69 +344,371 @@ async def compare_files(
         - removed_parts: Parts only in file1
         - modified_parts: Parts with different data
         - unchanged_parts: Parts with identical data
-        - unrecognized_parts: Parts that couldn't be categorized
+        - unrecognized_parts: Removed parts paired with a new part whose
+          MPN nearly matches (LM358DR vs LM358DR-T), with a match score
+        - refdes_changes: Parts in both files whose reference designators
+          changed, with the designators added and removed ("R1-R4" and
+          "R1,R2,R3,R4" are the same designators)
         - summary_stats: Statistics about the comparison
     """
+    started = time.perf_counter()
+    timings = {}
     try:
         # Validate file types
-        allowed_extensions = {'.xlsx', '.xls'}
-        file1_ext = os.path.splitext(file1.filename)[1].lower()
-        file2_ext = os.path.splitext(file2.filename)[1].lower()
-        
-        if file1_ext not in allowed_extensions or file2_ext not in allowed_extensions:
+        file1_ext, file2_ext = excel_extensions(file1, file2)
+        if debug and stream:
             raise HTTPException(
                 status_code=400,
-                detail="Only .xlsx and .xls files are supported"
+                detail="debug and stream cannot be combined"
+            )
+        check_result_format(result_format)
+        if stream and result_format != "rows":
+            raise HTTPException(
+                status_code=400,
+                detail="stream always returns NDJSON rows and cannot be combined with format"
+            )
+        if sheets not in SHEET_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"sheets must be one of: {', '.join(SHEET_MODES)}"
+            )
+        if sheets != "first" and (debug or stream):
+            raise HTTPException(
+                status_code=400,
+                detail="debug and stream only support sheets=first"
+            )
+        if sheets == "each" and result_format != "rows":
+            raise HTTPException(
+                status_code=400,
+                detail="sheets=each always returns rows and cannot be combined with format"
             )
         
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file1_ext) as tmp1:
-            content1 = await file1.read()
-            tmp1.write(content1)
-            tmp1_path = tmp1.name
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file2_ext) as tmp2:
-            content2 = await file2.read()
-            tmp2.write(content2)
-            tmp2_path = tmp2.name
+        # Stream both uploads to temporary files, hashing them on the way
+        (tmp1_path, file1_hash), (tmp2_path, file2_hash) = await save_uploads(
+            (file1, file1_ext), (file2, file2_ext)
+        )
+        owns_uploads = True
+        timings['upload'] = time.perf_counter() - started
+        metrics.inc('file_bytes_total', os.path.getsize(tmp1_path) + os.path.getsize(tmp2_path))
         
         try:
-            # Perform comparison
-            logger.info(f"Starting comparison of {file1.filename} and {file2.filename}")
+            # The result only depends on the two files and the comparison version
+            cache_key = comparison_cache_key(file1_hash, file2_hash, sheets)
+            etag = ResultCache.etag(cache_key + format_tag(result_format, dictionary))
+            if not debug:
+                # ETags identify the JSON result, not the NDJSON stream
+                if etag_matches(if_none_match, etag) and not stream:
+                    metrics.inc('comparisons_total', outcome='not_modified')
+                    return Response(status_code=304, headers={"ETag": etag})
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    logger.debug(f"Serving cached result for {file1.filename} and {file2.filename}")
+                    metrics.inc('comparisons_total', outcome='cached')
+                    if stream:
+                        return StreamingResponse(ndjson_lines(result_records(cached)), media_type="application/x-ndjson")
+                    serialize_started = time.perf_counter()
+                    response = result_response(cached, result_format, dictionary, {"ETag": etag})
+                    timings['serialize'] = time.perf_counter() - serialize_started
+                    timings['total'] = time.perf_counter() - started
+                    record_timings(timings, response if timing else None)
+                    return response
             
-            # Redirect stdout to suppress Unicode printing issues
-            import sys
-            import io
-            old_stdout = sys.stdout
-            sys.stdout = io.StringIO()
+            if stream:
+                logger.debug(f"Starting streamed comparison of {file1.filename} and {file2.filename}")
+                metrics.inc('comparisons_total', outcome='streamed')
+                owns_uploads = False
+                return await stream_comparison([tmp1_path, tmp2_path], [file1_hash, file2_hash])
+            
+            # Perform comparison
+            logger.debug(f"Starting comparison of {file1.filename} and {file2.filename}")
             
-            try:
-                results = compare_boms(tmp1_path, tmp2_path)
-            finally:
-                sys.stdout = old_stdout
+            compare_started = time.perf_counter()
+            if sheets != "first":
+                results = await compare_sheets([tmp1_path, tmp2_path], [file1_hash, file2_hash], sheets, timings)
+            else:
+                results, stats = await comparison_pool.run(
+                    compare_boms_traced if debug else compare_boms_timed,
+                    tmp1_path, tmp2_path, file1_hash, file2_hash
+                )
+                timings.update(worker_timings(stats, time.perf_counter() - compare_started))
+                if debug and DEBUG_LOG_DIR:
+                    results['debug_log_file'] = write_debug_log(results.pop('debug_log'))
             
-            logger.info("Comparison completed successfully")
+            logger.debug("Comparison completed successfully")
+            metrics.inc('comparisons_total', outcome='compared')
             
-            # Ensure JSON-serializable output (handles numpy types etc.)
-            payload = jsonable_encoder(results)
-            return JSONResponse(content=payload)
+            serialize_started = time.perf_counter()
+            if debug:
+                # Traces are per request, so they are neither cached nor tagged
+                response = result_response(results, result_format, dictionary)
+            else:
+                # The cache holds the rows result; other formats are derived from it
+                result_cache.put(cache_key, results)
+                response = result_response(results, result_format, dictionary, {"ETag": etag})
+            timings['serialize'] = time.perf_counter() - serialize_started
+            timings['total'] = time.perf_counter() - started
+            record_timings(timings, response if timing else None)
+            return response
             
         finally:
             # Clean up temporary files
-            try:
-                os.unlink(tmp1_path)
-                os.unlink(tmp2_path)
-            except Exception as e:
-                logger.warning(f"Failed to clean up temporary files: {e}")
+            if owns_uploads:
+                remove_uploads([tmp1_path, tmp2_path])
                 
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        logger.error(f"Error during comparison: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Comparison failed: {str(e)}"
+        metrics.inc('comparisons_total', outcome='failed')
+        raise comparison_error(e, f"Comparison of {file1.filename} and {file2.filename}")
+
+@app.post("/api/compare/batch")
+async def compare_batch(
+    files: List[UploadFile] = File(...),
+    pairing: str = "chain"
+):
+    """
+    Compare several BOM revisions or quotes in one request.
+    
+    Each file is parsed once, then the pairs are compared in parallel.
+    
+    Args:
+        files: Two or more Excel files, in revision order
+        pairing: chain (each file against the next), star (the first file
+            against every other one) or all (every pair of files)
+    
+    Returns:
+        JSON with:
+        - files: The uploaded file names
+        - summary: The summary_stats of each compared pair
+        - comparisons: The full /api/compare result of each pair
+        A pair that cannot be compared has an error instead of results.
+    """
+    try:
+        if pairing not in BATCH_PAIRINGS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"pairing must be one of: {', '.join(BATCH_PAIRINGS)}"
+            )
+        if not 2 <= len(files) <= BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch needs between 2 and {BATCH_MAX_FILES} files"
+            )
+        
+        # Validate file types
+        extensions = excel_extensions(*files)
+        
+        saved = await save_uploads(*zip(files, extensions))
+        paths = [path for path, _ in saved]
+        
+        try:
+            logger.debug(f"Starting {pairing} batch comparison of {len(files)} files")
+            pairs = batch_pairs(len(files), pairing)
+            
+            # Parse every file once, then compare the parsed BOMs pairwise
+            boms = await comparison_pool.map(read_bom_cached, paths, [file_hash for _, file_hash in saved])
+            results = await comparison_pool.map(
+                compare_parsed_safe,
+                [boms[i] for i, _ in pairs],
+                [boms[j] for _, j in pairs]
+            )
+            
+            batch = combine_batch_results([file.filename for file in files], pairing, pairs, results)
+            return FastJSONResponse(content=batch)
+            
+        finally:
+            # Clean up temporary files
+            remove_uploads(paths)
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise comparison_error(e, f"Batch comparison of {len(files)} files")
+
+async def run_job(job_id, paths, hashes, cache_key, etag):
+    """Run a submitted job and store its result or error in the job store."""
+    try:
+        timings = {}
+        results = result_cache.get(cache_key)
+        if results is None:
+            compare_started = time.perf_counter()
+            # The job store bounds running jobs, so jobs wait for a worker rather than fail on a busy pool
+            results, stats = await comparison_pool.run_waiting(run_comparison_job, job_id, *paths, *hashes)
+            timings.update(worker_timings(stats, time.perf_counter() - compare_started))
+            result_cache.put(cache_key, results)
+            metrics.inc('comparisons_total', outcome='compared')
+        else:
+            metrics.inc('comparisons_total', outcome='cached')
+        # Jobs keep the encoded result, so fetching it is just a copy
+        job_store.advance(job_id, 'serialize')
+        serialize_started = time.perf_counter()
+        encoded = dumps(results)
+        timings['serialize'] = time.perf_counter() - serialize_started
+        record_timings(timings)
+        job_store.finish(job_id, encoded, etag)
+    except Exception as e:
+        metrics.inc('comparisons_total', outcome='failed')
+        error = comparison_error(e, f"Job {job_id}")
+        job_store.fail(job_id, error.status_code, error.detail)
+    finally:
+        # Clean up temporary files
+        remove_uploads(paths)
+
+@app.post("/api/jobs")
+async def submit_job(
+    file1: UploadFile = File(...),
+    file2: UploadFile = File(...),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Start comparing two BOM Excel files in the background.
+    
+    Args:
+        file1: First Excel file (original)
+        file2: Second Excel file (new version)
+        if_none_match: ETag of a result the client already holds for this
+            pair; answered with 304 Not Modified when it is still current.
+    
+    Returns:
+        202 with the job_id and the URLs of its status, progress events and
+        result. The result has the same fields as /api/compare.
+    """
+    try:
+        # Validate file types
+        file1_ext, file2_ext = excel_extensions(file1, file2)
+        
+        # Stream both uploads to temporary files, hashing them on the way
+        (tmp1_path, file1_hash), (tmp2_path, file2_hash) = await save_uploads(
+            (file1, file1_ext), (file2, file2_ext)
         )
+        paths = [tmp1_path, tmp2_path]
+        
+        cache_key = comparison_cache_key(file1_hash, file2_hash)
+        etag = ResultCache.etag(cache_key)
+        if etag_matches(if_none_match, etag):
+            remove_uploads(paths)
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        try:
+            job_id = job_store.create({
+                'file1': {'name': file1.filename, 'bytes': os.path.getsize(tmp1_path)},
+                'file2': {'name': file2.filename, 'bytes': os.path.getsize(tmp2_path)}
+            })
+        except Exception:
+            remove_uploads(paths)
+            raise
+        
+        job_store.submit(job_id, run_job(job_id, paths, [file1_hash, file2_hash], cache_key, etag))
+        logger.debug(f"Queued job {job_id} for {file1.filename} and {file2.filename}")
+        
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/jobs/{job_id}",
+            "events_url": f"/api/jobs/{job_id}/events",
+            "result_url": f"/api/jobs/{job_id}/result"
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise comparison_error(e, f"Job for {file1.filename} and {file2.filename}")
+
+def job_status_or_404(job_id):
+    status = job_store.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return status
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status of a job, with per-phase progress and row counts."""
+    return job_status_or_404(job_id)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """Server-sent events carrying the job status each time it changes, until it finishes."""
+    job_status_or_404(job_id)
+    
+    async def events():
+        last = None
+        while True:
+            status = job_store.status(job_id)
+            if status is None:
+                return
+            data = json.dumps(status)
+            if data != last:
+                yield f"data: {data}\n\n"
+                last = data
+            if status["status"] in ("done", "failed"):
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+    
+    # X-Accel-Buffering stops nginx from holding events back
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a finished job; 202 with its status while it is still running."""
+    status = job_status_or_404(job_id)
+    if status["status"] == "failed":
+        raise HTTPException(status_code=status["error"]["status_code"], detail=status["error"]["detail"])
+    if status["status"] != "done":
+        return JSONResponse(status_code=202, content=status)
+    
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return Response(content=job["result"], media_type="application/json", headers={"ETag": job["etag"]})
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Parse cache and header fingerprint counters across all comparison workers, plus the result cache."""
+    return {
+        "parse_cache": parse_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "header_fingerprints": header_fingerprints.stats()
+    }
+
+@app.get("/api/admin/header-fingerprints")
+async def list_header_fingerprints():
+    """Known header layouts with their column maps and hit counts, most used first."""
+    return {"enabled": bool(header_fingerprints.path), "entries": header_fingerprints.entries()}
+
+@app.delete("/api/admin/header-fingerprints")
+async def clear_header_fingerprints():
+    """Forget every known header layout; the next file of each template is detected again."""
+    return {"removed": header_fingerprints.invalidate()}
+
+@app.delete("/api/admin/header-fingerprints/{fingerprint}")
+async def delete_header_fingerprint(fingerprint: str):
+    """Forget one header layout, e.g. after its column map turned out wrong."""
+    removed = header_fingerprints.invalidate(fingerprint)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Header fingerprint not found")
+    return {"removed": removed}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters, phase timings and pool load in the Prometheus text exposition format."""
+    parse_stats = parse_cache.stats()
+    result_stats = result_cache.stats()
+    collected = [
+        ("comparisons_in_flight", "gauge", "Comparisons running or waiting in the worker pool",
+         comparison_pool.in_flight, {}),
+        *(("jobs", "gauge", "Background jobs held by the server, by status", count, {"status": status})
+          for status, count in job_store.counts().items()),
+        *(("parse_cache_lookups_total", "counter", "Parse cache lookups across all workers, by result",
+           parse_stats[name], {"result": name}) for name in parse_cache.COUNTERS),
+        ("result_cache_lookups_total", "counter", "Result cache lookups, by result", result_stats["hits"], {"result": "hits"}),
+        ("result_cache_lookups_total", "counter", "Result cache lookups, by result", result_stats["misses"], {"result": "misses"}),
+        ("result_cache_entries", "gauge", "Results held in the result cache", result_stats["entries"], {}),
+    ]
+    return Response(content=metrics.render(collected), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/test")
 async def test_endpoint():
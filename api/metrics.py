@@ -0,0 +1,82 @@
+import threading
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in sorted(labels.items())) + '}'
+
+class Metrics:
+    """Process-wide counters and phase timers, rendered in the Prometheus text format.
+
+    Counters and summaries are declared up front with their help text and
+    updated with inc() and observe(). Values kept elsewhere (pool load, the
+    caches' own counters) are read when /metrics is scraped and passed to
+    render() instead.
+    """
+
+    def __init__(self, prefix='bom'):
+        self.prefix = prefix
+        self._help = {}
+        self._types = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        self._help[name] = help_text
+        self._types[name] = 'counter'
+
+    def summary(self, name, help_text):
+        self._help[name] = help_text
+        self._types[name] = 'summary'
+
+    def inc(self, name, value=1, **labels):
+        """Add ``value`` to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration of a summary (its _sum and _count)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            total, count = self._values.get(key, (0.0, 0))
+            self._values[key] = (total + seconds, count + 1)
+
+    def render(self, collected=()):
+        """Text exposition of every metric, plus (name, type, help, value, labels) samples."""
+        lines = []
+        with self._lock:
+            values = dict(self._values)
+        for name, help_text in self._help.items():
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {self._types[name]}')
+            for (metric, labels), value in sorted(values.items()):
+                if metric != name:
+                    continue
+                if self._types[name] == 'summary':
+                    total, count = value
+                    lines.append(f'{full_name}_sum{_labels(dict(labels))} {total:.6f}')
+                    lines.append(f'{full_name}_count{_labels(dict(labels))} {count}')
+                else:
+                    lines.append(f'{full_name}{_labels(dict(labels))} {value}')
+        declared = set()
+        for name, metric_type, help_text, value, labels in collected:
+            full_name = f'{self.prefix}_{name}'
+            if full_name not in declared:
+                lines.append(f'# HELP {full_name} {help_text}')
+                lines.append(f'# TYPE {full_name} {metric_type}')
+                declared.add(full_name)
+            lines.append(f'{full_name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+def server_timing(phases):
+    """Server-Timing header value for a {phase: seconds} mapping."""
+    return ', '.join(f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in phases.items())
+
+# Process-wide metrics of the API server
+metrics = Metrics()
+metrics.counter('comparisons_total', 'Comparison requests answered, by outcome')
+metrics.counter('rows_parsed_total', 'BOM rows parsed from Excel, not counting parse cache hits')
+metrics.counter('file_bytes_total', 'Bytes of uploaded BOM files compared')
+metrics.summary('phase_seconds', 'Seconds spent in each comparison phase')
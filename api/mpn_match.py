@@ -0,0 +1,117 @@
+import collections
+import os
+import re
+import numpy as np
+
+def _threshold_from_env():
+    value = os.environ.get('BOM_MPN_MATCH_THRESHOLD', '0.8')
+    return float(value) if value else None
+
+# Near matches scoring below this are left as new/removed parts; None disables matching
+MATCH_THRESHOLD = _threshold_from_env()
+
+# MPNs are indexed by their character trigrams, with ^ and $ marking the ends
+NGRAM = 3
+
+# Shorter MPNs ("242", "10K") are too ambiguous to match on similarity
+MIN_MPN_LENGTH = 4
+
+# Trigrams held by more MPNs than this (e.g. "000", "080") are too common to block on
+MAX_GRAM_POSTINGS = 500
+
+# Candidates per MPN, most shared trigrams first, that get scored
+MAX_CANDIDATES = 5
+
+_PUNCTUATION = re.compile(r'[^0-9A-Z]+')
+
+def squash(mpn):
+    """An MPN without case, spaces or punctuation: "lm358dr-t" and "LM358 DRT" are both LM358DRT."""
+    return _PUNCTUATION.sub('', str(mpn).upper())
+
+def _boundaries(mpn):
+    """Positions in squash(mpn) where the MPN had punctuation or a space: {0, 7, 8} for LM358DR-T."""
+    positions = {0}
+    for token in _PUNCTUATION.split(str(mpn).upper()):
+        positions.add(len(token) + max(positions))
+    return positions
+
+def _grams(text):
+    padded = f"^{text}$"
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+def _score(text1, text2, boundaries1, boundaries2):
+    """Similarity of two squashed MPNs, given their _boundaries (see similarity)."""
+    if text1 == text2:
+        return 1.0
+    (short, _), (long, boundaries) = sorted(((text1, boundaries1), (text2, boundaries2)), key=lambda mpn: len(mpn[0]))
+    if ((long.startswith(short) and len(short) in boundaries)
+            or (long.endswith(short) and len(long) - len(short) in boundaries)):
+        return 2 * len(short) / (len(short) + len(long))
+    return 0.0
+
+def similarity(mpn1, mpn2):
+    """How likely two MPNs name the same part, from 0 to 1.
+
+    1 when they only differ in case, spacing or punctuation. When one
+    extends the other at either end with a separate part (a reel suffix as
+    in LM358DR-T, a vendor prefix as in TI-LM358) the score is the share of
+    characters they have in common. Anything else scores 0: an extension
+    run into the MPN is usually a package or grade code (1N4148 vs
+    1N4148W), and a changed character a different value or tolerance
+    (RC0805FR-074K7L vs -074R7L), not the same part written differently.
+    """
+    return _score(squash(mpn1), squash(mpn2), _boundaries(mpn1), _boundaries(mpn2))
+
+def match_mpns(mpns1, mpns2, threshold=MATCH_THRESHOLD):
+    """Pair MPNs only found in file1 with similar MPNs only found in file2.
+
+    The file2 MPNs are indexed by trigram, so each file1 MPN is only scored
+    against the few file2 MPNs sharing the most trigrams with it, never
+    against all of them. Returns (i, j, score) for pairs scoring at least
+    ``threshold``, each MPN in at most one pair, best scores taken first.
+    """
+    if threshold is None or not mpns1 or not mpns2:
+        return []
+    squashed1 = [squash(mpn) for mpn in mpns1]
+    squashed2 = [squash(mpn) for mpn in mpns2]
+    boundaries2 = [_boundaries(mpn) for mpn in mpns2]
+
+    # MPNs that only differ in punctuation are found without the index
+    exact = {}
+    index = collections.defaultdict(list)
+    for j, text in enumerate(squashed2):
+        exact.setdefault(text, j)
+        if len(text) >= MIN_MPN_LENGTH:
+            for gram in _grams(text):
+                index[gram].append(j)
+    postings = {gram: np.array(js) for gram, js in index.items() if len(js) <= MAX_GRAM_POSTINGS}
+
+    candidates = []
+    for i, text in enumerate(squashed1):
+        if text and text in exact:
+            candidates.append((1.0, i, exact[text]))
+            continue
+        if len(text) < MIN_MPN_LENGTH:
+            continue
+        hits = [postings[gram] for gram in _grams(text) if gram in postings]
+        if not hits:
+            continue
+        boundaries1 = _boundaries(mpns1[i])
+        js, shared = np.unique(np.concatenate(hits), return_counts=True)
+        for j in js[np.argsort(-shared, kind='stable')[:MAX_CANDIDATES]].tolist():
+            if len(squashed2[j]) < MIN_MPN_LENGTH:
+                continue
+            score = _score(text, squashed2[j], boundaries1, boundaries2[j])
+            if score >= threshold:
+                candidates.append((score, i, j))
+
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+    used1, used2 = set(), set()
+    matches = []
+    for score, i, j in candidates:
+        if i in used1 or j in used2:
+            continue
+        used1.add(i)
+        used2.add(j)
+        matches.append((i, j, score))
+    return matches
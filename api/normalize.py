@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype
+
+# Cell text that counts as blank once stripped and lowercased
+NULL_TOKENS = ['nan', 'none', 'null']
+
+def _as_series(values):
+    """Wrap lists and arrays in a Series so every helper sees the same type."""
+    if isinstance(values, pd.Series):
+        return values
+    return pd.Series(values, dtype=object)
+
+def as_text(values):
+    """str() of every cell, leaving missing cells as NaN.
+
+    Numeric and datetime columns are boxed to Python objects first so the
+    text matches what str() gives for the scalar a cell lookup returns.
+    """
+    values = _as_series(values)
+    missing = values.isna()
+    text = values.astype(object).where(~missing, '').astype(str).astype(object)
+    return text.where(~missing, np.nan)
+
+def _strip_strings(values):
+    """Stripped text of the string cells; NaN for every other cell."""
+    if not isinstance(values.dtype, np.dtype):
+        # Extension string dtypes: use Python's str methods like the scalar code did
+        values = values.astype(object)
+    try:
+        return values.str.strip()
+    except AttributeError:
+        # No string cells at all (e.g. an all-numeric object column)
+        return pd.Series(np.nan, index=values.index, dtype=object)
+
+def _is_null_text(stripped):
+    """Mask of stripped text that is missing, empty or a null token."""
+    present = stripped.notna()
+    null = ~present | (stripped == '')
+    if present.any():
+        null[present] |= stripped[present].str.lower().isin(NULL_TOKENS)
+    return null
+
+def normalize_text(values):
+    """Normalize MPNs and descriptions for comparison.
+
+    Strips and upper-cases every cell, folding blanks and 'nan'/'none'/'null'
+    to ''. Used to build the MPN keys and to compare descriptions.
+    """
+    stripped = _strip_strings(as_text(values))
+    keep = ~_is_null_text(stripped)
+    result = pd.Series('', index=stripped.index, dtype=object)
+    if keep.any():
+        result[keep] = stripped[keep].str.upper()
+    return result
+
+def _normalize_qty_value(qty_str):
+    """Scalar quantity normalization (reference for normalize_qty)."""
+    if pd.isna(qty_str) or qty_str == '' or str(qty_str).lower() == 'nan':
+        return ''
+    try:
+        # Convert to float first, then to int if it's a whole number
+        qty_float = float(str(qty_str))
+        if qty_float == int(qty_float):
+            return str(int(qty_float))
+        else:
+            return str(qty_float)
+    except:
+        return str(qty_str).strip()
+
+def _format_numbers(values, fallback):
+    """Format a float column, whole numbers without a decimal point.
+
+    NaN becomes '' and non-finite or out-of-int64-range cells go through
+    the scalar fallback.
+    """
+    arr = values.to_numpy(dtype=float, na_value=np.nan)
+    result = pd.Series('', index=values.index, dtype=object)
+    finite = np.isfinite(arr)
+    whole = finite & (arr == np.trunc(arr)) & (np.abs(arr) < 2 ** 63)
+    fraction = finite & (arr != np.trunc(arr))
+    result[whole] = pd.Series(arr[whole].astype(np.int64)).astype(str).to_numpy(dtype=object)
+    result[fraction] = pd.Series(arr[fraction]).astype(str).to_numpy(dtype=object)
+    odd = (~finite & ~np.isnan(arr)) | (finite & ~whole & (arr == np.trunc(arr)))
+    if odd.any():
+        result[odd] = [fallback(v) for v in arr[odd]]
+    return result
+
+def normalize_qty(values):
+    """Normalize quantities so 5, 5.0 and '5' compare equal.
+
+    Numeric columns are formatted with vectorized numeric ops. Anything else
+    is normalized once per distinct cell text, since the result only depends
+    on that text.
+    """
+    values = _as_series(values)
+    if is_integer_dtype(values.dtype):
+        return values.astype(str).astype(object).where(values.notna(), '')
+    if is_float_dtype(values.dtype):
+        return _format_numbers(values, _normalize_qty_value)
+
+    text = as_text(values)
+    codes, uniques = pd.factorize(text)
+    normalized = np.array([_normalize_qty_value(v) for v in uniques] + [''], dtype=object)
+    # factorize marks missing cells with code -1, which picks the trailing ''
+    return pd.Series(normalized[codes], index=values.index, dtype=object)
+
+def _clean_value(v):
+    """Scalar display formatting (reference for to_display)."""
+    if pd.isna(v) or v == '' or str(v).lower() in ['nan', 'none', 'null']:
+        return 'N/A'
+    # Format numbers properly
+    if isinstance(v, (int, float)) and not pd.isna(v):
+        if v == int(v):
+            return str(int(v))
+        else:
+            return str(v)
+    val_str = str(v).strip()
+    if not val_str or val_str.lower() in ['nan', 'none', 'null']:
+        return 'N/A'
+    return val_str
+
+def to_display(values):
+    """Convert a result column to display strings, 'N/A' for blanks."""
+    values = _as_series(values)
+    if is_float_dtype(values.dtype):
+        formatted = _format_numbers(values, _clean_value)
+        return formatted.where(values.notna(), 'N/A')
+    if is_integer_dtype(values.dtype) or values.dtype == bool:
+        # numpy scalars are not int instances, so they take the plain str() path
+        return values.astype(str).astype(object).where(values.notna(), 'N/A')
+
+    stripped = _strip_strings(values)
+    result = stripped.where(~_is_null_text(stripped), 'N/A').astype(object)
+    # Numbers, dates and other non-string cells keep the scalar rules
+    other = stripped.isna() & values.notna()
+    if other.any():
+        result[other] = [_clean_value(v) for v in values[other]]
+    return result
@@ -0,0 +1,181 @@
+import collections
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Counters must come from the same context as the worker pool's processes
+_SPAWN = multiprocessing.get_context('spawn')
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _entry_size(entry):
+    """Approximate in-memory size of a cached (df, mapped_cols, header_row) entry."""
+    return int(entry[0].memory_usage(index=True, deep=True).sum())
+
+class ParseCache:
+    """Content-addressed cache of parsed BOMs.
+
+    Entries are keyed by the SHA-256 of the workbook bytes, so a re-uploaded
+    file skips Excel parsing whatever it is called. There are two tiers:
+    - memory: an LRU of parsed entries kept within ``memory_budget`` bytes
+    - disk (optional): pickled entries under ``disk_dir``, oldest evicted
+      first once they exceed ``disk_budget`` bytes
+
+    Each worker process has its own memory tier; the disk tier and the
+    hit/miss counters are shared by all of them.
+    """
+
+    COUNTERS = ('memory_hits', 'disk_hits', 'misses')
+
+    def __init__(self, memory_budget, disk_dir=None, disk_budget=0):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+        self.counters = {name: _SPAWN.Value('q', 0) for name in self.COUNTERS}
+        self._entries = collections.OrderedDict()
+        self._memory_used = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from BOM_PARSE_CACHE_MB, BOM_PARSE_CACHE_DIR and BOM_PARSE_CACHE_DISK_MB."""
+        return cls(
+            memory_budget=int(os.environ.get('BOM_PARSE_CACHE_MB', 256)) * 1024 * 1024,
+            disk_dir=os.environ.get('BOM_PARSE_CACHE_DIR') or None,
+            disk_budget=int(os.environ.get('BOM_PARSE_CACHE_DISK_MB', 1024)) * 1024 * 1024
+        )
+
+    def share_counters(self, counters):
+        """Use counters created in another process (worker pool initializer)."""
+        self.counters = counters
+
+    def _count(self, name):
+        counter = self.counters[name]
+        with counter.get_lock():
+            counter.value += 1
+
+    def get(self, key):
+        """Return the cached entry for ``key``, or None on a miss."""
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self._count('memory_hits')
+            return cached[0]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._count('disk_hits')
+            self._remember(key, entry)
+            return entry
+
+        self._count('misses')
+        return None
+
+    def put(self, key, entry):
+        """Store a freshly parsed entry in both tiers."""
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        size = _entry_size(entry)
+        if size > self.memory_budget:
+            return
+        if key in self._entries:
+            self._memory_used -= self._entries.pop(key)[1]
+        self._entries[key] = (entry, size)
+        self._memory_used += size
+        while self._memory_used > self.memory_budget:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._memory_used -= evicted_size
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Dropping unreadable parse cache file %s: %s", path, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Mark as recently used so size-based eviction removes it last
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Write to a temp file first so other workers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+        except OSError as e:
+            logger.warning("Could not write parse cache file for %s: %s", key, e)
+
+    def _disk_files(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict_disk(self):
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counters across all workers, plus disk tier usage."""
+        stats = {name: counter.value for name, counter in self.counters.items()}
+        lookups = sum(stats.values())
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        stats['memory_budget_bytes'] = self.memory_budget
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            files = self._disk_files()
+            stats['disk_entries'] = len(files)
+            stats['disk_bytes'] = sum(size for _, size, _ in files)
+        return stats
+
+# Process-wide cache used by compare_boms
+parse_cache = ParseCache.from_env()
+
+def share_counters(counters):
+    """Worker pool initializer: count into the server process's counters."""
+    parse_cache.share_counters(counters)
@@ -0,0 +1,141 @@
+import functools
+import re
+
+# Distinct Ref Des cell texts whose parsed sets are remembered per process
+PARSE_CACHE_SIZE = 16384
+
+# Designator numbers above this are kept as text rather than growing a
+# bitset, so a prefix's bitset is at most 1.25KB and a full parse cache a
+# few tens of MB per worker
+MAX_DESIGNATOR_NUMBER = 10000
+
+# Tokens are separated by commas, semicolons, slashes or whitespace
+_SEPARATORS = re.compile(r'[,;/\s]+')
+
+# Spaces around a range dash, so "R1 - R4" stays one token
+_RANGE_SPACING = re.compile(r'\s*(?:-|–|~|\.\.)\s*')
+
+# R12, or a range R1-R4 / R1-4 (the second prefix may be omitted). Without
+# a prefix ("C1,18", "ENC1,2-4") the previous designator's prefix applies
+_DESIGNATOR = re.compile(r'([A-Z]*)(\d+)\Z')
+_RANGE = re.compile(r'([A-Z]*)(\d+)-([A-Z]*)(\d+)\Z')
+
+class DesignatorSet:
+    """A set of reference designators, stored compactly.
+
+    Designators made of a letter prefix and a number are kept as one
+    integer bitset per prefix (bit n set for R<n>), so a board's thousands
+    of designators take a few integers and set differences are a couple
+    of big-int operations. Anything else (U1A, TP_GND) is kept as text.
+    Instances are shared through the parse cache and must not be modified.
+    """
+
+    __slots__ = ('bits', 'other')
+
+    def __init__(self, bits=None, other=frozenset()):
+        self.bits = bits or {}
+        self.other = other
+
+    def __sub__(self, other):
+        bits = {}
+        for prefix, mask in self.bits.items():
+            left = mask & ~other.bits.get(prefix, 0)
+            if left:
+                bits[prefix] = left
+        return DesignatorSet(bits, self.other - other.other)
+
+    def __eq__(self, other):
+        return isinstance(other, DesignatorSet) and self.bits == other.bits and self.other == other.other
+
+    def __bool__(self):
+        return bool(self.bits or self.other)
+
+    def __len__(self):
+        return sum(mask.bit_count() for mask in self.bits.values()) + len(self.other)
+
+    def __repr__(self):
+        return f"DesignatorSet({format_designators(self)!r})"
+
+def _set_range(mask, start, end):
+    if start > end:
+        start, end = end, start
+    return mask | (((1 << (end - start + 1)) - 1) << start)
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_designators(text):
+    """The DesignatorSet of a Ref Des cell such as "R1-R4, R7 R9".
+
+    Ranges (R1-R4, R1-4, R1..R4) are expanded, bare numbers take the
+    prefix before them (C1,18 is C1 and C18), case is ignored and leading
+    zeros are dropped (R01 is R1). Each distinct text is parsed once.
+    """
+    bits = {}
+    other = set()
+    prefix = ''
+    text = _RANGE_SPACING.sub('-', str(text).upper().strip())
+    for token in _SEPARATORS.split(text):
+        if not token:
+            continue
+        match = _DESIGNATOR.match(token)
+        if match and (match.group(1) or prefix) and int(match.group(2)) <= MAX_DESIGNATOR_NUMBER:
+            prefix = match.group(1) or prefix
+            bits[prefix] = bits.get(prefix, 0) | (1 << int(match.group(2)))
+            continue
+        match = _RANGE.match(token)
+        if (match and (match.group(1) or prefix) and match.group(3) in ('', match.group(1) or prefix)
+                and max(int(match.group(2)), int(match.group(4))) <= MAX_DESIGNATOR_NUMBER):
+            prefix = match.group(1) or prefix
+            bits[prefix] = _set_range(bits.get(prefix, 0), int(match.group(2)), int(match.group(4)))
+            continue
+        other.add(token)
+    return DesignatorSet(bits, frozenset(other))
+
+def _runs(mask):
+    """(start, end) of each run of set bits, lowest first."""
+    runs = []
+    number = 0
+    while mask:
+        # Skip the clear bits, then take the run of set bits
+        skip = (mask & -mask).bit_length() - 1
+        mask >>= skip
+        number += skip
+        length = (~mask & (mask + 1)).bit_length() - 1
+        runs.append((number, number + length - 1))
+        mask >>= length
+        number += length
+    return runs
+
+def format_designators(designators):
+    """Compact text of a DesignatorSet: "C1, R1-R4, R7, U1A"; runs of three or more become ranges."""
+    parts = []
+    for prefix in sorted(designators.bits):
+        for start, end in _runs(designators.bits[prefix]):
+            if end - start >= 2:
+                parts.append(f"{prefix}{start}-{prefix}{end}")
+            else:
+                parts.extend(f"{prefix}{number}" for number in range(start, end + 1))
+    parts.extend(sorted(designators.other))
+    return ', '.join(parts)
+
+def designator_changes(refdes1, refdes2):
+    """Added and removed designators of parts present in both files.
+
+    ``refdes1`` and ``refdes2`` hold the Ref Des text of the same parts in
+    the same order (NaN when blank). Returns the positions whose designator
+    sets differ, with the added (file2 only) and removed (file1 only) sets
+    of each. Cells with identical text are skipped without parsing.
+    """
+    text1 = refdes1.fillna('').astype(str).to_numpy(dtype=object)
+    text2 = refdes2.fillna('').astype(str).to_numpy(dtype=object)
+    positions = []
+    added = []
+    removed = []
+    for position in (text1 != text2).nonzero()[0].tolist():
+        before = parse_designators(text1[position])
+        after = parse_designators(text2[position])
+        if before == after:
+            continue
+        positions.append(position)
+        added.append(after - before)
+        removed.append(before - after)
+    return positions, added, removed
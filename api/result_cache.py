@@ -0,0 +1,87 @@
+import collections
+import hashlib
+import os
+import time
+
+class ResultCache:
+    """In-process cache of finished comparison results.
+
+    Entries are keyed by both files' content hashes and the comparison
+    settings version, so re-running an identical pair returns the stored
+    result without touching the worker pool. Entries expire ``ttl`` seconds
+    after they were stored, and the least recently used one is evicted once
+    there are more than ``max_entries``.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from BOM_RESULT_CACHE_SIZE and BOM_RESULT_CACHE_TTL."""
+        return cls(
+            max_entries=int(os.environ.get('BOM_RESULT_CACHE_SIZE', 64)),
+            ttl=int(os.environ.get('BOM_RESULT_CACHE_TTL', 3600))
+        )
+
+    @staticmethod
+    def etag(key):
+        """Strong ETag for the result stored under ``key``."""
+        return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+    def get(self, key):
+        """Return the cached result for ``key``, or None if missing or expired."""
+        cached = self._entries.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store a result, evicting expired and least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl
+        }
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value covers ``etag``."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        # If-None-Match uses weak comparison, so W/"x" matches "x"
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
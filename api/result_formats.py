@@ -0,0 +1,167 @@
+import csv
+import json
+from openpyxl import Workbook
+from excel_tool import (
+    MODIFIED_PART_FIELDS, PART_FIELDS, REFDES_CHANGE_FIELDS, RESULT_CATEGORIES, UNRECOGNIZED_PART_FIELDS
+)
+from fast_json import dumps
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: only needed for format=arrow
+    pa = None
+
+ARROW_AVAILABLE = pa is not None
+
+# Layouts a comparison result can be returned in; rows is the default
+RESULT_FORMATS = ('rows', 'columnar', 'arrow')
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# File types write_result_file can save a comparison result as
+RESULT_FILE_FORMATS = ('json', 'csv', 'xlsx')
+
+def _category_columns(category, rows):
+    """Field names of a category: its fields in row order, or the standard ones when empty."""
+    if not rows:
+        if category == 'refdes_changes':
+            return list(REFDES_CHANGE_FIELDS)
+        if category == 'unrecognized_parts':
+            return list(UNRECOGNIZED_PART_FIELDS)
+        return list(MODIFIED_PART_FIELDS if category == 'modified_parts' else PART_FIELDS)
+    columns = dict.fromkeys(rows[0])
+    for row in rows[1:]:
+        if len(row) != len(columns) or any(name not in columns for name in row):
+            columns.update(dict.fromkeys(row))
+    return list(columns)
+
+def _result_columns(results):
+    """The union of every category's fields, in category order."""
+    columns = {}
+    for category in RESULT_CATEGORIES:
+        columns.update(dict.fromkeys(_category_columns(category, results[category])))
+    return list(columns)
+
+def _dictionary_encode(values):
+    """(dictionary, indices) for a column, or None unless values repeat at least twice on average."""
+    positions = {}
+    indices = [positions.setdefault(value, len(positions)) for value in values]
+    if len(positions) * 2 > len(values):
+        return None
+    return list(positions), indices
+
+def columnar_category(category, rows, dictionary=False):
+    """One result category as a header list plus one value array per column.
+
+    With ``dictionary``, columns that repeat values (descriptions, quantities)
+    hold indices into ``dictionaries[column]`` instead of the values.
+    """
+    columns = _category_columns(category, rows)
+    values = [[row.get(name) for row in rows] for name in columns]
+    dictionaries = {}
+    if dictionary:
+        for i, name in enumerate(columns):
+            encoded = _dictionary_encode(values[i])
+            if encoded is not None:
+                dictionaries[name], values[i] = encoded
+    return {'columns': columns, 'row_count': len(rows), 'values': values, 'dictionaries': dictionaries}
+
+def columnar_results(results, dictionary=False):
+    """A compare_boms result with each category sent as columns instead of row dicts.
+
+    Key names are sent once per category rather than once per part, which
+    is most of the payload for diffs that are mostly unchanged parts.
+    Everything else (summary_stats, debug fields) is passed through.
+    """
+    columnar = {'format': 'columnar'}
+    for key, value in results.items():
+        if key in RESULT_CATEGORIES:
+            columnar[key] = columnar_category(key, value, dictionary)
+        else:
+            columnar[key] = value
+    return columnar
+
+def arrow_results(results, dictionary=False):
+    """A compare_boms result as an Arrow IPC stream.
+
+    All categories go into one table with a ``category`` column and the
+    union of the categories' fields, null where a category lacks a field.
+    Everything else (summary_stats, debug fields) is stored as JSON in the
+    schema metadata. Requires pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("format=arrow requires pyarrow")
+    columns = _result_columns(results)
+
+    categories = []
+    values = {name: [] for name in columns}
+    for category in RESULT_CATEGORIES:
+        rows = results[category]
+        categories.extend([category] * len(rows))
+        for name, column in values.items():
+            column.extend(row.get(name) for row in rows)
+
+    arrays = [pa.array(categories, type=pa.string()).dictionary_encode()]
+    for name in columns:
+        array = pa.array(values[name], type=pa.string())
+        arrays.append(array.dictionary_encode() if dictionary else array)
+    metadata = {
+        key: json.dumps(value, ensure_ascii=False)
+        for key, value in results.items() if key not in RESULT_CATEGORIES
+    }
+    table = pa.Table.from_arrays(arrays, names=['category'] + list(columns), metadata=metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def format_tag(result_format, dictionary=False):
+    """Suffix telling a format's ETag apart from the default rows result's."""
+    if result_format == 'rows':
+        return ''
+    return f"-{result_format}" + ("-dict" if dictionary else "")
+
+def write_csv_results(results, path):
+    """Write a compare_boms result as one CSV table.
+
+    Like arrow_results: a ``category`` column, then the union of the
+    categories' fields, empty where a category lacks a field. The summary
+    is not included.
+    """
+    columns = _result_columns(results)
+    # utf-8-sig so Excel opens the file as UTF-8
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['category'] + columns)
+        for category in RESULT_CATEGORIES:
+            for row in results[category]:
+                writer.writerow([category] + [row.get(name, '') for name in columns])
+
+def write_xlsx_results(results, path):
+    """Write a compare_boms result as a workbook: a Summary sheet, then a sheet per category."""
+    book = Workbook(write_only=True)
+    summary = book.create_sheet('Summary')
+    summary.append(['Statistic', 'Value'])
+    for name, value in results['summary_stats'].items():
+        summary.append([name, value])
+    for category in RESULT_CATEGORIES:
+        rows = results[category]
+        columns = _category_columns(category, rows)
+        sheet = book.create_sheet(category)
+        sheet.append(columns)
+        for row in rows:
+            sheet.append([row.get(name, '') for name in columns])
+    book.save(path)
+
+def write_result_file(results, path, file_format):
+    """Save a compare_boms result to ``path`` as json, csv or xlsx (see RESULT_FILE_FORMATS)."""
+    if file_format == 'json':
+        with open(path, 'wb') as f:
+            f.write(dumps(results))
+    elif file_format == 'csv':
+        write_csv_results(results, path)
+    elif file_format == 'xlsx':
+        write_xlsx_results(results, path)
+    else:
+        raise ValueError(f"Unknown result file format '{file_format}', expected one of {', '.join(RESULT_FILE_FORMATS)}")
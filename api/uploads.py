@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from fastapi import HTTPException
+
+# Uploads are copied in pieces this size, so memory use does not grow with the file
+CHUNK_SIZE = 1024 * 1024
+
+# Per-file limit; matches nginx's client_max_body_size by default
+MAX_UPLOAD_BYTES = int(os.environ.get('BOM_MAX_UPLOAD_MB', 16)) * 1024 * 1024
+
+# Leading bytes of each supported format: .xlsx and .xlsb are ZIP packages, .xls an
+# OLE2 compound file. Text formats (.csv) have none, but never contain NUL bytes
+MAGIC_BYTES = {
+    '.xlsx': b'PK\x03\x04',
+    '.xlsb': b'PK\x03\x04',
+    '.xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',
+}
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+async def save_upload(upload, suffix):
+    """Stream an upload to a temporary file and return (path, sha256 hex digest).
+
+    The file is copied and hashed one chunk at a time. Starlette has already
+    received and spooled the whole multipart body when this runs, so these
+    checks only spare the copy: a file whose first bytes do not match
+    ``suffix`` gets a 400 before anything is written, and one passing
+    MAX_UPLOAD_BYTES a 413 as soon as it does. Requests are only refused
+    before their body is read by the Content-Length check in main.py.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with tmp:
+            magic = MAGIC_BYTES.get(suffix)
+            chunk = await upload.read(CHUNK_SIZE)
+            valid = chunk.startswith(magic) if magic else b'\x00' not in chunk
+            if not valid:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{upload.filename} is not a valid {suffix} file"
+                )
+            while chunk:
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{upload.filename} is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(tmp.write, chunk)
+                chunk = await upload.read(CHUNK_SIZE)
+    except BaseException:
+        _remove(tmp.name)
+        raise
+    return tmp.name, digest.hexdigest()
+
+async def save_uploads(*uploads):
+    """Save several (upload, suffix) pairs concurrently.
+
+    Returns a list of (path, sha256) in the same order. If any upload is
+    rejected, the files already written are removed and its error is raised.
+    """
+    saved = await asyncio.gather(
+        *(save_upload(upload, suffix) for upload, suffix in uploads),
+        return_exceptions=True
+    )
+    errors = [result for result in saved if isinstance(result, BaseException)]
+    if errors:
+        for result in saved:
+            if not isinstance(result, BaseException):
+                _remove(result[0])
+        raise errors[0]
+    return saved
+
+def remove_uploads(paths):
+    """Delete saved uploads, ignoring files that are already gone."""
+    for path in paths:
+        _remove(path)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker gets after its own alarm fires before it is killed
+KILL_GRACE_SECONDS = 5
+
+class PoolBusyError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+class JobTimeoutError(Exception):
+    """Raised when a job runs longer than the pool's per-job timeout."""
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _init_worker(log_level, initializer, initargs):
+    """Give spawned workers the same logging setup as the server."""
+    logging.basicConfig(level=log_level)
+    if initializer is not None:
+        initializer(*initargs)
+
+def _raise_timeout(signum, frame):
+    raise JobTimeoutError("Job exceeded its time limit")
+
+def _run_job(timeout, fn, args):
+    """Run one job inside a worker process.
+
+    Where SIGALRM exists the job is interrupted after ``timeout`` seconds,
+    which stops a runaway parse without losing the worker.
+    """
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+class ComparisonPool:
+    """Bounded process pool for CPU-bound comparisons.
+
+    Settings default to the environment:
+    - BOM_WORKERS: worker processes (default: all cores)
+    - BOM_MAX_QUEUE: jobs allowed to wait for a free worker (default: 2 per worker)
+    - BOM_JOB_TIMEOUT: seconds before a job is aborted (default: 120)
+    - BOM_WORKER_MAX_JOBS: jobs a worker runs before it is replaced (default: 50)
+    """
+
+    def __init__(self, workers=None, max_queue=None, timeout=None, max_jobs_per_worker=None,
+                 initializer=None, initargs=()):
+        self.workers = workers or _env_int('BOM_WORKERS', os.cpu_count() or 1)
+        self.max_queue = max_queue if max_queue is not None else _env_int('BOM_MAX_QUEUE', 2 * self.workers)
+        self.timeout = timeout or _env_int('BOM_JOB_TIMEOUT', 120)
+        self.max_jobs_per_worker = max_jobs_per_worker or _env_int('BOM_WORKER_MAX_JOBS', 50)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.in_flight = 0
+        self._executor = None
+        # Jobs wait here for a free worker so the timeout only covers run time
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # max_tasks_per_child recycles workers so pandas/openpyxl memory cannot
+            # build up; it requires the 'spawn' start method.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=self.max_jobs_per_worker,
+                initializer=_init_worker,
+                initargs=(logging.getLogger().level, self.initializer, self.initargs)
+            )
+        return self._executor
+
+    def _restart(self):
+        """Kill every worker and start a fresh pool on the next job."""
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # ProcessPoolExecutor cannot cancel a running job, so terminate its processes
+        for process in list(getattr(executor, '_processes', {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self):
+        if self.in_flight >= self.workers + self.max_queue:
+            raise PoolBusyError(f"{self.in_flight} comparisons already running or queued")
+        self.in_flight += 1
+
+    async def _execute(self, fn, args):
+        async with self._slots:
+            executor = self._get_executor()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(executor, _run_job, self.timeout, fn, args)
+            try:
+                return await asyncio.wait_for(future, self.timeout + KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                # The job ignored its alarm (stuck in C code, or no SIGALRM on this
+                # platform), so the only way to stop it is to kill the workers.
+                logger.warning("Job exceeded %ss; restarting the worker pool", self.timeout)
+                self._restart()
+                raise JobTimeoutError("Job exceeded its time limit")
+            except BrokenProcessPool:
+                # A worker died (killed by a restart or the OOM killer); the
+                # executor is unusable, so make sure the next job gets a new one.
+                if self._executor is executor:
+                    self._executor = None
+                raise
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` in a worker process and return its result.
+
+        Raises PoolBusyError when the pool and its queue are full, and
+        JobTimeoutError when the job outlives the per-job timeout.
+        """
+        self._admit()
+        try:
+            return await self._execute(fn, args)
+        finally:
+            self.in_flight -= 1
+
+    async def run_waiting(self, fn, *args):
+        """Run ``fn(*args)`` like run, but wait for a worker however many jobs are queued.
+
+        For callers that bound their own concurrency, such as background
+        jobs, which should queue rather than fail when interactive requests
+        fill the pool. Still counted in ``in_flight``, so requests arriving
+        meanwhile see the load.
+        """
+        self.in_flight += 1
+        try:
+            return await self._execute(fn, args)
+        finally:
+            self.in_flight -= 1
+
+    async def map(self, fn, *iterables):
+        """Run ``fn`` over the zipped arguments in parallel and return the results in order.
+
+        The whole map takes a single place in the queue, so it is accepted or
+        rejected (PoolBusyError) as one job. Each call then waits for a free
+        worker like any other job and gets the per-job timeout.
+        """
+        self._admit()
+        try:
+            return await asyncio.gather(*(self._execute(fn, args) for args in zip(*iterables)))
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useCallback, useEffect } from 'react';
+import { useState, useCallback, useEffect, useRef } from 'react';
 import { useDropzone } from 'react-dropzone';
 import { Upload, FileSpreadsheet, ArrowLeftRight, CheckCircle, XCircle, AlertCircle, HelpCircle, ChevronDown, ChevronUp, Search, Printer, FileDown } from 'lucide-react';
 import axios from 'axios';
@@ -49,6 +49,35 @@ interface ComparisonResults {
   };
 }
 
+interface JobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'done' | 'failed';
+  phase: string | null;
+  progress: Record<string, { status: string; [key: string]: any }>;
+  error: { status_code: number; detail: string } | null;
+}
+
+const PHASE_LABELS: Record<string, string> = {
+  upload: 'Uploading',
+  header_detection: 'Detecting headers',
+  parse: 'Reading parts',
+  diff: 'Comparing parts',
+  serialize: 'Preparing results',
+};
+
+// How often a running comparison job is polled
+const JOB_POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+interface CachedComparison {
+  etag: string;
+  results: ComparisonResults;
+}
+
+// Identifies a selected file without reading it; re-selecting the same file gives the same key
+const fileKey = (file: File) => `${file.name}:${file.size}:${file.lastModified}`;
+
 export default function Home() {
   const [file1, setFile1] = useState<File | null>(null);
   const [file2, setFile2] = useState<File | null>(null);
@@ -56,10 +85,13 @@ export default function Home() {
   const [fileName2, setFileName2] = useState<string>('');
   const [results, setResults] = useState<ComparisonResults | null>(null);
   const [loading, setLoading] = useState(false);
+  const [progressMessage, setProgressMessage] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState<string>('');
   const [expandedCategories, setExpandedCategories] = useState<Set<string>>(new Set(['category-1', 'category-2', 'category-3']));
   const [prePrintExpanded, setPrePrintExpanded] = useState<Set<string> | null>(null);
+  // Last result per file pair, revalidated with If-None-Match instead of re-downloaded
+  const comparisonCache = useRef<Map<string, CachedComparison>>(new Map());
   const onDrop1 = useCallback((acceptedFiles: File[]) => {
     if (acceptedFiles.length > 0) {
       setFile1(acceptedFiles[0]);
@@ -80,6 +112,8 @@ export default function Home() {
     accept: {
       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
       'application/vnd.ms-excel': ['.xls'],
+      'application/vnd.ms-excel.sheet.binary.macroEnabled.12': ['.xlsb'],
+      'text/csv': ['.csv'],
     },
     multiple: false,
   });
@@ -89,6 +123,8 @@ export default function Home() {
     accept: {
       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
       'application/vnd.ms-excel': ['.xls'],
+      'application/vnd.ms-excel.sheet.binary.macroEnabled.12': ['.xlsb'],
+      'text/csv': ['.csv'],
     },
     multiple: false,
   });
@@ -101,23 +137,70 @@ export default function Home() {
 
     setLoading(true);
     setError(null);
+    setProgressMessage(null);
 
     try {
       const formData = new FormData();
       formData.append('file1', file1); 
       formData.append('file2', file2);
 
-      // Use relative URL to work with ngrok and any domain
-      const apiUrl = '/api/compare';
-      const response = await axios.post(apiUrl, formData, {
+      const pairKey = `${fileKey(file1)}|${fileKey(file2)}`;
+      const cached = comparisonCache.current.get(pairKey);
+
+      const requestConfig = {
         headers: {
-          'Content-Type': 'multipart/form-data',
           'ngrok-skip-browser-warning': 'true', // Skip ngrok warning page
         },
-        timeout: 120000, // 120 second timeout
+        timeout: 120000, // 120 second timeout per request
         withCredentials: false, // Don't send credentials for CORS
+      };
+
+      // Submit a background job; use relative URLs to work with ngrok and any domain
+      setProgressMessage(PHASE_LABELS.upload);
+      const submitted = await axios.post('/api/jobs', formData, {
+        ...requestConfig,
+        headers: {
+          ...requestConfig.headers,
+          'Content-Type': 'multipart/form-data',
+          ...(cached ? { 'If-None-Match': cached.etag } : {}),
+        },
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
       });
 
+      if (submitted.status === 304 && cached) {
+        // Same pair as before and the server's result has not changed
+        setResults(cached.results);
+        return;
+      }
+
+      // Poll the job instead of holding one request open for the whole comparison
+      const jobId: string = submitted.data.job_id;
+      let job: JobStatus;
+      for (;;) {
+        job = (await axios.get(`/api/jobs/${jobId}`, requestConfig)).data;
+        if (job.status === 'done' || job.status === 'failed') {
+          break;
+        }
+        const parsed = job.progress.parse;
+        const rows = ['file1', 'file2']
+          .map((file) => parsed?.[file]?.rows)
+          .filter((count) => count !== undefined);
+        const label = job.status === 'queued' ? 'Waiting for a free worker' : PHASE_LABELS[job.phase ?? 'upload'];
+        setProgressMessage(rows.length > 0 && job.phase === 'parse' ? `${label} (${rows.join(' / ')} rows)` : label);
+        await sleep(JOB_POLL_INTERVAL_MS);
+      }
+
+      if (job.status === 'failed') {
+        throw { response: { status: job.error?.status_code, data: { detail: job.error?.detail } } };
+      }
+
+      const response = await axios.get(`/api/jobs/${jobId}/result`, requestConfig);
+
+      const etag = response.headers['etag'];
+      if (etag) {
+        comparisonCache.current.set(pairKey, { etag, results: response.data });
+      }
+
       console.log('API Response:', response.data);
       
       // Debug: Check what's in modified_parts
@@ -142,7 +225,7 @@ export default function Home() {
         } else if (err.response.status === 500) {
           errorMessage = 'Server error occurred. Please try again.';
         } else if (err.response.status === 400) {
-          errorMessage = 'Invalid file format. Please upload Excel files only.';
+          errorMessage = 'Invalid file format. Please upload Excel or CSV files only.';
         }
       } else if (err.request) {
         // Request was made but no response received
@@ -155,6 +238,7 @@ export default function Home() {
       setError(errorMessage);
     } finally {
       setLoading(false);
+      setProgressMessage(null);
     }
   };
 
@@ -612,7 +696,7 @@ export default function Home() {
           {loading ? (
             <>
               <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-white"></div>
-              Comparing...
+              {progressMessage ? `${progressMessage}...` : 'Comparing...'}
             </>
           ) : (
             <>
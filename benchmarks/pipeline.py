@@ -0,0 +1,150 @@
+"""Time each stage of the comparison pipeline on synthetic BOMs of growing size.
+
+    python benchmarks/pipeline.py [--sizes 100,1000,10000,50000,200000] [--repeat 3]
+        [--output results.json] [--baseline previous.json] [generator options]
+
+Stages are timed separately: header detection (find_header_row_and_map),
+parsing (read_bom_with_auto_headers), compare_boms, and a full
+/api/compare round trip through the app and its worker pool. The caches
+and the header fingerprint store are disabled so every run parses from
+scratch. Results are written as JSON, under benchmarks/results/ unless
+--output is given; --baseline prints how each stage changed against an
+earlier results file.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Set before the app is imported so its workers inherit them
+os.environ['BOM_PARSE_CACHE_MB'] = '0'
+os.environ['BOM_PARSE_CACHE_DIR'] = ''
+os.environ['BOM_RESULT_CACHE_SIZE'] = '0'
+os.environ['BOM_HEADER_FINGERPRINT_DB'] = ''
+os.environ.setdefault('BOM_JOB_TIMEOUT', '3600')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'api'))
+
+import pandas as pd
+from excel_tool import compare_boms, find_header_row_and_map, read_bom_with_auto_headers
+from synthetic_bom import add_generator_arguments, generate_pair
+
+DEFAULT_SIZES = '100,1000,10000,50000,200000'
+
+STAGES = ('find_header_row_and_map', 'read_bom_with_auto_headers', 'compare_boms', 'api_compare')
+
+def time_stage(run, repeat):
+    """Median and best seconds of ``repeat`` calls to ``run``."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return {'median_s': round(statistics.median(timings), 4), 'min_s': round(min(timings), 4)}
+
+def api_round_trip(client, file1, file2):
+    with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+        response = client.post('/api/compare', files={
+            'file1': (os.path.basename(file1), f1),
+            'file2': (os.path.basename(file2), f2)
+        })
+    if response.status_code != 200:
+        raise RuntimeError(f"/api/compare returned {response.status_code}: {response.text[:200]}")
+    return response.content
+
+def run_size(client, rows, args, data_dir):
+    """Generate a BOM pair of ``rows`` parts and time every stage on it."""
+    file1, file2 = generate_pair(
+        os.path.join(data_dir, str(rows)), rows, args.columns, args.header_offset,
+        args.duplicate_rate, args.change_rate, args.seed
+    )
+    # Untimed first runs load the lazy imports and start the workers
+    summary = compare_boms(file1, file2)['summary_stats']
+    api_round_trip(client, file1, file2)
+    timings = {
+        'find_header_row_and_map': time_stage(lambda: find_header_row_and_map(file1), args.repeat),
+        'read_bom_with_auto_headers': time_stage(lambda: read_bom_with_auto_headers(file1), args.repeat),
+        'compare_boms': time_stage(lambda: compare_boms(file1, file2), args.repeat),
+        'api_compare': time_stage(lambda: api_round_trip(client, file1, file2), args.repeat)
+    }
+    return {
+        'rows': rows,
+        'file_bytes': [os.path.getsize(file1), os.path.getsize(file2)],
+        'summary_stats': summary,
+        'timings': timings
+    }
+
+def print_result(result, baseline=None):
+    print(f"{result['rows']} rows")
+    for stage in STAGES:
+        median = result['timings'][stage]['median_s']
+        line = f"  {stage:28} {median * 1000:10.1f} ms"
+        previous = (baseline or {}).get(stage)
+        if previous:
+            line += f"  ({median / previous['median_s']:.2f}x baseline)"
+        print(line)
+
+def load_baseline(path):
+    """Timings of an earlier run, keyed by row count."""
+    with open(path) as f:
+        return {result['rows']: result['timings'] for result in json.load(f)['results']}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/pipeline-<time>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--keep-data', help='write the generated workbooks here and keep them')
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    started = datetime.datetime.now(datetime.timezone.utc)
+    output = args.output or os.path.join(HERE, 'results', f"pipeline-{started:%Y%m%d-%H%M%S}.json")
+    data_dir = args.keep_data or tempfile.mkdtemp(prefix='bom-bench-')
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    results = []
+    try:
+        with TestClient(app_main.app) as client:
+            for rows in sizes:
+                result = run_size(client, rows, args, data_dir)
+                print_result(result, baseline.get(rows))
+                results.append(result)
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'started_at': started.isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'generator': {
+                'columns': args.columns,
+                'header_offset': args.header_offset,
+                'duplicate_rate': args.duplicate_rate,
+                'change_rate': args.change_rate,
+                'seed': args.seed
+            },
+            'results': results
+        }, f, indent=2)
+    print(f"Wrote {output}")
+
+if __name__ == '__main__':
+    main()
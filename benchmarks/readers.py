@@ -0,0 +1,138 @@
+"""Time each reader backend on the same workbooks and check they read them alike.
+
+    python benchmarks/readers.py [files or directories ...] [--repeat 5] [--output results.json]
+
+Every installed backend that reads a file's format (openpyxl, xlrd, csv,
+calamine when python-calamine is installed) reads its first sheet twice:
+the raw cell grid (read_sheet_grid) and the full parse with header
+detection (read_bom_with_auto_headers). The first backend listed for a
+format is the reference; the others report whether their grid and typed
+frame equal its. Files default to test_files/. Results are written as
+JSON, under benchmarks/results/ unless --output is given.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Set before excel_tool is imported: nothing is cached and header detection always runs
+os.environ['BOM_PARSE_CACHE_MB'] = '0'
+os.environ['BOM_PARSE_CACHE_DIR'] = ''
+os.environ['BOM_HEADER_FINGERPRINT_DB'] = ''
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'api'))
+
+import pandas as pd
+from excel_tool import READERS, grid_to_frame, read_bom_with_auto_headers, read_sheet_grid, use_reader
+
+DEFAULT_FILES = os.path.join(HERE, '..', 'test_files')
+
+# Reference backends first, so each format is checked against the reader it always had
+BACKEND_ORDER = ('openpyxl', 'xlrd', 'csv', 'calamine')
+
+def time_call(run, repeat):
+    """Median and best seconds of ``repeat`` calls to ``run``, and the last call's result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+    return {'median_s': round(statistics.median(timings), 4), 'min_s': round(min(timings), 4)}, result
+
+def same_cells(grid1, grid2):
+    """Whether two grids hold the same cells, of the same types (NaN equals NaN)."""
+    if len(grid1) != len(grid2):
+        return False
+    for row1, row2 in zip(grid1, grid2):
+        if len(row1) != len(row2):
+            return False
+        for cell1, cell2 in zip(row1, row2):
+            if type(cell1) is not type(cell2) or (cell1 != cell2 and not (cell1 != cell1 and cell2 != cell2)):
+                return False
+    return True
+
+def find_files(paths):
+    extensions = {ext for reader in READERS.values() for ext in reader.extensions}
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.splitext(name)[1].lower() in extensions
+            )
+        else:
+            files.append(path)
+    return files
+
+def run_file(path, repeat):
+    """Time every backend that can read ``path``, comparing each with the first."""
+    ext = os.path.splitext(path)[1].lower()
+    backends = [
+        name for name in BACKEND_ORDER
+        if READERS[name].available and ext in READERS[name].extensions
+    ]
+    results = []
+    reference = None
+    for name in backends:
+        with use_reader(name):
+            grid_timing, grid = time_call(lambda: read_sheet_grid(path), repeat)
+            parse_timing, _ = time_call(lambda: read_bom_with_auto_headers(path), repeat)
+        frame = grid_to_frame(grid)
+        result = {'backend': name, 'rows': len(grid), 'grid': grid_timing, 'parse': parse_timing}
+        if reference is None:
+            reference = grid, frame
+        else:
+            result['same_grid'] = same_cells(grid, reference[0])
+            result['same_frame'] = frame.equals(reference[1])
+        results.append(result)
+    return {'file': os.path.basename(path), 'file_bytes': os.path.getsize(path), 'backends': results}
+
+def print_result(result):
+    print(result['file'])
+    fastest = min(backend['parse']['median_s'] for backend in result['backends'])
+    for backend in result['backends']:
+        line = (
+            f"  {backend['backend']:10} grid {backend['grid']['median_s'] * 1000:9.1f} ms"
+            f"  parse {backend['parse']['median_s'] * 1000:9.1f} ms"
+            f"  ({backend['parse']['median_s'] / fastest:.1f}x fastest)"
+        )
+        if 'same_grid' in backend:
+            line += f"  grid {'same' if backend['same_grid'] else 'DIFFERS'}"
+            line += f", frame {'same' if backend['same_frame'] else 'DIFFERS'}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=[DEFAULT_FILES], help='workbooks or directories of them')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/readers-<time>.json)')
+    args = parser.parse_args()
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    output = args.output or os.path.join(HERE, 'results', f"readers-{started:%Y%m%d-%H%M%S}.json")
+    results = []
+    for path in find_files(args.paths):
+        result = run_file(path, args.repeat)
+        print_result(result)
+        results.append(result)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'started_at': started.isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'backends': [name for name in BACKEND_ORDER if READERS[name].available],
+            'repeat': args.repeat,
+            'results': results
+        }, f, indent=2)
+    print(f"Wrote {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Serialization cost of a comparison result: jsonable_encoder + JSONResponse
+against fast_json (orjson, and its standard library fallback).
+
+    python benchmarks/serialization.py [--parts 50000] [--repeat 5] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import fast_json
+
+def make_result(parts):
+    """A compare_boms-shaped result with ``parts`` parts, mostly unchanged."""
+    def part(i):
+        return {
+            'MPN': f'RC0402FR-07{i:06d}L',
+            'Ref Des/LOC': f'R{i}, R{i + 1}',
+            'Qty': str(i % 12 + 1),
+            'Description': f'RES SMD {i % 500} OHM 1% 1/16W 0402',
+            'Line Number': str(i + 2)
+        }
+
+    def modified(i):
+        return {
+            'MPN': f'GRM155R71C{i:06d}KA01D',
+            'Ref Des/LOC': f'C{i}',
+            'File1 Ref Des': f'C{i}',
+            'File2 Ref Des': f'C{i}',
+            'File1 Qty': '2',
+            'File2 Qty': '3',
+            'File1 Description': 'CAP CER 0.1UF 16V X7R 0402',
+            'File2 Description': 'CAP CER 0.1UF 25V X7R 0402',
+            'File1 Line': str(i + 2),
+            'File2 Line': str(i + 3)
+        }
+
+    # 80% unchanged, 10% modified, 6% new, 4% removed
+    counts = [int(parts * share) for share in (0.06, 0.04, 0.10)]
+    new, removed, changed = counts
+    unchanged = parts - sum(counts)
+    return {
+        'new_parts': [part(i) for i in range(new)],
+        'removed_parts': [part(i) for i in range(removed)],
+        'modified_parts': [modified(i) for i in range(changed)],
+        'unchanged_parts': [part(i) for i in range(unchanged)],
+        'unrecognized_parts': [],
+        'refdes_changes': [],
+        'summary_stats': {
+            'total_parts_file1': removed + changed + unchanged,
+            'total_parts_file2': new + changed + unchanged,
+            'new_parts_count': new,
+            'removed_parts_count': removed,
+            'modified_parts_count': changed,
+            'unchanged_parts_count': unchanged,
+            'unrecognized_parts_count': 0,
+            'refdes_changes_count': 0
+        }
+    }
+
+def time_body(render, repeat):
+    """Median and best seconds to render a response body, plus the body."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--parts', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='also write the timings to this JSON file')
+    args = parser.parse_args()
+
+    result = make_result(args.parts)
+    encoder = fast_json.orjson
+    cases = {
+        'jsonable_encoder+JSONResponse': lambda: JSONResponse(content=jsonable_encoder(result)).body,
+        'FastJSONResponse (stdlib json)': lambda: fast_json.FastJSONResponse(content=result).body,
+    }
+    if encoder is not None:
+        cases['FastJSONResponse (orjson)'] = lambda: fast_json.FastJSONResponse(content=result).body
+
+    timings = {}
+    reference = None
+    for name, render in cases.items():
+        # Only the orjson case runs with the optional encoder available
+        fast_json.orjson = encoder if 'orjson' in name else None
+        median, best, body = time_body(render, args.repeat)
+        if reference is None:
+            reference = json.loads(body)
+        elif json.loads(body) != reference:
+            raise SystemExit(f"{name} produced a different document")
+        timings[name] = {'median_s': round(median, 4), 'best_s': round(best, 4), 'bytes': len(body)}
+    fast_json.orjson = encoder
+
+    baseline = timings['jsonable_encoder+JSONResponse']['median_s']
+    print(f"{args.parts} parts, median of {args.repeat} runs")
+    for name, timing in timings.items():
+        print(f"  {name:32} {timing['median_s'] * 1000:9.1f} ms  {baseline / timing['median_s']:6.1f}x  {timing['bytes']} bytes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parts': args.parts, 'repeat': args.repeat, 'timings': timings}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Synthetic BOM workbooks for benchmarking the comparison pipeline.
+
+    python benchmarks/synthetic_bom.py out_dir [--rows 10000] [--columns 8] [--header-offset 2]
+        [--duplicate-rate 0.02] [--change-rate 0.1] [--seed 0]
+
+Writes out_dir/bom_a.xlsx and out_dir/bom_b.xlsx, a revision of the first
+with parts added, removed and with changed quantities and descriptions.
+"""
+import argparse
+import os
+import random
+from openpyxl import Workbook
+
+# The columns header detection maps; extra columns are filled with prices
+STANDARD_HEADERS = ['Item', 'MPN', 'Qty', 'Ref Des', 'Description']
+
+REFDES_PREFIXES = ['R', 'C', 'U', 'D', 'L', 'Q', 'J']
+
+DESCRIPTIONS = [
+    'RES SMD {} OHM 1% 1/16W 0402',
+    'CAP CER {}PF 50V C0G 0603',
+    'IC MCU 32BIT {}KB FLASH LQFP',
+    'DIODE SCHOTTKY {}V 1A SOD123',
+    'INDUCTOR {}UH 2A SMD',
+    'MOSFET N-CH {}V 5A SOT23',
+    'CONN HEADER {} POS 2.54MM'
+]
+
+# Kinds of change between the two revisions, picked with equal weight
+MUTATIONS = ('add', 'remove', 'qty', 'desc')
+
+def _part(rng, number):
+    kind = rng.randrange(len(REFDES_PREFIXES))
+    count = rng.choice([1, 1, 1, 2, 4])
+    first = rng.randrange(1, 999)
+    return {
+        'mpn': f'{REFDES_PREFIXES[kind]}{number:07d}-{rng.randrange(100):02d}',
+        'qty': count,
+        'refdes': ', '.join(f'{REFDES_PREFIXES[kind]}{first + i}' for i in range(count)),
+        'description': DESCRIPTIONS[kind].format(rng.choice([1, 10, 22, 47, 100, 220, 470]))
+    }
+
+def make_parts(rows, duplicate_rate=0.0, seed=0):
+    """Parts of the first revision; ``duplicate_rate`` of them repeat an earlier MPN."""
+    rng = random.Random(seed)
+    parts = []
+    for number in range(rows):
+        part = _part(rng, number)
+        if parts and rng.random() < duplicate_rate:
+            part['mpn'] = rng.choice(parts)['mpn']
+        parts.append(part)
+    return parts
+
+def mutate_parts(parts, change_rate=0.1, seed=0):
+    """A revision of ``parts`` where ``change_rate`` of them are added, removed or changed."""
+    rng = random.Random(seed + 1)
+    revised = []
+    added = 0
+    for part in parts:
+        if rng.random() >= change_rate:
+            revised.append(part)
+            continue
+        mutation = rng.choice(MUTATIONS)
+        if mutation == 'add':
+            revised.append(part)
+            revised.append(_part(rng, len(parts) + added))
+            added += 1
+        elif mutation == 'qty':
+            revised.append(dict(part, qty=part['qty'] + rng.randrange(1, 5)))
+        elif mutation == 'desc':
+            revised.append(dict(part, description=part['description'] + ' AEC-Q200'))
+        # 'remove' drops the part
+    return revised
+
+def write_bom(path, parts, columns=len(STANDARD_HEADERS), header_offset=0):
+    """Write parts as a BOM sheet with ``header_offset`` title rows above the header."""
+    extra = max(columns - len(STANDARD_HEADERS), 0)
+    workbook = Workbook()
+    sheet = workbook.active
+    for i in range(header_offset):
+        sheet.append(['Synthetic BOM'] if i == 0 else [])
+    sheet.append(STANDARD_HEADERS + [f'Price {i + 1}' for i in range(extra)])
+    for item, part in enumerate(parts, start=1):
+        sheet.append(
+            [item, part['mpn'], part['qty'], part['refdes'], part['description']]
+            + [round(item * 0.01 + i, 2) for i in range(extra)]
+        )
+    # Not write_only: openpyxl then records the sheet dimension, which readers rely on
+    workbook.save(path)
+
+def generate_pair(out_dir, rows, columns=len(STANDARD_HEADERS), header_offset=0,
+                  duplicate_rate=0.0, change_rate=0.1, seed=0):
+    """Write a BOM and a revision of it to out_dir; returns both paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    parts = make_parts(rows, duplicate_rate, seed)
+    paths = os.path.join(out_dir, 'bom_a.xlsx'), os.path.join(out_dir, 'bom_b.xlsx')
+    write_bom(paths[0], parts, columns, header_offset)
+    write_bom(paths[1], mutate_parts(parts, change_rate, seed), columns, header_offset)
+    return paths
+
+def add_generator_arguments(parser):
+    parser.add_argument('--columns', type=int, default=8, help='columns per sheet, at least the 5 mapped ones')
+    parser.add_argument('--header-offset', type=int, default=2, help='title rows above the header')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02, help='share of rows repeating an earlier MPN')
+    parser.add_argument('--change-rate', type=float, default=0.1, help='share of rows added, removed or changed')
+    parser.add_argument('--seed', type=int, default=0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=10000)
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    for path in generate_pair(args.out_dir, args.rows, args.columns, args.header_offset,
+                              args.duplicate_rate, args.change_rate, args.seed):
+        print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The backend modules import each other by bare name, as when run from api/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+# Stored header layouts go to a store of this run, never the shared one
+os.environ['BOM_HEADER_FINGERPRINT_DB'] = os.path.join(tempfile.mkdtemp(prefix='bom-tests-'), 'fingerprints.sqlite3')
@@ -0,0 +1,59 @@
+import random
+import pandas as pd
+import pytest
+from excel_tool import compare_parsed
+
+COLUMNS = {'mpn': 'MPN', 'qty': 'Qty', 'description': 'Description'}
+
+def key(mpn):
+    """The old per-cell MPN key."""
+    text = '' if mpn is None else str(mpn).strip()
+    return '' if text.lower() in ('', 'nan', 'none', 'null') else text.upper()
+
+def spelled(mpn, rng):
+    return rng.choice([mpn, mpn.lower(), f" {mpn} "])
+
+def generated_bom(rng, mpns):
+    rows = []
+    for mpn in mpns:
+        rows.append((spelled(mpn, rng), rng.randint(1, 3), rng.choice(['Resistor', 'Capacitor'])))
+        if rng.random() < 0.2:
+            # A split line of the same part
+            rows.append((spelled(mpn, rng), rng.randint(1, 3), 'Other line'))
+        if rng.random() < 0.05:
+            rows.append((rng.choice(['', '  ', None, 'N/A', 'null']), 1, 'Blank MPN'))
+    rng.shuffle(rows)
+    return pd.DataFrame(rows, columns=['MPN', 'Qty', 'Description']), dict(COLUMNS)
+
+def expected_parts(df):
+    """{key: (summed qty, first description)} in order of first appearance, blank keys dropped."""
+    parts = {}
+    for mpn, qty, description in df.itertuples(index=False):
+        if not key(mpn):
+            continue
+        total, first = parts.get(key(mpn), (0, description))
+        parts[key(mpn)] = (total + qty, first)
+    return parts
+
+@pytest.mark.parametrize('seed', range(5))
+def test_parts_are_classified_like_the_key_sets(seed):
+    rng = random.Random(seed)
+    catalog = [f"RC0805-{n:04d}" for n in range(300)]
+    bom1 = generated_bom(rng, rng.sample(catalog, 200))
+    bom2 = generated_bom(rng, rng.sample(catalog, 200))
+    parts1, parts2 = expected_parts(bom1[0]), expected_parts(bom2[0])
+
+    results = compare_parsed(bom1, bom2)
+    assert [key(part['MPN']) for part in results['new_parts']] == [k for k in parts2 if k not in parts1]
+    assert [key(part['MPN']) for part in results['removed_parts']] == [k for k in parts1 if k not in parts2]
+    assert results['unrecognized_parts'] == []
+
+    shared = [k for k in parts1 if k in parts2]
+    modified = [k for k in shared if parts1[k][0] != parts2[k][0] or parts1[k][1] != parts2[k][1]]
+    assert [key(part['MPN']) for part in results['modified_parts']] == modified
+    assert [key(part['MPN']) for part in results['unchanged_parts']] == [k for k in shared if k not in modified]
+    for part in results['modified_parts']:
+        assert (part['File1 Qty'], part['File2 Qty']) == tuple(str(parts[key(part['MPN'])][0]) for parts in (parts1, parts2))
+
+    stats = results['summary_stats']
+    assert (stats['total_parts_file1'], stats['total_parts_file2']) == (len(parts1), len(parts2))
@@ -0,0 +1,47 @@
+import pytest
+from excel_tool import CsvReader, _csv_delimiter, read_bom_with_auto_headers
+
+def write(tmp_path, text, encoding='utf-8', name='bom.csv'):
+    path = tmp_path / name
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+def read(path):
+    reader = CsvReader(path)
+    try:
+        return [list(row) for row in reader.iter_rows(0)]
+    finally:
+        reader.close()
+
+@pytest.mark.parametrize('delimiter', [',', ';', '\t', '|'])
+def test_delimiters(tmp_path, delimiter):
+    text = delimiter.join(['MPN', 'Qty', 'Ref Des']) + '\n' + delimiter.join(['LM358', '2', 'U1']) + '\n'
+    assert read(write(tmp_path, text)) == [['MPN', 'Qty', 'Ref Des'], ['LM358', '2', 'U1']]
+
+def test_title_line_and_commas_in_semicolon_cells(tmp_path):
+    path = write(tmp_path, 'BOM Rev B\n\nMPN;Qty;Ref Des;Description\nLM358;2;U1,U2;Opamp\nNE555;1;U3;Timer\n')
+    assert read(path) == [
+        ['BOM Rev B'], [], ['MPN', 'Qty', 'Ref Des', 'Description'],
+        ['LM358', '2', 'U1,U2', 'Opamp'], ['NE555', '1', 'U3', 'Timer']
+    ]
+    df, mapped_cols = read_bom_with_auto_headers(path)
+    assert mapped_cols == {'mpn': 'MPN', 'qty': 'Qty', 'refdes': 'Ref Des', 'description': 'Description'}
+    assert df['Ref Des'].tolist() == ['U1,U2', 'U3']
+
+def test_quoted_delimiters_do_not_count():
+    assert _csv_delimiter('MPN,Qty,Ref Des\nLM358,2,"U1;U2;U3"\nNE555,1,"U4;U5"\n') == ','
+
+def test_single_column_and_empty_text_default_to_comma():
+    assert _csv_delimiter('MPN\nLM358\n') == ','
+    assert _csv_delimiter('') == ','
+
+def test_encodings_and_trailing_cells(tmp_path):
+    assert read(write(tmp_path, '﻿MPN,Qty,,\nµA741,1,,\n')) == [['MPN', 'Qty'], ['µA741', '1']]
+    assert read(write(tmp_path, 'MPN;Description\nR1K;1kΩ ±1%\n')) == [['MPN', 'Description'], ['R1K', '1kΩ ±1%']]
+    assert read(write(tmp_path, 'MPN;Description\nR1K;25°C\n', 'cp1252')) == [['MPN', 'Description'], ['R1K', '25°C']]
+
+def test_one_sheet_named_after_the_file(tmp_path):
+    reader = CsvReader(write(tmp_path, 'MPN\nLM358\n', name='Rev B.csv'))
+    assert reader.sheet_names() == ['Rev B']
+    with pytest.raises(IndexError):
+        reader.iter_rows(1)
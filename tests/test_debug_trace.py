@@ -0,0 +1,26 @@
+from openpyxl import Workbook
+from excel_tool import compare_boms, compare_boms_traced
+
+def write_bom(path, rows):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(['Assembly 100-200 Rev A'])
+    sheet.append(['MPN', 'Qty', 'Ref Des', 'Description'])
+    for row in rows:
+        sheet.append(row)
+    book.save(path)
+    return str(path)
+
+def test_trace_is_complete_when_the_files_were_parsed_before(tmp_path):
+    file1 = write_bom(tmp_path / 'a.xlsx', [['LM358', 2, 'U1, U2', 'Opamp'], ['NE555', 1, 'U3', 'Timer']])
+    file2 = write_bom(tmp_path / 'b.xlsx', [['LM358', 3, 'U1-U3', 'Opamp']])
+    # Fills the parse cache and the stored header layouts
+    compare_boms(file1, file2)
+
+    first, stats = compare_boms_traced(file1, file2)
+    second, _ = compare_boms_traced(file1, file2)
+    assert first['debug_log'] == second['debug_log']
+    assert sum('Selected MPN column' in line for line in first['debug_log']) == 2
+    assert not any('known layout' in line for line in first['debug_log'])
+    assert set(stats['phases']) == {'header_detection', 'parse', 'diff'}
+    assert first['summary_stats'] == compare_boms(file1, file2)['summary_stats']
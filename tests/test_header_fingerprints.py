@@ -0,0 +1,96 @@
+import sqlite3
+import time
+import pytest
+from header_fingerprints import PIN_AFTER_SEEN, HeaderFingerprintStore, _fits, fingerprint
+
+HEADER = ['MPN', 'Qty', 'Ref Des']
+COL_MAP = {'mpn': 0, 'qty': 1, 'refdes': 2}
+
+@pytest.fixture
+def store(tmp_path):
+    return HeaderFingerprintStore(str(tmp_path / 'fingerprints.sqlite3'), max_entries=3)
+
+def head(header, header_row=1):
+    return [['Assembly 100-200']] * header_row + [header, ['LM358', 2, 'U1, U2']]
+
+def pin(store, header, header_row=1, version=0):
+    for _ in range(PIN_AFTER_SEEN):
+        store.remember(header, header_row, COL_MAP, version)
+
+def test_layouts_are_used_once_pinned(store):
+    store.remember(HEADER, 1, COL_MAP)
+    assert store.match(head(HEADER)) is None
+    store.remember(HEADER, 1, COL_MAP)
+    assert store.match(head(HEADER)) == (1, COL_MAP)
+    # The row index is part of the fingerprint
+    assert store.match(head(HEADER, header_row=2)) is None
+    assert store.stats()['hits'] == 1
+
+def test_only_pinning_changes_the_generation(store):
+    generation = store.counters['generation']
+    store.remember(HEADER, 1, COL_MAP)
+    assert generation.value == 0
+    store.remember(HEADER, 1, COL_MAP)
+    assert generation.value == 1
+
+def test_fits():
+    assert _fits(HEADER, COL_MAP)
+    assert _fits(HEADER + ['Notes'], {'mpn': 0})
+    # Every mapped column must still hold a header of its role, and an MPN column is required
+    assert not _fits(HEADER, {'mpn': 1})
+    assert not _fits(HEADER, {'mpn': 0, 'qty': 5})
+    assert not _fits(HEADER, {'qty': 1})
+
+def test_a_map_that_does_not_fit_falls_back_to_detection(store):
+    pin(store, HEADER)
+    with store._connect() as connection:
+        connection.execute('UPDATE fingerprints SET col_map = ?', ('{"mpn": 1}',))
+    store.counters['generation'].value += 1
+    assert store.match(head(HEADER)) is None
+
+def test_other_versions_are_not_matched_and_are_dropped(store):
+    pin(store, HEADER, version=3)
+    assert store.match(head(HEADER), version=3) == (1, COL_MAP)
+    assert store.match(head(HEADER), version=4) is None
+    assert fingerprint(HEADER, 1, 3) != fingerprint(HEADER, 1, 4)
+    store.remember(['Part Number', 'Quantity'], 0, {'mpn': 0, 'qty': 1}, version=4)
+    assert [entry['version'] for entry in store.entries()] == [4]
+
+def test_least_hit_pinned_and_oldest_unpinned_layouts_are_evicted(store):
+    headers = [HEADER + [f"Note {n}"] for n in range(4)]
+    for header in headers:
+        pin(store, header)
+        time.sleep(0.01)
+    kept = {tuple(entry['header']) for entry in store.entries()}
+    assert kept == {tuple(header) for header in headers[1:]}
+
+    store.match(head(headers[1]))
+    store.flush_hits()
+    for n in range(5):
+        store.remember(HEADER + [f"One-off {n}"], 1, COL_MAP)
+        time.sleep(0.01)
+    entries = store.entries()
+    assert sum(entry['pinned'] for entry in entries) == 3
+    assert [entry['header'][-1] for entry in entries if not entry['pinned']] == ['One-off 2', 'One-off 3', 'One-off 4']
+    assert entries[0]['hits'] == 1
+
+def test_stores_from_before_versions_and_pinning_stay_in_use(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE fingerprints (fingerprint TEXT PRIMARY KEY, header_row INTEGER NOT NULL, '
+            'header TEXT NOT NULL, col_map TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, '
+            'created_at REAL NOT NULL, last_hit_at REAL)'
+        )
+        connection.execute(
+            'INSERT INTO fingerprints (fingerprint, header_row, header, col_map, created_at) VALUES (?, ?, ?, ?, ?)',
+            (fingerprint(HEADER, 1), 1, '[]', '{"mpn": 0, "qty": 1, "refdes": 2}', time.time())
+        )
+    connection.close()
+    assert HeaderFingerprintStore(path).match(head(HEADER)) == (1, COL_MAP)
+
+def test_disabled_store(tmp_path):
+    store = HeaderFingerprintStore(None)
+    store.remember(HEADER, 1, COL_MAP)
+    assert store.match(head(HEADER)) is None
+    assert store.entries() == []
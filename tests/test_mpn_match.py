@@ -0,0 +1,50 @@
+import pytest
+from mpn_match import match_mpns, similarity, squash
+
+def test_squash_drops_case_spaces_and_punctuation():
+    assert squash('lm358dr-t') == squash('LM358 DRT') == 'LM358DRT'
+
+@pytest.mark.parametrize('mpn1, mpn2', [
+    ('NE555 P', 'NE555P'),
+    ('lm358dr', 'LM358-DR'),
+])
+def test_punctuation_only_differences_score_one(mpn1, mpn2):
+    assert similarity(mpn1, mpn2) == 1.0
+
+@pytest.mark.parametrize('mpn1, mpn2', [
+    ('LM358DR', 'LM358DR-T'),
+    ('0466004', '0466004.NR'),
+    ('LM358', 'TI-LM358'),
+])
+def test_separated_extensions_score_their_shared_share(mpn1, mpn2):
+    short, long = len(squash(mpn1)), len(squash(mpn2))
+    assert similarity(mpn1, mpn2) == similarity(mpn2, mpn1) == 2 * short / (short + long)
+
+@pytest.mark.parametrize('mpn1, mpn2', [
+    # Package variants: SOD-123 vs DO-35
+    ('1N4148', '1N4148W'),
+    ('LM358D', 'LM358DR'),
+    # Value and tolerance codes
+    ('RC0805FR-074K7L', 'RC0805FR-074R7L'),
+    ('GRM188R71C104KA01D', 'GRM188R71C105KA01D'),
+])
+def test_run_on_extensions_and_changed_characters_score_zero(mpn1, mpn2):
+    assert similarity(mpn1, mpn2) == 0.0
+
+def test_match_mpns_pairs_near_matches_only():
+    removed = ['1N4148', 'LM358DR', 'RC0805FR-074K7L', 'NE555 P']
+    added = ['RC0805FR-074R7L', 'NE555P', 'LM358DR-T', '1N4148W']
+    matches = {(i, j) for i, j, _ in match_mpns(removed, added)}
+    assert matches == {(1, 2), (3, 1)}
+
+def test_match_mpns_takes_best_scores_first_and_pairs_each_mpn_once():
+    matches = match_mpns(['LM358DR', 'LM358DR-T'], ['LM358DR-T-NOPB', 'LM358DR.T'], threshold=0.7)
+    assert [(i, j) for i, j, _ in matches] == [(1, 1), (0, 0)]
+    assert matches[0][2] == 1.0
+
+def test_match_mpns_threshold_and_short_mpns():
+    assert match_mpns(['LM358'], ['TI-LM358'], threshold=0.9) == []
+    assert match_mpns(['LM358'], ['TI-LM358'], threshold=None) == []
+    # Too short to match on similarity, but punctuation differences still pair
+    assert match_mpns(['10K'], ['10K-1']) == []
+    assert match_mpns(['10-K'], ['10K']) == [(0, 0, 1.0)]
@@ -0,0 +1,60 @@
+import pytest
+from openpyxl import Workbook
+from excel_tool import compare_boms, compare_boms_sheets, find_bom_sheets, pair_sheets
+
+MAIN = [['Board 100 Rev A'], ['MPN', 'Qty', 'Ref Des'], ['LM358', 2, 'U1, U2'], ['NE555', 1, 'U3']]
+CABLES = [['Part Number', 'Quantity', 'Description'], ['CAB-01', 1, 'Cable'], ['LM358', 1, 'Spare']]
+NOTES = [['Notes'], ['Revised per ECO 12']]
+
+def workbook(path, sheets):
+    book = Workbook()
+    book.remove(book.active)
+    for name, rows in sheets:
+        sheet = book.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    book.save(path)
+    return str(path)
+
+@pytest.fixture
+def files(tmp_path):
+    main2 = MAIN[:2] + [['LM358', 3, 'U1-U3'], ['NE555', 1, 'U3'], ['R1K', 4, 'R1-R4']]
+    file1 = workbook(tmp_path / 'a.xlsx', [('Main', MAIN), ('Notes', NOTES), ('Cables', CABLES)])
+    file2 = workbook(tmp_path / 'b.xlsx', [('Main', main2), ('Cables', CABLES[:2]), ('Extra', [['MPN', 'Qty'], ['X1', 1]])])
+    return file1, file2
+
+def test_find_bom_sheets(files):
+    assert find_bom_sheets(files[0]) == [(0, 'Main'), (2, 'Cables')]
+    assert find_bom_sheets(files[1]) == [(0, 'Main'), (1, 'Cables'), (2, 'Extra')]
+
+def test_pair_sheets():
+    assert pair_sheets(['BOM'], ['Assy BOM']) == [(0, 0)]
+    assert pair_sheets(['Main', 'Cables'], ['Cables', 'Main', 'Extra']) == [(0, 1), (1, 0), (None, 2)]
+
+def test_merge(files):
+    results = compare_boms_sheets(*files, mode='merge')
+    assert results['sheets'] == {'file1': ['Main', 'Cables'], 'file2': ['Main', 'Cables', 'Extra']}
+    assert [(part['MPN'], part['Sheet']) for part in results['new_parts']] == [('R1K', 'Main'), ('X1', 'Extra')]
+    assert results['unchanged_parts'][0] == {
+        'MPN': 'LM358', 'Ref Des/LOC': 'U1, U2', 'Qty': '3', 'Description': 'N/A',
+        'Line Number': '2, 3', 'Sheet': 'Main, Cables'
+    }
+    # The Cables sheet has no Ref Des column, which adds no designators
+    assert [(row['Added Ref Des'], row['Removed Ref Des']) for row in results['refdes_changes']] == [('U3', '')]
+    assert results['summary_stats']['unchanged_parts_count'] == 3
+
+def test_each(files):
+    results = compare_boms_sheets(*files, mode='each')
+    assert [(row['sheet1'], row['sheet2']) for row in results['summary']] == [
+        ('Main', 'Main'), ('Cables', 'Cables'), (None, 'Extra')
+    ]
+    main, cables, extra = results['comparisons']
+    assert [part['MPN'] for part in main['modified_parts']] == ['LM358']
+    assert [part['MPN'] for part in main['new_parts']] == ['R1K']
+    assert [part['MPN'] for part in cables['removed_parts']] == ['LM358']
+    assert extra['error'] == "Sheet 'Extra' is only in file2"
+
+def test_first_sheet_only_by_default(files):
+    results = compare_boms(*files)
+    assert results['summary_stats']['total_parts_file1'] == 2
+    assert 'sheets' not in results
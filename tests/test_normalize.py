@@ -0,0 +1,73 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from normalize import normalize_qty, normalize_text, to_display
+
+# The per-cell rules the vectorized functions replaced, as excel_tool had them
+
+def old_norm(val):
+    if pd.isna(val) or val == '' or str(val).lower() in ['nan', 'none', 'null', '']:
+        return ''
+    val_str = str(val).strip()
+    if not val_str or val_str.lower() in ['nan', 'none', 'null']:
+        return ''
+    return val_str.upper()
+
+def old_normalize_qty(qty_str):
+    if pd.isna(qty_str) or qty_str == '' or str(qty_str).lower() == 'nan':
+        return ''
+    try:
+        qty_float = float(str(qty_str))
+        if qty_float == int(qty_float):
+            return str(int(qty_float))
+        else:
+            return str(qty_float)
+    except (ValueError, OverflowError):
+        return str(qty_str).strip()
+
+def old_clean_value(v):
+    if pd.isna(v) or v == '' or str(v).lower() in ['nan', 'none', 'null']:
+        return 'N/A'
+    if isinstance(v, (int, float)) and not pd.isna(v):
+        if v == int(v):
+            return str(int(v))
+        else:
+            return str(v)
+    val_str = str(v).strip()
+    if not val_str or val_str.lower() in ['nan', 'none', 'null']:
+        return 'N/A'
+    return val_str
+
+COLUMNS = {
+    'mixed': pd.Series([
+        'LM358', ' lm358dr-t ', '', '   ', 'nan', 'None', 'NULL', None, np.nan, 5, 5.0, 2.5,
+        12345678901234, '0805', '2 pcs', ' 3 ', '1e3', datetime.datetime(2023, 1, 5), True
+    ], dtype=object),
+    'int': pd.Series([1, 0, -3, 10 ** 12], dtype='int64'),
+    'float': pd.Series([1.0, 2.5, np.nan, 1e20, -0.0, 0.1 + 0.2, 3.0], dtype='float64'),
+    'nullable int': pd.Series([1, None, 7], dtype='Int64'),
+    'string': pd.Series(['LM358', None, ' x ', 'null'], dtype='string'),
+    'bool': pd.Series([True, False]),
+}
+
+@pytest.fixture(params=list(COLUMNS))
+def column(request):
+    return COLUMNS[request.param]
+
+def test_normalize_text_matches_the_per_cell_rule(column):
+    assert normalize_text(column).tolist() == [old_norm(value) for value in column]
+
+def test_normalize_qty_matches_the_per_cell_rule(column):
+    assert normalize_qty(column).tolist() == [old_normalize_qty(value) for value in column.array]
+
+def test_to_display_matches_the_per_cell_rule(column):
+    assert to_display(column).tolist() == [old_clean_value(value) for value in column.array]
+
+def test_outputs():
+    assert normalize_text(COLUMNS['mixed'])[:9].tolist() == ['LM358', 'LM358DR-T', '', '', '', '', '', '', '']
+    assert normalize_qty(pd.Series([5, 5.0, '5', ' 5 ', '2 pcs', '', None], dtype=object)).tolist() == [
+        '5', '5', '5', '5', '2 pcs', '', ''
+    ]
+    assert normalize_qty(COLUMNS['float']).tolist() == ['1', '2.5', '', '100000000000000000000', '0', '0.30000000000000004', '3']
+    assert to_display(pd.Series([' U1 ', '', None, 4.0, 'none'], dtype=object)).tolist() == ['U1', 'N/A', 'N/A', '4', 'N/A']
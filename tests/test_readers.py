@@ -0,0 +1,68 @@
+import datetime
+import glob
+import os
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from excel_tool import READERS, _detect_header, grid_to_frame, iter_sheet_heads, read_sheet_grid, use_reader
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test_files')
+
+def workbooks():
+    return sorted(glob.glob(os.path.join(TEST_FILES, '*.xls*')))
+
+def backends(path):
+    ext = os.path.splitext(path)[1].lower()
+    return [name for name, reader in READERS.items() if reader.available and ext in reader.extensions]
+
+def pandas_engine(path):
+    return 'xlrd' if path.lower().endswith('.xls') else 'openpyxl'
+
+@pytest.mark.parametrize('path', workbooks(), ids=os.path.basename)
+def test_sheets_read_like_pandas(path):
+    """Whichever backend reads a workbook, its frames are what pd.read_excel gave.
+    
+    Every sheet's raw grid, and the first sheet's frame below its detected
+    header row.
+    """
+    (_, head), = list(iter_sheet_heads(path))[:1]
+    header_row, _, col_map = _detect_header(head)
+    with pd.ExcelFile(path, engine=pandas_engine(path)) as book:
+        expected = [book.parse(sheet, header=None) for sheet in range(len(book.sheet_names))]
+        expected_bom = book.parse(0, header=header_row) if 'mpn' in col_map else None
+    for name in backends(path):
+        with use_reader(name):
+            grids = [read_sheet_grid(path, sheet) for sheet in range(len(expected))]
+        for sheet, (grid, frame) in enumerate(zip(grids, expected)):
+            assert grid_to_frame(grid).equals(frame) or (frame.empty and not any(grid)), (name, sheet)
+        if expected_bom is not None:
+            assert grid_to_frame(grids[0], header=header_row).equals(expected_bom), name
+
+@pytest.fixture
+def typed_workbook(tmp_path):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(['MPN', 'Qty', 'Date', 'Flag', 'Pct', 'Big', None, 'Neg'])
+    sheet.append(['LM358', 1, datetime.datetime(2023, 1, 5), True, 0.25, 12345678901234, None, -3.5])
+    sheet.append([None, None, None, None, None, None, None, None])
+    sheet.append(['0805', '2', None, False, None, None, None, None])
+    second = book.create_sheet('Offset')
+    second['C3'] = 'offset'
+    path = str(tmp_path / 'typed.xlsx')
+    book.save(path)
+    return path
+
+@pytest.mark.parametrize('name', [name for name in READERS if name != 'csv'])
+def test_typed_cells(typed_workbook, name):
+    if not READERS[name].available or '.xlsx' not in READERS[name].extensions:
+        pytest.skip(f"{name} cannot read .xlsx here")
+    with use_reader(name):
+        assert read_sheet_grid(typed_workbook) == [
+            ['MPN', 'Qty', 'Date', 'Flag', 'Pct', 'Big', '', 'Neg'],
+            ['LM358', 1, datetime.datetime(2023, 1, 5), True, 0.25, 12345678901234, '', -3.5],
+            ['', '', '', '', '', '', '', ''],
+            ['0805', '2', '', False, '', '', '', ''],
+        ]
+        # Empty rows and columns before the data keep their positions
+        assert read_sheet_grid(typed_workbook, 1) == [['', '', ''], ['', '', ''], ['', '', 'offset']]
+        assert [name for name, _ in iter_sheet_heads(typed_workbook)] == ['Sheet', 'Offset']
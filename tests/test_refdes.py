@@ -0,0 +1,49 @@
+import pytest
+from refdes import MAX_DESIGNATOR_NUMBER, DesignatorSet, format_designators, parse_designators
+
+def designators(text):
+    return format_designators(parse_designators(text))
+
+@pytest.mark.parametrize('text, expected', [
+    ('R1, R2 R3;R4/R5', 'R1-R5'),
+    ('R1-R4', 'R1-R4'),
+    ('R1-4', 'R1-R4'),
+    ('R1..R4', 'R1-R4'),
+    ('R1 - R4', 'R1-R4'),
+    ('R1–R4', 'R1-R4'),
+    ('R1~R4', 'R1-R4'),
+    ('R4-R1', 'R1-R4'),
+    ('r01, r2', 'R1, R2'),
+])
+def test_ranges_and_separators(text, expected):
+    assert designators(text) == expected
+
+def test_bare_numbers_take_the_previous_prefix():
+    assert designators('C1,18') == 'C1, C18'
+    assert designators('ENC1,2-4') == 'ENC1-ENC4'
+    assert designators('C1, R2, 3') == 'C1, R2, R3'
+
+def test_other_tokens_are_kept_as_text():
+    assert designators('U1A, TP_GND, R1') == 'R1, TP_GND, U1A'
+    # A range into another prefix is not expanded
+    assert designators('R1-C4') == 'R1-C4'
+    # Numbers without any prefix before them
+    assert designators('12') == '12'
+
+def test_numbers_over_the_cap_are_kept_as_text():
+    big = MAX_DESIGNATOR_NUMBER + 1
+    assert parse_designators(f"R{big}") == DesignatorSet(other=frozenset({f"R{big}"}))
+    assert parse_designators(f"R1-R{big}") == DesignatorSet(other=frozenset({f"R1-R{big}"}))
+    assert designators(f"R{MAX_DESIGNATOR_NUMBER}") == f"R{MAX_DESIGNATOR_NUMBER}"
+
+def test_format_keeps_pairs_and_collapses_runs():
+    assert designators('R1, R2, R4, R5, R6, R9') == 'R1, R2, R4-R6, R9'
+    assert format_designators(DesignatorSet()) == ''
+
+def test_set_difference_and_length():
+    before = parse_designators('R1-R4, U1A')
+    after = parse_designators('R1, R2, R5')
+    assert format_designators(before - after) == 'R3, R4, U1A'
+    assert format_designators(after - before) == 'R5'
+    assert len(before) == 5
+    assert not parse_designators('R1-R4') - parse_designators('R1, R2, R3, R4')
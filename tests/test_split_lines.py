@@ -0,0 +1,71 @@
+import pandas as pd
+from excel_tool import _collapse_parts, compare_parsed
+from normalize import normalize_text
+
+COLUMNS = {'mpn': 'MPN', 'qty': 'Qty', 'refdes': 'Ref Des', 'description': 'Description'}
+
+def bom(*rows):
+    """A parsed BOM of (MPN, Qty, Ref Des, Description) rows."""
+    return pd.DataFrame(rows, columns=['MPN', 'Qty', 'Ref Des', 'Description']), dict(COLUMNS)
+
+def collapse(*rows):
+    df, column_map = bom(*rows)
+    cols, keys = _collapse_parts(df, column_map, normalize_text(df['MPN']))
+    return keys.tolist(), {name: values.tolist() for name, values in cols.items()}
+
+def test_split_lines_are_summed_and_joined_in_order():
+    keys, cols = collapse(
+        ('LM358', 1, 'U1', 'Opamp'),
+        ('R1K', 1, 'R1', 'Resistor'),
+        ('lm358', 2, 'U2, U3', 'Other text'),
+        ('LM358', '', '', ''),
+    )
+    assert keys == ['LM358', 'R1K']
+    assert cols['qty'] == [3.0, 1]
+    assert cols['refdes'] == ['U1, U2, U3', 'R1']
+    assert cols['line'] == ['2, 4, 5', '3']
+    # MPN and description come from the first line
+    assert cols['mpn'] == ['LM358', 'R1K']
+    assert cols['description'] == ['Opamp', 'Resistor']
+
+def test_text_quantities_are_listed_instead_of_summed():
+    _, cols = collapse(('LM358', '2 pcs', 'U1', ''), ('LM358', 3, 'U2', ''), ('NE555', '1', 'U3', ''), ('NE555', '1', 'U4', ''))
+    assert cols['qty'] == ['2 pcs, 3', 2.0]
+
+def test_parts_without_split_lines_are_unchanged():
+    _, cols = collapse(('LM358', 1, 'U1', 'Opamp'), ('NE555', 2, 'U2', 'Timer'))
+    assert cols['qty'] == [1, 2]
+    assert cols['line'] == [2, 3]
+
+def test_split_lines_compare_as_one_part():
+    results = compare_parsed(
+        bom(('LM358', 1, 'U1', 'Opamp'), ('LM358', 1, 'U2', 'Opamp')),
+        bom(('LM358', 2, 'U2, U1', 'Opamp'),)
+    )
+    assert results['summary_stats']['unchanged_parts_count'] == 1
+    assert results['refdes_changes'] == []
+
+    results = compare_parsed(
+        bom(('LM358', 1, 'U1', 'Opamp'), ('LM358', 1, 'U2', 'Opamp')),
+        bom(('LM358', 3, 'U1-U3', 'Opamp'),)
+    )
+    modified, = results['modified_parts']
+    assert (modified['File1 Qty'], modified['File2 Qty'], modified['File1 Line']) == ('2', '3', '2, 3')
+    assert results['refdes_changes'][0]['Added Ref Des'] == 'U3'
+
+def test_split_lines_without_ref_des():
+    results = compare_parsed(
+        bom(('SCREW-M3', 1, '', 'Screw'), ('SCREW-M3', 2, '', 'Screw'), ('R1K', 1, 'R1', 'Resistor')),
+        bom(('SCREW-M3', 3, '', 'Screw'), ('R1K', 1, 'R1', 'Resistor'))
+    )
+    assert results['summary_stats']['unchanged_parts_count'] == 2
+    assert results['unchanged_parts'][0]['Qty'] == '3'
+    assert results['unchanged_parts'][0]['Line Number'] == '2, 3'
+
+def test_float_quantity_sums_are_rounded():
+    results = compare_parsed(
+        bom(('GLUE', 0.1, '', 'Glue'), ('GLUE', 0.2, '', 'Glue')),
+        bom(('GLUE', 0.3, '', 'Glue'),)
+    )
+    assert results['summary_stats']['modified_parts_count'] == 0
+    assert results['unchanged_parts'][0]['Qty'] == '0.3'
@@ -0,0 +1,23 @@
+import asyncio
+import time
+import pytest
+from worker_pool import ComparisonPool, PoolBusyError
+
+def test_run_waiting_queues_when_the_pool_is_full():
+    async def scenario():
+        pool = ComparisonPool(workers=1, max_queue=0, timeout=30)
+        try:
+            # Starts the worker, so the timings below do not include its start-up
+            await pool.run(time.sleep, 0)
+            busy = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+            await asyncio.sleep(0.1)
+            with pytest.raises(PoolBusyError):
+                await pool.run(time.sleep, 0)
+            waiting = asyncio.ensure_future(pool.run_waiting(time.sleep, 0))
+            await asyncio.sleep(0.1)
+            assert pool.in_flight == 2
+            await asyncio.gather(busy, waiting)
+            assert pool.in_flight == 0
+        finally:
+            pool.shutdown()
+    asyncio.run(scenario())